@@ -7,16 +7,19 @@ import multiprocessing
 import os
 from glob import glob
 import shutil
-from functools import partial
 import platform
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
-import mat73
-import pyedflib
+import h5py
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from scipy.special import expit, ndtr
 
 from tusz_data_processing.config import FEATURES_DIR, TUSZ_DIR
-import tusz_data_processing.load_functions as lf
+import tusz_data_processing.durations as dur
 
 SET = "eval"
 SIM = "2"
@@ -27,6 +30,11 @@ CLASSIFIER = "tnkf"
 REF = False
 HYP = True
 DEBUG = False
+LINK_REF_FILES = False  # hard link the reference files instead of copying
+IO_THREADS = 16  # number of threads writing/copying .tse files
+CONFIDENCE = False  # write segment confidences instead of probability 1.0
+CONFIDENCE_SCALE = 1.0  # scale of the svm output in the logistic calibration
+SWEEP = False  # score a grid of post-processing parameters (see sweep.py)
 
 if CLASSIFIER == "lssvm":
     PREDICTIONS = (
@@ -38,39 +46,84 @@ elif CLASSIFIER == "tnkf":
     PREDICTIONS = FEATURES_DIR + "/results/eval/gamma=0.10_sigma2=6.00/predicted.mat"
     RESULTS_DIR = "../scoring/" + SET + "_hyp_tnkf/sim_" + SIM + "/"
 
-def load_classifier_results(val_file, prediction_file):
-    """_summary_
+# columns of the validation data and of the classifier output that are used
+VAL_COLUMNS = ["epoch", "start_time", "stop_time", "annotation", "filename"]
+PREDICTION_COLUMNS = ["predicted_labels", "svm_output"]
+# output of the classifier that is only loaded when it is available
+VAR_COLUMN = "var_output"  # predictive variance of the TNKF
+
+
+def load_predictions(prediction_file, columns=PREDICTION_COLUMNS, optional=()) -> dict:
+    """Load only the requested outputs of the classifier, as float32.
 
     Args:
-        val_file (_type_): _description_
-        prediction_file (_type_): _description_
+        prediction_file (str): .mat (v7.3) or .csv file with the classifier output
+        columns (list, optional): outputs to load. Defaults to PREDICTION_COLUMNS.
+        optional (tuple, optional): outputs to load if they are in the file. Defaults to ().
 
     Returns:
-        _type_: _description_
+        dict: name -> pyarrow Array (float32)
     """
-
-    # %% Load predictions
     prediction_file = os.path.abspath(prediction_file)
     file, ext = os.path.splitext(prediction_file)
+    predictions = {}
     if ext == ".mat":
-        predictions = mat73.loadmat(prediction_file)
-        predictions = pd.DataFrame(predictions)
+        # v7.3 .mat files are HDF5 files, read the datasets directly
+        with h5py.File(prediction_file, "r") as f:
+            columns = list(columns) + [col for col in optional if col in f]
+            for col in columns:
+                dataset = f[col]
+                values = np.empty(dataset.shape, dtype=np.float32)
+                dataset.read_direct(values)
+                predictions[col] = pa.array(values.ravel())
     elif ext == ".csv":
-        predictions = pd.read_csv(prediction_file)
-    # predictions had cols: 'predicted_labels', 'svm_output', (opt.) 'vat_output'
-    predictions.reset_index(inplace=True, drop=True)
+        if optional:
+            names = pacsv.open_csv(prediction_file).schema.names
+            columns = list(columns) + [col for col in optional if col in names]
+        table = pacsv.read_csv(
+            prediction_file,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=columns,
+                column_types={col: pa.float32() for col in columns},
+            ),
+        )
+        for col in columns:
+            predictions[col] = table.column(col)
+    else:
+        raise ValueError("Unsupported prediction file %s" % prediction_file)
+    return predictions
+
+
+def load_classifier_results(
+    val_file, prediction_file, columns=PREDICTION_COLUMNS, optional=()
+) -> pd.DataFrame:
+    """Load the validation data and join it with the classifier output.
+
+    Only the needed columns are read, the classifier output is added to the
+    Arrow table of the validation data and converted to pandas once (with
+    the file names as categorical).
+
+    Args:
+        val_file (str): parquet file with the validation data
+        prediction_file (str): .mat (v7.3) or .csv file with the classifier output
+        columns (list, optional): outputs to load. Defaults to PREDICTION_COLUMNS.
+        optional (tuple, optional): outputs to load if they are available. Defaults to ().
+
+    Returns:
+        DataFrame: columns VAL_COLUMNS + columns (+ the available optional columns)
+    """
     # %% load validation data
-    cols = ["epoch", "start_time", "stop_time", "annotation", "filename"]
-    val_df = pd.read_parquet(val_file, columns=cols)
-    val_df.reset_index(inplace=True, drop=True)
+    table = pq.read_table(val_file, columns=VAL_COLUMNS, read_dictionary=["filename"])
+    # %% Load predictions
+    predictions = load_predictions(prediction_file, columns, optional)
     # %% join the true validation with the predicted labels
-    assert len(val_df) == len(
-        predictions
-    ), "Prediction and validation data must be of same length."
-    new_df = val_df.join(predictions)
-    assert len(new_df) == len(val_df), "Concatenated df not same length."
+    for col, values in predictions.items():
+        assert len(values) == table.num_rows, (
+            "Prediction and validation data must be of same length."
+        )
+        table = table.append_column(col, values)
 
-    return new_df
+    return table.to_pandas(split_blocks=True, self_destruct=True)
 
 
 def get_file_names(dataset):
@@ -92,12 +145,35 @@ def get_file_names(dataset):
 
 
 def get_file_length(edf_file):
-    edf_file = TUSZ_DIR + edf_file
-    edf_reader = pyedflib.EdfReader(edf_file)
-    return edf_reader.file_duration
+    return dur.get_file_duration(edf_file)
+
+
+def format_tse(annotations) -> str:
+    """Format annotations as the content of a .tse file.
+
+    The columns are converted to strings per column (same result as
+    annotations.values.astype(str)) and joined with vectorized string
+    operations.
+
+    Args:
+        annotations: DataFrame with columns
+                 (start_time [s], stop_time [s], annotation ('seiz' or 'bkgn), probability)
+
+    Returns:
+        str: content of the .tse file
+    """
+    VERSION = "version = tse_v1.0.0\n"
+
+    columns = [annotations[col].to_numpy().astype(str) for col in annotations.columns]
+    rows = columns[0]
+    for column in columns[1:]:
+        rows = np.char.add(np.char.add(rows, " "), column)
 
+    # version line, empty second line and all events
+    return VERSION + "\n" + "\n".join(rows.tolist())
 
-def write_tse(annotations, tse_file):
+
+def write_tse(annotations, tse_file, make_dirs=True):
     """function: write_tse Load seizure events from a TSE file. This function is
         adapted from the one provided by xxx.
 
@@ -105,33 +181,107 @@ def write_tse(annotations, tse_file):
         annotations: DataFrame with seizure, with columns
                  (start_time [s], stop_time [s], annotation ('seiz' or 'bkgn)
         tse_file: name of the tse_file with annotation of the edf_file.
+        make_dirs (bool, optional): create the directory of tse_file. Defaults to True.
 
     return:
       tse_file
     """
-    VERSION = "version = tse_v1.0.0\n"
-
-    # dataframe to list
-    # seizures['probability'] = 1.0
-    parsed_seizures = "\n".join(
-        [" ".join(row) for row in annotations.values.astype(str).tolist()]
-    )
-
     # make dirs if not exist
-    os.makedirs(os.path.dirname(tse_file), exist_ok=True)
+    if make_dirs:
+        os.makedirs(os.path.dirname(tse_file), exist_ok=True)
 
     # Parse TSE file
     #
     with open(tse_file, "w") as tse:
-        tse.write(VERSION)
+        tse.write(format_tse(annotations))
 
-        # write empty second line
-        tse.write("\n")
+    return annotations
 
-        # write all events
-        tse.write(parsed_seizures)
 
-    return annotations
+def write_tse_files(annotations_list: list, tse_files: list, threads: int = IO_THREADS):
+    """Write many .tse files: create all output directories once and write
+        the files from a thread pool.
+
+    Args:
+        annotations_list (list): DataFrames with the annotations (None is skipped)
+        tse_files (list): names of the .tse files
+        threads (int, optional): number of writing threads. Defaults to IO_THREADS.
+    """
+    items = [
+        (annotations, tse_file)
+        for annotations, tse_file in zip(annotations_list, tse_files)
+        if annotations is not None
+    ]
+    for folder in set(os.path.dirname(tse_file) for _, tse_file in items):
+        os.makedirs(folder, exist_ok=True)
+
+    with ThreadPoolExecutor(threads) as executor:
+        # list() to raise the errors of the threads
+        list(
+            executor.map(
+                lambda item: write_tse(item[0], item[1], make_dirs=False), items
+            )
+        )
+
+
+def calibrate_confidence(svm_output, var_output=None, scale=CONFIDENCE_SCALE):
+    """Probability of a seizure given the (averaged) classifier output.
+
+    Args:
+        svm_output (ndarray): classifier output
+        var_output (ndarray, optional): predictive variance of the output (TNKF),
+            gives P(output > 0) under a Gaussian. Defaults to None (logistic).
+        scale (float, optional): scale of the logistic function. Defaults to CONFIDENCE_SCALE.
+
+    Returns:
+        ndarray: probabilities in [0, 1]
+    """
+    if var_output is None:
+        return expit(scale * svm_output)
+    return ndtr(svm_output / np.sqrt(var_output))
+
+
+def segment_confidence(ann_df, new_ann, ann_label="predicted_labels") -> np.ndarray:
+    """Confidence of the stitched segments: the classifier output of the epochs
+        is averaged per segment (epochs are assigned by their center) and
+        calibrated to a seizure probability.
+
+    Args:
+        ann_df (DataFrame): epochs with columns (start_time, stop_time, svm_output
+            and optionally var_output)
+        new_ann (DataFrame): stitched segments (output of stitch_annotations)
+        ann_label (str, optional): Label of the annotations. Defaults to "predicted_labels".
+
+    Returns:
+        ndarray: probability of the label of every segment (seizure
+            probability for 'seiz', 1 - seizure probability for 'bckg')
+    """
+    seg_start = new_ann["start_time"].to_numpy(dtype=float)
+    center = (
+        ann_df["start_time"].to_numpy(dtype=float)
+        + ann_df["stop_time"].to_numpy(dtype=float)
+    ) / 2
+    segment = np.clip(np.searchsorted(seg_start, center, side="right") - 1, 0, None)
+
+    n_segments = len(new_ann)
+    counts = np.bincount(segment, minlength=n_segments)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        svm_output = np.bincount(
+            segment, weights=ann_df["svm_output"].to_numpy(dtype=float),
+            minlength=n_segments,
+        ) / counts
+        var_output = None
+        if VAR_COLUMN in ann_df:
+            var_output = np.bincount(
+                segment, weights=ann_df[VAR_COLUMN].to_numpy(dtype=float),
+                minlength=n_segments,
+            ) / counts
+        p_seiz = calibrate_confidence(svm_output, var_output)
+    # segments without epochs (e.g. the end of the file) are background
+    p_seiz[counts == 0] = 0.0
+
+    is_seiz = (new_ann[ann_label] == "seiz").to_numpy()
+    return np.round(np.where(is_seiz, p_seiz, 1 - p_seiz), 4)
 
 
 def stitch_annotations(
@@ -140,6 +290,7 @@ def stitch_annotations(
     ann_label="predicted_labels",
     min_seiz_length=25.0,
     time_between=90.0,
+    confidence=False,
 ):
     """Stitch together the annotations to take time into account. 
 
@@ -150,114 +301,88 @@ def stitch_annotations(
         min_seiz_length (float, optional): Minimum length of a seizure in seconds. Defaults to 8..
         seiz_percentage (float, optional): Percentage of segments that need to be classified as seizure. Defaults to 0.8.
         time_between (float, optional): If > time_between seizure segments they are 'different' seizures. Defaults to 3..
+        confidence (bool, optional): Probability of the segments from the
+            "svm_output" (see segment_confidence) instead of 1.0. Defaults to False.
 
     Returns:
-        DataFrame: with columns (start_time, stop_time, annotation)
+        DataFrame: with columns (start_time, stop_time, annotation, probability)
     """
 
     ann_df.loc[:, "stop_time"] = ann_df["stop_time"].round()
     ann_df.loc[:, "start_time"] = ann_df["start_time"].round()
-    seizures = ann_df[ann_df[ann_label] == 1]
     cols = ["start_time", "stop_time", ann_label, "probability"]
-    if seizures.empty:
+    is_seizure = (ann_df[ann_label] == 1).to_numpy()
+    if not is_seizure.any():
         new_ann = pd.DataFrame([[0.0, file_duration, "bckg", 1.0]], columns=cols)
+        if confidence:
+            new_ann["probability"] = segment_confidence(ann_df, new_ann, ann_label)
         return new_ann
 
-    seizures.reset_index(inplace=True, drop=True)
-    seizures.sort_values(by="start_time", inplace=True)
+    start = ann_df["start_time"].to_numpy(dtype=float)[is_seizure]
+    stop = ann_df["stop_time"].to_numpy(dtype=float)[is_seizure]
+    # first seizure segment, then the others ordered by start time
+    order = np.argsort(start, kind="quicksort")
+    order = np.concatenate(([0], order[order != 0]))
+    start, stop = start[order], stop[order]
 
     # First step auto stitch if time between < time_between
-    # check if a seizure exist
-    # new_seizures = pd.DataFrame(columns=seizures.columns)
-    i_seiz = 0
-    start_seizure = [seizures.loc[0, "start_time"]]  # initialize start 1st seizure
-    stop_seizure = [seizures.loc[0, "stop_time"]]
-    for i, row in seizures.iterrows():
-        if i == 0:
-            continue
-        curr_start = row["start_time"]  # initialize start 1st seizure
-        curr_stop = row["stop_time"]
-        if abs((curr_start - stop_seizure[i_seiz])) <= time_between:
-            stop_seizure[i_seiz] = curr_stop
-        else:
-            i_seiz += 1
-            start_seizure.append(curr_start)
-            stop_seizure.append(curr_stop)
-
-    new_seizures = pd.DataFrame(
-        np.array([start_seizure, stop_seizure]).T, columns=["start_time", "stop_time"]
-    )
+    # (a new seizure starts if the gap with the previous segment is too large)
+    new_seizure = np.ones(len(start), dtype=bool)
+    new_seizure[1:] = np.abs(start[1:] - stop[:-1]) > time_between
+    seizure_id = np.cumsum(new_seizure) - 1
+    last_segment = np.flatnonzero(np.diff(seizure_id, append=seizure_id[-1] + 1))
+    seiz_start = start[new_seizure]
+    seiz_stop = stop[last_segment]
 
     # step: remove seizure < min_seiz_length
-    new_seizures = new_seizures.sort_values(by="start_time")
-    new_seizures.reset_index(inplace=True, drop=True)
-    new_seizures["seizure_length"] = (
-        new_seizures["stop_time"] - new_seizures["start_time"]
-    )
-    new_seizures = new_seizures[new_seizures["seizure_length"] >= min_seiz_length]
-    if new_seizures.empty:
+    order = np.argsort(seiz_start, kind="quicksort")
+    seiz_start, seiz_stop = seiz_start[order], seiz_stop[order]
+    keep = (seiz_stop - seiz_start) >= min_seiz_length
+    if not keep.any():
         new_ann = pd.DataFrame([[0.0, file_duration, "bckg", 1.0]], columns=cols)
+        if confidence:
+            new_ann["probability"] = segment_confidence(ann_df, new_ann, ann_label)
         return new_ann
+    seiz_start, seiz_stop = seiz_start[keep], seiz_stop[keep]
+
+    # Add background segments (from the end of the previous seizure to the
+    # start of the next one, none before a seizure starting at 0)
+    back_start = np.concatenate(([0.0], seiz_stop[:-1]))
+    back_stop = seiz_start.copy()
+    if seiz_start[0] == 0:
+        back_start = back_start[1:]
+        back_stop = back_stop[1:]
+        if len(back_start) > 0:
+            back_start[0] = 0.0
+
+    # interleave background and seizure segments
+    seg_start = np.concatenate((back_start, seiz_start))
+    seg_stop = np.concatenate((back_stop, seiz_stop))
+    is_seiz = np.arange(len(seg_start)) >= len(back_start)
+    order = np.argsort(seg_start, kind="quicksort")
+    seg_start, seg_stop, is_seiz = seg_start[order], seg_stop[order], is_seiz[order]
+
+    # extend or close the last segment up to the end of the file
+    if seg_stop[-1] != file_duration:
+        if is_seiz[-1] and (file_duration - seg_stop[-1]) > time_between:
+            seg_start = np.append(seg_start, seg_stop[-1])
+            seg_stop = np.append(seg_stop, file_duration)
+            is_seiz = np.append(is_seiz, False)
+        else:
+            seg_stop[-1] = file_duration
 
-    new_seizures.reset_index(inplace=True, drop=True)
-    new_seizures.drop(columns=["seizure_length"], inplace=True)
-    new_seizures.loc[:, ann_label] = "seiz"
-
-
-    new_seizures.loc[:, "probability"] = 1.0
-
-    # Add background segments
-    time = 0
-    background_start = []
-    background_stop = []
-    for index, row in new_seizures.iterrows():
-        if index == 0 and row["start_time"] == 0:
-            continue
-        background_start.append(time)
-        background_stop.append(row["start_time"])
-
-        time = row["stop_time"]
-
-    # Background dataframe
-    assert len(background_start) == len(background_stop)
-    N_back = len(background_start)
-    background_df = pd.DataFrame(
+    new_ann = pd.DataFrame(
         {
-            "start_time": background_start,
-            "stop_time": background_stop,
-            ann_label: ["bckg"] * N_back,
-            "probability": [1.0] * N_back,
+            "start_time": seg_start,
+            "stop_time": seg_stop,
+            ann_label: np.where(is_seiz, "seiz", "bckg").astype(object),
+            "probability": np.ones(len(seg_start)),
         }
     )
 
-    # concatenate background and seizure df's
-    new_ann = pd.concat([background_df, new_seizures])
-    new_ann.sort_values(
-        by="start_time", ascending=True, ignore_index=True, inplace=True
-    )
-    idx_last = new_ann.index[-1]
-    last_row = new_ann.loc[idx_last, :].copy()
-    if last_row["stop_time"] != file_duration:
-        if (
-            last_row[ann_label] == "seiz"
-            and (file_duration - last_row["stop_time"]) <= time_between
-        ):
-            new_ann.loc[idx_last, "stop_time"] = file_duration
-        elif last_row[ann_label] == "bckg":
-            new_ann.loc[idx_last, "stop_time"] = file_duration
-        else:
-            new_last_row = pd.Series(
-                [
-                    new_ann.loc[new_ann.index[-1], "stop_time"],
-                    file_duration,
-                    "bckg",
-                    1.0,
-                ],
-                index=new_ann.columns,
-            )
-            new_ann.loc[idx_last + 1, :] = new_last_row
-
     assert np.all((new_ann["stop_time"] - new_ann["start_time"]) > 0)
+    if confidence:
+        new_ann["probability"] = segment_confidence(ann_df, new_ann, ann_label)
 
     return new_ann
 
@@ -273,34 +398,199 @@ def stitch_file(file: str, validation_df: pd.DataFrame) -> str:
     Returns:
         str: name of the .tse file
     """
+    # get dataframe of current file
+    df = validation_df[validation_df["filename"] == file].copy()
+    df = smooth_predictions(df, [0, len(df)])
+    return stitch_file_rows(file, df)
+
+
+def get_tse_file_name(file: str) -> str:
+    """Name of the hypothesis .tse file of an edf file."""
+    file = os.path.basename(file)
+    return RESULTS_DIR + file.replace(".edf", "") + ".tse"
+
+
+def stitch_file_annotations(file: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Stitch the annotation of a single file, given only the (smoothed) rows
+        of that file.
+
+    Args:
+        file (str): the respective file
+        df (DataFrame): the rows of this file, with the "predicted_labels"
+            after smoothing (see smooth_predictions), is modified
+
+    Returns:
+        DataFrame: stitched annotations (None if the file is skipped)
+    """
     file_length = get_file_length(file)
-    check = lf.check_file_duration(file)
+    check = dur.check_file_duration(file)
     if not check:
         return None
 
-    # get dataframe of current file
-    df = validation_df[validation_df["filename"] == file].copy()
-    # apply moving average filter to svm output
-    N_filt = np.min([MOVING_WINDOW, len(df)-1])
-    df.loc[:, 'svm_output'] = moving_average(
-        df.loc[:, 'svm_output'].to_numpy(), N=N_filt, axis=0
-    )
-    if CLASSIFIER == "tnkf":
-        df.loc[:, 'svm_output'] = df.loc[:,'svm_output'] + OFFSET   # adjust bias
-    # new labels after moving average filter
-    df.loc[:, 'predicted_labels'] = np.sign(df.loc[:, 'svm_output'])
-
     # stitch labels and make ready for .tse file
-    stitched_df = stitch_annotations(df, file_length)
+    return stitch_annotations(df, file_length, confidence=CONFIDENCE)
+
+
+def stitch_file_rows(file: str, df: pd.DataFrame) -> str:
+    """Stitch the annotation of a single file, given only the (smoothed) rows
+        of that file, and save the annotations as .tse file
+
+    Args:
+        file (str): the respective file
+        df (DataFrame): the rows of this file, with the "predicted_labels"
+            after smoothing (see smooth_predictions), is modified
+
+    Returns:
+        str: name of the .tse file
+    """
+    stitched_df = stitch_file_annotations(file, df)
+    if stitched_df is None:
+        return None
 
     # save to .tse file
-    file = os.path.basename(file)
-    tse_file_name = RESULTS_DIR + file.replace(".edf", "") + ".tse"
+    tse_file_name = get_tse_file_name(file)
     write_tse(stitched_df, tse_file_name)
 
     return tse_file_name
 
 
+def group_by_file(validation_df: pd.DataFrame):
+    """Sort the validation data by file (once), keeping the order of the rows
+        within a file and the order in which the files appear.
+
+    Args:
+        validation_df (DataFrame): dataframe with the validation features
+
+    Returns:
+        tuple: (sorted DataFrame, list of (file, start, stop)), the rows of
+            file are sorted_df.iloc[start:stop]
+    """
+    codes, files = pd.factorize(validation_df["filename"])
+    order = np.argsort(codes, kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(files)))))
+    groups = [
+        (file, offsets[i], offsets[i + 1]) for i, file in enumerate(files.tolist())
+    ]
+    return validation_df.iloc[order], groups
+
+
+# rows of the validation data grouped by file, set in every pool worker
+_grouped_df = None
+
+
+def _init_stitch_worker(grouped_df: pd.DataFrame):
+    global _grouped_df
+    _grouped_df = grouped_df
+
+
+def _stitch_group(group: tuple) -> pd.DataFrame:
+    file, start, stop = group
+    return stitch_file_annotations(file, _grouped_df.iloc[start:stop].copy())
+
+
+def stitch_files(validation_df: pd.DataFrame, processes: int = None) -> list:
+    """Stitch the annotations of all files in parallel.
+
+    The data is sorted by file once and the predictions of all files are
+    smoothed at once. Every worker gets the sorted data
+    once (via the pool initializer, inherited without pickling when the pool
+    forks), the tasks only contain the file name and its row offsets.
+    The durations of all files are loaded before the workers are started.
+
+    The stitched annotations are returned to the main process, which writes
+    all .tse files at once (see write_tse_files).
+
+    Args:
+        validation_df (DataFrame): dataframe with the validation features
+        processes (int, optional): number of processes, 0 for sequential. Defaults to None (all cpus).
+
+    Returns:
+        list: names of the .tse files (None for skipped files)
+    """
+    cols = ["start_time", "stop_time", "svm_output"]
+    if VAR_COLUMN in validation_df:
+        cols.append(VAR_COLUMN)
+    grouped_df, groups = group_by_file(validation_df.loc[:, cols + ["filename"]])
+    offsets = [0] + [stop for _, _, stop in groups]
+    grouped_df = smooth_predictions(grouped_df.loc[:, cols], offsets)
+    dur.load_durations([file for file, _, _ in groups])
+    if processes == 0:
+        _init_stitch_worker(grouped_df)
+        stitched = [_stitch_group(group) for group in groups]
+    else:
+        with multiprocessing.Pool(
+            processes, initializer=_init_stitch_worker, initargs=(grouped_df,)
+        ) as pool_obj:
+            stitched = pool_obj.map(_stitch_group, groups)
+
+    tse_files = [
+        None if stitched_df is None else get_tse_file_name(file)
+        for (file, _, _), stitched_df in zip(groups, stitched)
+    ]
+    write_tse_files(stitched, tse_files)
+    return tse_files
+
+
+def smooth_predictions(
+    df: pd.DataFrame, offsets, window: int = None, offset: float = None
+) -> pd.DataFrame:
+    """Apply the moving average filter to the svm output of every file and
+        determine the new labels, for all files at once.
+
+    Args:
+        df (DataFrame): dataframe with column "svm_output", sorted by file
+        offsets (array_like): the rows of file i are df.iloc[offsets[i]:offsets[i+1]]
+        window (int, optional): length moving average filter. Defaults to None (MOVING_WINDOW).
+        offset (float, optional): bias adjustment. Defaults to None (OFFSET for tnkf).
+
+    Returns:
+        DataFrame: df with smoothed "svm_output" and new "predicted_labels"
+    """
+    if window is None:
+        window = MOVING_WINDOW
+    if offset is None:
+        offset = OFFSET if CLASSIFIER == "tnkf" else 0.0
+    offsets = np.asarray(offsets)
+    # filter length per file
+    N_filt = np.maximum(np.minimum(window, np.diff(offsets) - 1), 1)
+    svm_output = segmented_moving_average(
+        df["svm_output"].to_numpy(dtype=float), offsets, N_filt
+    )
+    svm_output = svm_output + offset  # adjust bias
+    df["svm_output"] = svm_output
+    # new labels after moving average filter
+    df["predicted_labels"] = np.sign(svm_output)
+    return df
+
+
+def segmented_moving_average(x: np.ndarray, offsets, N) -> np.ndarray:
+    """Moving average filter over consecutive segments (files) of x, each
+        segment is filtered separately (as if zero padded), using cumulative
+        sums. Same as np.convolve(segment, np.ones(N) / N, mode="same").
+
+    Args:
+        x (ndarray): 1d array with the segments after each other
+        offsets (array_like): segment i is x[offsets[i]:offsets[i+1]]
+        N (int or array_like): lag of the filter (per segment)
+
+    Returns:
+        ndarray: averaged signal (same length as x)
+    """
+    offsets = np.asarray(offsets)
+    lengths = np.diff(offsets)
+    N = np.broadcast_to(N, lengths.shape)
+    N_row = np.repeat(N, lengths)
+    seg_start = np.repeat(offsets[:-1], lengths)
+    seg_stop = np.repeat(offsets[1:], lengths)
+
+    # window of row i: [i - N // 2, i + (N - 1) // 2], within its segment
+    i = np.arange(len(x))
+    lo = np.maximum(i - N_row // 2, seg_start)
+    hi = np.minimum(i + (N_row - 1) // 2 + 1, seg_stop)
+    csum = np.concatenate(([0.0], np.cumsum(x)))
+    return (csum[hi] - csum[lo]) / N_row
+
+
 def moving_average(x: np.ndarray, N: int, axis: int = 0) -> np.ndarray:
     """Moving average filter.
 
@@ -314,39 +604,60 @@ def moving_average(x: np.ndarray, N: int, axis: int = 0) -> np.ndarray:
     """
     if x.ndim == 1:
         assert len(x) >= N, "length of array must be larger than lag"
-        return np.convolve(x, np.ones(N) / N, mode="same")
+        return segmented_moving_average(x, [0, len(x)], N)
 
     assert axis == 0 or axis == 1, "axis must be equal to 0 or 1"
     assert x.shape[axis] >= N, "length of array must be larger than lag"
 
-    if axis == 0:
-        x_avg = np.zeros_like(x, dtype=float)
-        print(x_avg.shape)
-        for i, column in enumerate(x.T):
-            x_avg[:, i] = np.convolve(column.T, np.ones(N) / N, mode="same")
-    elif axis == 1:
-        x_avg = np.zeros_like(x, dtype=float)
-        for i, row in enumerate(x):
-            x_avg[i, :] = np.convolve(row, np.ones(N) / N, mode="same")
-
-    return x_avg  # moving average --> same length as original
-
-
-def copy_ref_files_to_folder(tse_files: list[str], folder: str) -> list:
+    # cumulative sum along the axis, window [i - N // 2, i + (N - 1) // 2]
+    x = np.moveaxis(np.asarray(x, dtype=float), axis, 0)
+    L = x.shape[0]
+    csum = np.concatenate((np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)))
+    i = np.arange(L)
+    lo = np.maximum(i - N // 2, 0)
+    hi = np.minimum(i + (N - 1) // 2 + 1, L)
+    x_avg = (csum[hi] - csum[lo]) / N
+
+    return np.moveaxis(x_avg, 0, axis)  # moving average --> same length as original
+
+
+def _copy_or_link(file: str, new_file: str, link: bool = False):
+    if link:
+        try:
+            if os.path.lexists(new_file):
+                os.remove(new_file)
+            os.link(file, new_file)
+            return
+        except OSError:  # e.g. other file system, fall back to copying
+            pass
+    shutil.copy2(file, new_file)
+
+
+def copy_ref_files_to_folder(
+    tse_files: list[str], folder: str, link: bool = LINK_REF_FILES
+) -> list:
     """Copy the reference .tse files of the dev or eval set to the specified folder.
 
     Args:
         tse_files (list[str]): list of the .tse files to copy
         folder (str): folder directory to copy to.
+        link (bool, optional): hard link the files instead of copying them
+            (falls back to copying). Defaults to LINK_REF_FILES.
 
     Returns:
         list: list of the .tse files in the new directory.
     """
-    new_files = []
-    for file in tse_files:
-        if os.path.isfile(file):
-            shutil.copy2(file, folder)
-            new_files.append(folder + "/" + os.path.basename(file))
+    os.makedirs(folder, exist_ok=True)
+    tse_files = [file for file in tse_files if os.path.isfile(file)]
+    new_files = [folder + "/" + os.path.basename(file) for file in tse_files]
+
+    with ThreadPoolExecutor(IO_THREADS) as executor:
+        list(
+            executor.map(
+                lambda files: _copy_or_link(*files, link=link),
+                zip(tse_files, new_files),
+            )
+        )
 
     return new_files
 
@@ -380,24 +691,33 @@ def save_tse_filenames_to_list(tse_file_names: list[str], mode: str = "hyp"):
 
 
 if __name__ == "__main__":
-    val_df = load_classifier_results(VAL_FILE, PREDICTIONS)
+    val_df = load_classifier_results(
+        VAL_FILE, PREDICTIONS, optional=(VAR_COLUMN,) if CONFIDENCE else ()
+    )
     file_names = get_file_names(val_df)
     if DEBUG:
-        for file in file_names:
-            tse = stitch_file(file, validation_df=val_df)
+        tse_list = stitch_files(val_df, processes=0)
 
     if HYP:
-        pool_obj = multiprocessing.Pool()
-        tse_list = pool_obj.map(partial(stitch_file, validation_df=val_df), file_names)
+        tse_list = stitch_files(val_df)
         save_tse_filenames_to_list(tse_list, mode="hyp")
 
     if REF:
+        durations = dur.load_durations(file_names)
         tse_list = [
             TUSZ_DIR + file.replace(".edf", ".tse_bi")
-            for file in file_names
-            if lf.check_file_duration(file)
+            for file, check in zip(file_names, durations["check"])
+            if check
         ]
         new_list = copy_ref_files_to_folder(tse_list, "../scoring/" + SET + "_ref")
         save_tse_filenames_to_list(new_list, mode="ref")
 
+    if SWEEP:
+        # sweep.py imports this module
+        import post_processing.sweep as sw
 
+        results = sw.sweep(sw.load_sweep_data(VAL_FILE, PREDICTIONS))
+        results.to_csv(
+            "../scoring/" + SET + "_sweep_" + CLASSIFIER + "_" + SIM + ".csv",
+            index=False,
+        )
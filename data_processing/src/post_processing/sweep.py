@@ -0,0 +1,207 @@
+"""
+    This module sweeps the post-processing parameters (moving average window,
+    offset, minimum seizure length and time between seizures) and scores
+    every configuration in memory with the NEDC scoring algorithms, without
+    writing .tse files. Set SWEEP in post_process.py to run it.
+"""
+
+import itertools
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from tusz_data_processing.config import TUSZ_DIR, DATA_DIRECTORY
+import tusz_data_processing.durations as dur
+import post_processing.post_process as pp
+
+# the NEDC modules import each other by name
+NEDC_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "scoring", "nedc_eval_eeg"
+)
+if NEDC_DIR not in sys.path:
+    sys.path.append(NEDC_DIR)
+
+import nedc_eval_common as nec
+import nedc_eval_eeg as nee
+
+# default grids
+MOVING_WINDOWS = [1, 5, 10, 20]
+OFFSETS = [-0.2, -0.1, 0.0, 0.1, 0.2]
+MIN_SEIZ_LENGTHS = [0.0, 10.0, 25.0]
+TIMES_BETWEEN = [30.0, 60.0, 90.0]
+
+# parsed reference annotations, see nec.parse_files
+REF_CACHE_FILE = DATA_DIRECTORY + "/ref_annotations.npz"
+
+
+def load_sweep_data(val_file, prediction_file, cache=REF_CACHE_FILE, processes=1):
+    """Load the predictions and everything that is the same for all
+        configurations: the grouping by file, the file durations and the
+        reference annotations.
+
+    Args:
+        val_file (str): parquet file with the validation data
+        prediction_file (str): file with the classifier output
+        cache (str, optional): cache of the parsed reference annotations, None
+            to parse all files. Defaults to REF_CACHE_FILE.
+        processes (int, optional): number of processes parsing the reference
+            files, None for all cpus. Defaults to 1.
+
+    Returns:
+        tuple: (grouped_df, groups, durations, ref_anns), the rows of file i
+            (groups[i] = (file, start, stop)) are grouped_df.iloc[start:stop]
+    """
+    val_df = pp.load_classifier_results(val_file, prediction_file)
+    cols = ["start_time", "stop_time", "svm_output"]
+    grouped_df, groups = pp.group_by_file(val_df.loc[:, cols + ["filename"]])
+    grouped_df = grouped_df.loc[:, cols]
+
+    # only use the files with correct annotations (same as stitch_file)
+    durations = dur.load_durations([file for file, _, _ in groups])
+    groups = [group for group, check in zip(groups, durations["check"]) if check]
+    durations = durations.loc[durations["check"], "edf_duration"].tolist()
+    rows = np.concatenate([np.arange(start, stop) for _, start, stop in groups])
+    grouped_df = grouped_df.iloc[rows]
+    offsets = np.cumsum([0] + [stop - start for _, start, stop in groups])
+    groups = [
+        (file, offsets[i], offsets[i + 1]) for i, (file, _, _) in enumerate(groups)
+    ]
+
+    # the reference annotations are scored for every configuration: keep
+    # them as event tables
+    ref_anns = nec.make_event_tables(
+        nec.parse_files(
+            [TUSZ_DIR + file.replace(".edf", ".tse_bi") for file, _, _ in groups],
+            nproc=processes,
+            cache=cache,
+        )
+    )
+    return grouped_df, groups, durations, ref_anns
+
+
+def to_events(stitched_df: pd.DataFrame, ann_label="predicted_labels") -> list:
+    """Convert stitched annotations to NEDC events.
+
+    Args:
+        stitched_df (DataFrame): output of stitch_annotations
+
+    Returns:
+        list: [[start, stop, {label: probability}], ...]
+    """
+    return [
+        [float(start), float(stop), {label: float(prob)}]
+        for start, stop, label, prob in stitched_df.loc[
+            :, ["start_time", "stop_time", ann_label, "probability"]
+        ].itertuples(index=False)
+    ]
+
+
+def score_annotations(ref_anns, hyp_anns, scorers=("taes", "ovlp")) -> dict:
+    """Score hypothesis annotations in memory.
+
+    Args:
+        ref_anns (dict): {fname: [[start, stop, {label: prob}], ...]}
+        hyp_anns (dict): same as ref_anns
+        scorers (tuple, optional): scoring algorithms. Defaults to ("taes", "ovlp").
+
+    Returns:
+        dict: sensitivity, false alarms per 24h, precision and f1 score of
+            the seizures per scoring algorithm
+    """
+    results = nee.score(ref_anns, hyp_anns, scorers=scorers)
+    if results is None:
+        raise ValueError("Failed to score the annotations.")
+    return nee.get_metrics(results)
+
+
+# data shared with the pool workers, set by _init_sweep_worker
+_sweep_data = None
+
+
+def _init_sweep_worker(sweep_data):
+    global _sweep_data
+    _sweep_data = sweep_data
+
+
+def _sweep_smoothing(task):
+    """Score all stitching configurations for one smoothing configuration."""
+    window, offset, stitch_grid, scorers = task
+    grouped_df, groups, durations, ref_anns = _sweep_data
+    offsets = [0] + [stop for _, _, stop in groups]
+    df = pp.smooth_predictions(grouped_df.copy(), offsets, window, offset)
+
+    results = []
+    for min_seiz_length, time_between in stitch_grid:
+        hyp_anns = {}
+        for i, (file, start, stop) in enumerate(groups):
+            stitched_df = pp.stitch_annotations(
+                df.iloc[start:stop].copy(),
+                durations[i],
+                min_seiz_length=min_seiz_length,
+                time_between=time_between,
+            )
+            fname = os.path.splitext(os.path.basename(file))[0]
+            hyp_anns[fname] = to_events(stitched_df)
+        result = {
+            "moving_window": window,
+            "offset": offset,
+            "min_seiz_length": min_seiz_length,
+            "time_between": time_between,
+        }
+        result.update(score_annotations(ref_anns, hyp_anns, scorers))
+        results.append(result)
+    return results
+
+
+def sweep(
+    sweep_data,
+    moving_windows=MOVING_WINDOWS,
+    offsets=OFFSETS,
+    min_seiz_lengths=MIN_SEIZ_LENGTHS,
+    times_between=TIMES_BETWEEN,
+    scorers=("taes", "ovlp"),
+    processes=None,
+    classifier=pp.CLASSIFIER,
+) -> pd.DataFrame:
+    """Score all combinations of the post-processing parameters.
+
+    The smoothing configurations (window, offset) are divided over the
+    processes; each process smooths once and then stitches and scores all
+    (min_seiz_length, time_between) combinations. As in post_process.py, the
+    offset is only applied to the output of the tnkf classifier; for the
+    other classifiers only offset 0 is scored.
+
+    Args:
+        sweep_data (tuple): output of load_sweep_data
+        moving_windows (list, optional): lengths of the moving average filter.
+        offsets (list, optional): bias adjustments of the svm output.
+        min_seiz_lengths (list, optional): minimum seizure lengths (s).
+        times_between (list, optional): maximum time between stitched segments (s).
+        scorers (tuple, optional): scoring algorithms. Defaults to ("taes", "ovlp").
+        processes (int, optional): number of processes, 0 for sequential. Defaults to None (all cpus).
+        classifier (str, optional): "tnkf" or "lssvm". Defaults to pp.CLASSIFIER.
+
+    Returns:
+        DataFrame: one row per configuration with the scores
+    """
+    if classifier != "tnkf":
+        offsets = [0.0]
+    stitch_grid = list(itertools.product(min_seiz_lengths, times_between))
+    tasks = [
+        (window, offset, stitch_grid, scorers)
+        for window, offset in itertools.product(moving_windows, offsets)
+    ]
+    if processes == 0:
+        _init_sweep_worker(sweep_data)
+        results = [_sweep_smoothing(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(
+            processes, initializer=_init_sweep_worker, initargs=(sweep_data,)
+        ) as pool_obj:
+            results = pool_obj.map(_sweep_smoothing, tasks)
+
+    return pd.DataFrame([row for rows in results for row in rows])
+
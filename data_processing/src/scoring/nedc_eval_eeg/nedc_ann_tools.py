@@ -21,6 +21,11 @@
 #
 import os
 import sys
+import multiprocessing
+
+# import required third-party modules
+#
+import numpy as np
 
 # import required NEDC modules
 #
@@ -54,6 +59,21 @@ VERSIONS = [FTYPE_LBL, FTYPE_TSE]
 #
 DEF_CHANNEL = int(-1)
 
+# define the token that separates the lines in split_fields: it is not
+# whitespace, so it is kept as a separate field
+#
+DELIM_FIELDS_LINE = "\x00"
+
+# ---
+# define constants associated with the EventTable class
+#
+
+# define the table of interned symbols: the label of an event in an event
+# table is the index of its symbol in this list
+#
+SYMBOLS = []
+SYMBOL_IDS = {}
+
 # ---
 # define constants associated with the Annotation class
 #
@@ -325,6 +345,194 @@ def compare_durations(l1, l2):
     return True
 
 
+#
+# end of function
+
+# function: split_fields
+#
+# arguments:
+#  lines: a list of lines
+#  nfields: the number of whitespace separated fields per line
+#
+# return: a list with the nfields columns (lists of strings), None if the
+#         lines don't all have nfields fields
+#
+# This function splits all lines at once instead of line by line: the
+# lines are joined with a separator token and split on whitespace. every
+# line has nfields fields if and only if the separators are found after
+# every nfields fields. otherwise, the lines have to be parsed one by one.
+#
+def split_fields(lines, nfields):
+
+    # join the lines: the separator must not occur in the lines
+    #
+    if len(lines) == 0:
+        return [[] for i in range(nfields)]
+    nsep = len(lines) - 1
+    text = (nft.DELIM_SPACE + DELIM_FIELDS_LINE + nft.DELIM_SPACE).join(lines)
+    if text.count(DELIM_FIELDS_LINE) != nsep:
+        return None
+
+    # split the lines and check the number of fields of every line
+    #
+    fields = text.split()
+    if len(fields) != nfields * len(lines) + nsep:
+        return None
+    if fields[nfields :: nfields + 1].count(DELIM_FIELDS_LINE) != nsep:
+        return None
+
+    # exit gracefully
+    #
+    return [fields[i :: nfields + 1] for i in range(nfields)]
+
+
+#
+# end of function
+
+# function: to_floats
+#
+# arguments:
+#  column: a list of strings
+#
+# return: a list of floats (None if a string is not a number)
+#
+# This function converts a column of numbers in one step.
+#
+def to_floats(column):
+    try:
+        return np.array(column, dtype=np.float64).tolist()
+    except ValueError:
+        return None
+
+
+#
+# end of function
+
+# function: parse_tse_events
+#
+# arguments:
+#  text: the contents of a .tse file
+#
+# return: a list of events ([start, stop, {label: prob}]), None if the
+#         file is not in the regular form (one label per event)
+#
+# This function is the fast path of Tse::load: comment, version and blank
+# lines are removed (as in Tse::load) and the numeric columns are converted
+# at once. Files that are not in the regular form are left to Tse::load.
+#
+def parse_tse_events(text):
+
+    # throw away commented, blank lines, version lines: lines that start
+    #  with a digit are always kept
+    #
+    def keep(line):
+        check = line.replace(nft.DELIM_CARRIAGE, nft.DELIM_NULL).replace(
+            nft.DELIM_SPACE, nft.DELIM_NULL
+        )
+        return not (
+            check.startswith(nft.DELIM_COMMENT)
+            or check.startswith(nft.DELIM_VERSION)
+            or len(check) == 0
+        )
+
+    lines = [
+        line
+        for line in text.split(nft.DELIM_NEWLINE)
+        if line[:1].isdigit() or keep(line)
+    ]
+
+    # split the lines: start, stop, label and probability
+    #
+    columns = split_fields(lines, 4)
+    if columns == None:
+        return None
+    starts = to_floats(columns[0])
+    stops = to_floats(columns[1])
+    probs = to_floats(columns[3])
+    if (starts == None) or (stops == None) or (probs == None):
+        return None
+
+    # exit gracefully
+    #
+    return [
+        [start, stop, {label: prob}]
+        for start, stop, label, prob in zip(starts, stops, columns[2], probs)
+    ]
+
+
+#
+# end of function
+
+# function: load_file
+#
+# arguments:
+#  fname: an annotation filename
+#  level: the level value
+#  sublevel: the sublevel value
+#  channel: the channel value
+#
+# return: the events of the file (False if the file could not be loaded)
+#
+# This function loads the annotations of one file with a new annotation
+# object, such that it can be used in a worker process.
+#
+def load_file(fname, level=int(0), sublevel=int(0), channel=DEF_CHANNEL):
+
+    # load the annotations
+    #
+    ann = Ann()
+    if ann.load(fname) == False:
+        print(
+            "Error: %s (line: %s) %s: loading annotation for file (%s)"
+            % (__FILE__, ndt.__LINE__, ndt.__NAME__, fname)
+        )
+        return False
+
+    # exit gracefully: return the events
+    #
+    return ann.get(level, sublevel, channel)
+
+
+#
+# end of function
+
+# function: load_files
+#
+# arguments:
+#  flist: a list of filenames
+#  level: the level value
+#  sublevel: the sublevel value
+#  channel: the channel value
+#  nproc: the number of processes (None for all cpus)
+#
+# return: a list with the events of every file (False for the files that
+#         could not be loaded)
+#
+# This function loads a list of files, in parallel if nproc is not 1. The
+# files are divided over the processes in chunks of consecutive files and
+# the events are returned in the order of the list.
+#
+def load_files(flist, level=int(0), sublevel=int(0), channel=DEF_CHANNEL, nproc=1):
+
+    # load the files serially
+    #
+    args = [(fname, level, sublevel, channel) for fname in flist]
+    if nproc == None:
+        nproc = multiprocessing.cpu_count()
+    if (nproc == 1) or (len(args) < 2):
+        return [load_file(*arg) for arg in args]
+
+    # load the files in parallel:
+    #  nedc_eval_common imports this module, so it is imported here
+    #
+    import nedc_eval_common as nec
+
+    nproc = min(nproc, len(args))
+    chunksize = max(1, len(args) // (nproc * nec.NCHUNKS_PER_PROC))
+    with multiprocessing.Pool(nproc) as pool:
+        return pool.starmap(load_file, args, chunksize)
+
+
 #
 # end of function
 
@@ -332,12 +540,15 @@ def compare_durations(l1, l2):
 #
 # arguments:
 #  list: a list of filenames
+#  nproc: the number of processes (None for all cpus)
 #
 # return: a list of lists containing all the annotations
 #
 # This method loops through a list and collects all the annotations.
 #
-def load_annotations(flist, level=int(0), sublevel=int(0), channel=DEF_CHANNEL):
+def load_annotations(
+    flist, level=int(0), sublevel=int(0), channel=DEF_CHANNEL, nproc=1
+):
 
     # display an informational message
     #
@@ -347,34 +558,21 @@ def load_annotations(flist, level=int(0), sublevel=int(0), channel=DEF_CHANNEL):
             % (__FILE__, ndt.__LINE__, ndt.__NAME__)
         )
 
-    # create an annotation object
+    # load the files
     #
-    events = []
-    ann = Ann()
+    events = load_files(flist, level, sublevel, channel, nproc)
 
-    # loop over the list
+    # check the events
     #
-    for fname in flist:
-
-        # load the annotations
-        #
-        if ann.load(fname) == False:
-            print(
-                "Error: %s (line: %s) %s: loading annotation for file (%s)"
-                % (__FILE__, ndt.__LINE__, ndt.__NAME__, fname)
-            )
+    for fname, events_tmp in zip(flist, events):
+        if events_tmp == False:
             return None
-
-        # get the events
-        #
-        events_tmp = ann.get(level, sublevel, channel)
         if events_tmp == None:
             print(
                 "Error: %s (line: %s) %s: error getting annotation (%s)"
                 % (__FILE__, ndt.__LINE__, ndt.__NAME__, fname)
             )
             return None
-        events.append(events_tmp)
 
     # exit gracefully
     #
@@ -859,6 +1057,218 @@ class AnnGr:
 #
 # end of class
 
+# function: intern_symbol
+#
+# arguments:
+#  sym: a symbol (label)
+#
+# return: the index of the symbol in SYMBOLS
+#
+# This function adds a symbol to the table of interned symbols (if it is
+# not in it yet).
+#
+def intern_symbol(sym):
+    idx = SYMBOL_IDS.get(sym)
+    if idx == None:
+        idx = len(SYMBOLS)
+        SYMBOLS.append(sym)
+        SYMBOL_IDS[sym] = idx
+    return idx
+
+
+#
+# end of function
+
+# class: EventTable
+#
+# This class holds the events of one channel as a table of arrays instead
+# of a list of [start, stop, {label: prob}] lists: the start and stop
+# times (float64), the interned labels (int16, see intern_symbol) and the
+# probabilities (float32). The labels can be mapped through a scoring map
+# when the table is created, such that the scoring algorithms don't have
+# to map every event.
+#
+class EventTable:
+
+    __slots__ = ("start_d", "stop_d", "label_d", "prob_d", "symbols_d", "pmap_d")
+
+    # method: EventTable::constructor
+    #
+    # arguments:
+    #  starts: the start times of the events
+    #  stops: the stop times of the events
+    #  labels: the interned labels of the events
+    #  probs: the probabilities of the events
+    #  pmap: the scoring map the labels are mapped with (None if the
+    #        labels are not mapped)
+    #
+    # return: none
+    #
+    def __init__(self, starts, stops, labels, probs, pmap=None):
+        self.start_d = np.asarray(starts, dtype=np.float64)
+        self.stop_d = np.asarray(stops, dtype=np.float64)
+        self.label_d = np.asarray(labels, dtype=np.int16)
+        self.prob_d = np.asarray(probs, dtype=np.float32)
+        self.symbols_d = SYMBOLS
+        self.pmap_d = pmap
+
+    #
+    # end of method
+
+    # method: EventTable::__len__
+    #
+    def __len__(self):
+        return len(self.start_d)
+
+    #
+    # end of method
+
+    # method: EventTable::__getitem__
+    #
+    # arguments:
+    #  idx: the index of an event
+    #
+    # return: the event as [start, stop, {label: prob}]
+    #
+    def __getitem__(self, idx):
+        return [
+            self.start_d[idx].item(),
+            self.stop_d[idx].item(),
+            {self.symbols_d[self.label_d[idx]]: self.prob_d[idx].item()},
+        ]
+
+    #
+    # end of method
+
+    # method: EventTable::__getstate__/__setstate__
+    #
+    # The symbols are pickled with the table (e.g. for a worker process),
+    # they are interned again when the table is unpickled.
+    #
+    def __getstate__(self):
+        symbols = list(self.symbols_d)
+        return (
+            self.start_d,
+            self.stop_d,
+            self.label_d,
+            self.prob_d,
+            symbols,
+            self.pmap_d,
+        )
+
+    def __setstate__(self, state):
+        self.start_d, self.stop_d, labels, self.prob_d, symbols, self.pmap_d = state
+        ids = np.array([intern_symbol(sym) for sym in symbols], dtype=np.int16)
+        self.label_d = ids[labels] if len(ids) > 0 else labels
+        self.symbols_d = SYMBOLS
+
+    #
+    # end of method
+
+    # method: EventTable::get
+    #
+    # arguments: none
+    #
+    # return: the events as a list of [start, stop, {label: prob}]
+    #
+    def get(self):
+        return [
+            [start, stop, {self.symbols_d[label]: prob}]
+            for start, stop, label, prob in zip(
+                self.start_d.tolist(),
+                self.stop_d.tolist(),
+                self.label_d.tolist(),
+                self.prob_d.tolist(),
+            )
+        ]
+
+    #
+    # end of method
+
+    # method: EventTable::get_events
+    #
+    # arguments:
+    #  pmap: a scoring map (None to not map the labels)
+    #
+    # return: the events as a list of [start, stop, label, prob], the
+    #         form the scoring algorithms use
+    #
+    # The labels are mapped per symbol instead of per event.
+    #
+    def get_events(self, pmap=None):
+        symbols = self.symbols_d
+        if (pmap != None) and (self.pmap_d == None):
+            symbols = {
+                label: pmap[self.symbols_d[label]]
+                for label in np.unique(self.label_d).tolist()
+            }
+        elif (pmap != None) and (self.pmap_d != pmap):
+            raise ValueError("the events are mapped with another scoring map")
+        return [
+            [start, stop, symbols[label], prob]
+            for start, stop, label, prob in zip(
+                self.start_d.tolist(),
+                self.stop_d.tolist(),
+                self.label_d.tolist(),
+                self.prob_d.tolist(),
+            )
+        ]
+
+    #
+    # end of method
+
+    # method: EventTable::nbytes
+    #
+    # arguments: none
+    #
+    # return: the number of bytes of the arrays
+    #
+    def nbytes(self):
+        return (
+            self.start_d.nbytes
+            + self.stop_d.nbytes
+            + self.label_d.nbytes
+            + self.prob_d.nbytes
+        )
+
+    #
+    # end of method
+
+
+#
+# end of class
+
+# function: make_event_table
+#
+# arguments:
+#  events: a list of events ([start, stop, {label: prob}])
+#  pmap: a scoring map (None to not map the labels)
+#
+# return: an EventTable
+#
+# This function converts a list of events to an event table. Only the first
+# label of an event is kept (as the scoring algorithms do).
+#
+def make_event_table(events, pmap=None):
+    labels = []
+    probs = []
+    for event in events:
+        key = next(iter(event[2]))
+        sym = key if pmap == None else pmap[key]
+        labels.append(intern_symbol(sym))
+        probs.append(event[2][key])
+    return EventTable(
+        [event[0] for event in events],
+        [event[1] for event in events],
+        labels,
+        probs,
+        pmap,
+    )
+
+
+#
+# end of function
+
 # class: Tse
 #
 # This class contains methods to manipulate time-synchronous event files.
@@ -903,62 +1313,71 @@ class Tse:
                 % (__FILE__, ndt.__LINE__, ndt.__NAME__)
             )
 
-        # open file
+        # read the file and try the fast path: all events have one label
         #
         with open(fname, "r") as fp:
+            text = fp.read()
 
-            # loop over lines in file
+        events = parse_tse_events(text)
+        if events != None:
+            if len(events) > 0:
+                graph = self.graph_d.get_graph()
+                graph = graph.setdefault(int(0), {}).setdefault(int(0), {})
+                graph.setdefault(int(-1), []).extend(events)
+            return True
+
+        # loop over lines in file
+        #
+        for line in text.split(nft.DELIM_NEWLINE):
+
+            # clean up the line
             #
-            for line in fp:
+            line = line.replace(nft.DELIM_NEWLINE, nft.DELIM_NULL).replace(
+                nft.DELIM_CARRIAGE, nft.DELIM_NULL
+            )
+            check = line.replace(nft.DELIM_SPACE, nft.DELIM_NULL)
 
-                # clean up the line
-                #
-                line = line.replace(nft.DELIM_NEWLINE, nft.DELIM_NULL).replace(
-                    nft.DELIM_CARRIAGE, nft.DELIM_NULL
-                )
-                check = line.replace(nft.DELIM_SPACE, nft.DELIM_NULL)
+            # throw away commented, blank lines, version lines
+            #
+            if (
+                check.startswith(nft.DELIM_COMMENT)
+                or check.startswith(nft.DELIM_VERSION)
+                or len(check) == 0
+            ):
+                continue
+
+            # split the line
+            #
+            val = {}
+            parts = line.split()
 
-                # throw away commented, blank lines, version lines
-                #
-                if (
-                    check.startswith(nft.DELIM_COMMENT)
-                    or check.startswith(nft.DELIM_VERSION)
-                    or len(check) == 0
-                ):
-                    continue
-
-                # split the line
+            try:
+                # loop over every part, starting after start/stop times
                 #
-                val = {}
-                parts = line.split()
+                for i in range(2, len(parts), 2):
 
-                try:
-                    # loop over every part, starting after start/stop times
+                    # create dict with label as key, prob as value
                     #
-                    for i in range(2, len(parts), 2):
-
-                        # create dict with label as key, prob as value
-                        #
-                        val[parts[i]] = float(parts[i + 1])
+                    val[parts[i]] = float(parts[i + 1])
 
-                    # create annotation in AG
-                    #
-                    self.graph_d.create(
-                        int(0), int(0), int(-1), float(parts[0]), float(parts[1]), val
-                    )
-                except:
-                    print(
-                        "Error: %s (line: %s) %s::%s %s (%s)"
-                        % (
-                            __FILE__,
-                            ndt.__LINE__,
-                            Tse.__CLASS_NAME__,
-                            ndt.__NAME__,
-                            "invalid annotation",
-                            line,
-                        )
+                # create annotation in AG
+                #
+                self.graph_d.create(
+                    int(0), int(0), int(-1), float(parts[0]), float(parts[1]), val
+                )
+            except:
+                print(
+                    "Error: %s (line: %s) %s::%s %s (%s)"
+                    % (
+                        __FILE__,
+                        ndt.__LINE__,
+                        Tse.__CLASS_NAME__,
+                        ndt.__NAME__,
+                        "invalid annotation",
+                        line,
                     )
-                    return False
+                )
+                return False
 
         # make sure graph is sorted after loading
         #
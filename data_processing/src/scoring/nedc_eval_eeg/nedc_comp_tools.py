@@ -16,9 +16,15 @@
 #
 import os
 import sys
+import heapq
+
+# import required third-party modules
+#
+import numpy as np
 
 # import required NEDC modules
 #
+import nedc_ann_tools as nat
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -73,52 +79,103 @@ def sort_dict(odict):
 # end of function
 
 
-# function: parse_ref
+# function: parse_events
 #
 # arguments:
 #  f_cont: the file content tokenized by newline
+#  nfields: the number of required fields (fname, start, stop and, for
+#           ref files, the label), an optional confidence can follow
 #
-# return: event dictionary and duration dictionary
+# return: a list of events: the required fields (start and stop as
+#         floats) followed by the confidence
 #
-# This function parses through the ref file and creates
-# a dictionary mapping between files and their events
-# i.e {'00000258_s002_t000': [[0.0, 10.0, 'bckg', 1.00]..] ... }
-# it also returns a duration dictionary with a key/value pair of
-# file/duration
+# This function parses the lines of a ref or hyp file. If all lines have
+# the same number of fields, the lines are split at once and the times
+# and confidences are converted per column (see nat.split_fields).
+# Otherwise the lines are parsed one by one: lines with too few fields
+# are skipped, the confidence is only used if there is exactly one
+# field more than required.
 #
-def parse_ref(f_cont):
+def parse_events(f_cont, nfields):
 
-    # instatiate the event dictionary
+    # the fast path: all lines have (nfields + 1) or nfields fields
     #
-    odict = {}
+    lines = [line for line in f_cont if len(line.strip()) > 0]
+    for ncols in (nfields + 1, nfields):
+        columns = nat.split_fields(lines, ncols)
+        if columns == None:
+            continue
+        starts = nat.to_floats(columns[1])
+        stops = nat.to_floats(columns[2])
+        if ncols > nfields:
+            confs = nat.to_floats(columns[nfields])
+        else:
+            confs = [DEF_CONF] * len(lines)
+        if (starts == None) or (stops == None) or (confs == None):
+            break
+        return [
+            list(event)
+            for event in zip(columns[0], starts, stops, *columns[3:nfields], confs)
+        ]
 
-    # for each line in the file
+    # parse the lines one by one
     #
+    events = []
     for line in f_cont:
 
-        # split the line by whitespace
+        # split the line by whitespace and ensure we have the
+        # required fields
         #
         tokenized = line.split()
-
-        # ensure we have at least fname start stop lbl
-        #
-        if len(tokenized) < 4:
+        if len(tokenized) < nfields:
             continue
 
-        # collect required values
-        #
-        fname, start, stop, lbl = tokenized[:4]
-
         # if we have a confidence value
         #
-        if len(tokenized) == 5:
-            conf = float(tokenized[4])
+        if len(tokenized) == nfields + 1:
+            conf = float(tokenized[nfields])
         else:
             conf = DEF_CONF
 
         # convert start stop to float
         #
-        start, stop = float(start), float(stop)
+        events.append(
+            [tokenized[0], float(tokenized[1]), float(tokenized[2])]
+            + tokenized[3:nfields]
+            + [conf]
+        )
+
+    # exit gracefully
+    #
+    return events
+
+
+#
+# end of function
+
+
+# function: parse_ref
+#
+# arguments:
+#  f_cont: the file content tokenized by newline
+#
+# return: event dictionary and duration dictionary
+#
+# This function parses through the ref file and creates
+# a dictionary mapping between files and their events
+# i.e {'00000258_s002_t000': [[0.0, 10.0, 'bckg', 1.00]..] ... }
+# it also returns a duration dictionary with a key/value pair of
+# file/duration
+#
+def parse_ref(f_cont):
+
+    # instatiate the event dictionary
+    #
+    odict = {}
+
+    # for each event in the file
+    #
+    for fname, start, stop, lbl, conf in parse_events(f_cont, 4):
 
         # if this is a new file
         #
@@ -303,33 +360,9 @@ def parse_hyp(f_cont, duration_dict):
     #
     odict = {}
 
-    # for each line in the file
+    # for each event in the file
     #
-    for line in f_cont:
-
-        # tokenize the line by whitespace
-        #
-        tokenized = line.split()
-
-        # ensure we have at least fname, start, stop
-        #
-        if len(tokenized) < 3:
-            continue
-
-        # collect the required values
-        #
-        fname, start, stop = tokenized[:3]
-
-        # if we have a confidence value
-        #
-        if len(tokenized) == 4:
-            conf = float(tokenized[3])
-        else:
-            conf = DEF_CONF
-
-        # convert start/stop to floats
-        #
-        start, stop = float(start), float(stop)
+    for fname, start, stop, conf in parse_events(f_cont, 3):
 
         # if this file was not in the dictionary
         #
@@ -446,8 +479,92 @@ def fix_overlaps(f_dict):
 # This method checks for overlaps between events and returns
 #  indices of overlapping events (excluding first occurrence)
 #
+# An event is marked if it overlaps with an event that comes before it in
+# the list. The events are ordered by the first event they overlap with
+# (the order of count_ovlps_reference). The first overlapping event is
+# found by a sweep over the events sorted by start time: the minimum
+# index of the events that contain the start time of an event (a heap of
+# active events) and of the events that start inside the event (a range
+# minimum over the sorted events).
+#
 def count_ovlps(f_events):
 
+    # the sweep assumes that all events have a positive duration: fall
+    # back to the pairwise comparison otherwise
+    #
+    starts = np.array([event[0] for event in f_events], dtype=float)
+    stops = np.array([event[1] for event in f_events], dtype=float)
+    if not np.all(starts < stops):
+        return count_ovlps_reference(f_events)
+    nevents = len(f_events)
+    if nevents == 0:
+        return []
+
+    # sort the events by start time
+    #
+    order = np.argsort(starts, kind="stable")
+    sorted_starts = starts[order]
+    first = np.arange(nevents)
+
+    # events that contain the start time of an event: the active events
+    #  (start <= start time < stop) are kept in a heap by index, and the
+    #  events that stopped are removed when they reach the top
+    #
+    active = []
+    pos = 0
+    while pos < nevents:
+        start = sorted_starts[pos]
+        end = pos
+        while end < nevents and sorted_starts[end] == start:
+            heapq.heappush(active, int(order[end]))
+            end += 1
+        while stops[active[0]] <= start:
+            heapq.heappop(active)
+        first[order[pos:end]] = active[0]
+        pos = end
+
+    # events that start inside an event (start < start time < stop): a
+    #  range minimum query over the events sorted by start time
+    #
+    lo = np.searchsorted(sorted_starts, starts, side="right")
+    hi = np.searchsorted(sorted_starts, stops, side="left")
+    table = [order]
+    while (1 << len(table)) <= nevents:
+        width = 1 << (len(table) - 1)
+        table.append(np.minimum(table[-1][:-width], table[-1][width:]))
+    sel = np.flatnonzero(lo < hi)
+    level = np.log2(hi[sel] - lo[sel]).astype(int)
+    for k in np.unique(level):
+        rows = sel[level == k]
+        inside = np.minimum(table[k][lo[rows]], table[k][hi[rows] - (1 << int(k))])
+        first[rows] = np.minimum(first[rows], inside)
+
+    # the marked events, ordered by the first event they overlap with
+    #
+    marked = np.flatnonzero(first < np.arange(nevents))
+    marked = marked[np.lexsort((marked, first[marked]))]
+
+    # return gracefully
+    #
+    return [int(idx) for idx in marked]
+
+
+# end of method
+#
+
+# function: count_ovlps_reference
+#
+# arguments:
+#  f_events: list of events related to a file with confidence
+#
+# return:
+#  overlap_events: list of event indices marked for deletion.
+#
+# This method is the pairwise comparison of all events, the reference for
+# count_ovlps (it also handles events without a positive duration).
+#
+def count_ovlps_reference(f_events):
+
     # initialize variables
     #
     overlap_events = []
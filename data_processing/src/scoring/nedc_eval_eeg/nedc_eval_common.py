@@ -18,6 +18,12 @@
 #
 import os
 import sys
+import multiprocessing
+import zipfile
+
+# import required third-party modules
+#
+import numpy as np
 
 # import nedc_modules
 #
@@ -52,6 +58,21 @@ PARAM_MAP = "MAP"
 #
 FILE_EXT = ".tse"
 
+# define the counters that the scoring algorithms accumulate per file
+#
+COUNTERS = ["tgt_d", "hit_d", "mis_d", "fal_d", "ins_d", "del_d", "sub_d"]
+COUNTER_DUR = "total_dur_d"
+
+# define the number of chunks of files per process when files are loaded
+# or scored in parallel (also used by nedc_ann_tools)
+#
+NCHUNKS_PER_PROC = int(4)
+
+# define the version of the format of the annotation cache (see
+# write_cache): caches with another version are not used
+#
+CACHE_VERSION = int(1)
+
 # ------------------------------------------------------------------------------
 #
 # functions are listed here
@@ -319,6 +340,147 @@ def print_table(title, headers, data, fmt_lab, fmt_cnt, fmt_pct, fp):
     return True
 
 
+#
+# end of function
+
+# function: get_stamp
+#
+# arguments:
+#  fname: a filename
+#
+# return: the modification time (ns) and the size of the file (None if the
+#         file does not exist)
+#
+def get_stamp(fname):
+    try:
+        stat = os.stat(fname)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+#
+# end of function
+
+# function: read_cache
+#
+# arguments:
+#  cfile: an annotation cache file (see write_cache)
+#
+# return: a dictionary with the stamp (see get_stamp) and the events of
+#         every file in the cache: {path: (stamp, events)}
+#
+# This function reads an annotation cache. A missing or invalid cache is
+# read as an empty cache.
+#
+def read_cache(cfile):
+
+    # check the file
+    #
+    if (cfile == None) or (not os.path.isfile(cfile)):
+        return {}
+
+    # read the arrays
+    #
+    try:
+        with np.load(cfile, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        if int(arrays["version"]) != CACHE_VERSION:
+            return {}
+        paths = [path.decode() for path in arrays["paths"].tolist()]
+        stamps = arrays["stamps"].tolist()
+        nevents = arrays["nevents"].tolist()
+        starts = arrays["starts"].tolist()
+        stops = arrays["stops"].tolist()
+        nlabels = arrays["nlabels"].tolist()
+        labels = arrays["symbols"][arrays["labels"]].tolist()
+        probs = arrays["probs"].tolist()
+    except (OSError, ValueError, KeyError, IndexError, zipfile.BadZipFile):
+        print(
+            "Warning: %s (line: %s) %s: %s (%s)"
+            % (__FILE__, ndt.__LINE__, ndt.__NAME__, "ignoring invalid cache", cfile)
+        )
+        return {}
+
+    # convert the arrays to events:
+    #  an event has nlabels labels and probabilities
+    #
+    events = []
+    j = 0
+    for start, stop, n in zip(starts, stops, nlabels):
+        events.append([start, stop, dict(zip(labels[j : j + n], probs[j : j + n]))])
+        j += n
+
+    # split the events per file
+    #
+    entries = {}
+    i = 0
+    for path, stamp, n in zip(paths, stamps, nevents):
+        entries[path] = (tuple(stamp), events[i : i + n])
+        i += n
+
+    # exit gracefully
+    #
+    return entries
+
+
+#
+# end of function
+
+# function: write_cache
+#
+# arguments:
+#  entries: a dictionary with the stamp and the events of every file (see
+#           read_cache)
+#  cfile: an annotation cache file
+#
+# return: none
+#
+# This function writes an annotation cache. The events of all files are
+# stored as flat arrays in a numpy archive: the start and stop times, the
+# number of labels per event, the labels (as indices in a table of
+# symbols) and the probabilities. The file is replaced at once, such that
+# a process that reads the cache never sees a partially written file.
+#
+def write_cache(entries, cfile):
+
+    # flatten the events
+    #
+    paths = sorted(entries)
+    events = [event for path in paths for event in entries[path][1]]
+    symbols = {}
+    labels = []
+    probs = []
+    for event in events:
+        for label, prob in event[2].items():
+            labels.append(symbols.setdefault(label, len(symbols)))
+            probs.append(prob)
+
+    arrays = {
+        "version": np.array(CACHE_VERSION),
+        "paths": np.array([path.encode() for path in paths], dtype=bytes),
+        "stamps": np.array(
+            [entries[path][0] for path in paths], dtype=np.int64
+        ).reshape(-1, 2),
+        "nevents": np.array([len(entries[path][1]) for path in paths], dtype=np.int64),
+        "starts": np.array([event[0] for event in events], dtype=np.float64),
+        "stops": np.array([event[1] for event in events], dtype=np.float64),
+        "nlabels": np.array([len(event[2]) for event in events], dtype=np.int32),
+        "symbols": np.array(list(symbols), dtype=str),
+        "labels": np.array(labels, dtype=np.int32),
+        "probs": np.array(probs, dtype=np.float64),
+    }
+
+    # write the arrays to a temporary file and replace the cache
+    #
+    cdir = os.path.dirname(os.path.abspath(cfile))
+    os.makedirs(cdir, exist_ok=True)
+    tmp = "%s.%d.tmp" % (cfile, os.getpid())
+    with open(tmp, "wb") as fp:
+        np.savez(fp, **arrays)
+    os.replace(tmp, cfile)
+
+
 #
 # end of function
 
@@ -326,6 +488,8 @@ def print_table(title, headers, data, fmt_lab, fmt_cnt, fmt_pct, fp):
 #
 # arguments:
 #  reflist: list of hypothesis or reference files
+#  nproc: the number of processes that load the files (None for all cpus)
+#  cache: an annotation cache file (None to not use a cache)
 #
 # return:
 #  odict: dictionary with unique filename sequence as key and list of
@@ -334,7 +498,12 @@ def print_table(title, headers, data, fmt_lab, fmt_cnt, fmt_pct, fp):
 # This function parses each file in a list of reference files into a dictionary
 #  format with file names as keys.
 #
-def parse_files(files):
+# If a cache is given, the files that are in the cache and have not been
+# modified since (same modification time and size) are not parsed. The
+# other files are parsed and added to the cache. This is meant for
+# reference annotations, which are scored against many hypotheses.
+#
+def parse_files(files, nproc=1, cache=None):
 
     # display informational message
     #
@@ -345,14 +514,29 @@ def parse_files(files):
 
     # declare local variables
     #
-    ann = nat.Ann()
     odict = {}
 
-    # load hypothesis annotations
+    # get the events of the files that did not change from the cache
     #
-    for i in range(len(files)):
+    anns = [False] * len(files)
+    missing = list(range(len(files)))
+    if cache != None:
+        entries = read_cache(cache)
+        paths = [os.path.abspath(fname) for fname in files]
+        stamps = [get_stamp(path) for path in paths]
+        missing = []
+        for i in range(len(files)):
+            entry = entries.get(paths[i], None)
+            if (stamps[i] != None) and (entry != None) and (entry[0] == stamps[i]):
+                anns[i] = entry[1]
+            else:
+                missing.append(i)
 
-        if ann.load(files[i]) == False:
+    # load the other annotations
+    #
+    events = nat.load_files([files[i] for i in missing], nproc=nproc)
+    for i, events_tmp in zip(missing, events):
+        if events_tmp == False:
             print(
                 "Error: %s (line: %s) %s: %s (%s)"
                 % (
@@ -364,10 +548,23 @@ def parse_files(files):
                 )
             )
             return False
+        anns[i] = events_tmp
+
+    # add the loaded annotations to the cache
+    #
+    if (cache != None) and (len(missing) > 0):
+        for i in missing:
+            if stamps[i] != None:
+                entries[paths[i]] = (stamps[i], anns[i])
+        write_cache(entries, cache)
+
+    # loop over the files
+    #
+    for i in range(len(files)):
 
         # get reference events
         #
-        events = ann.get()
+        events = anns[i]
 
         # store full file path to parse for sequence unique to each file
         #
@@ -402,6 +599,530 @@ def parse_files(files):
     return odict
 
 
+#
+# end of function
+
+# class: Intervals
+#
+# This class finds the intervals that overlap with a query interval. The
+# intervals are stored in a centered interval tree: every node keeps the
+# intervals that contain its center, sorted by start and by stop time,
+# the intervals that stop before the center are in the left subtree and
+# those that start after it in the right subtree. A query only visits the
+# paths to both ends of the query interval and the nodes in between (whose
+# intervals all overlap), and only scans the intervals of a node that
+# overlap, such that it costs O(log(n) + k) (k: the number of overlapping
+# intervals), also for nested intervals.
+#
+class Intervals:
+
+    # method: Intervals::constructor
+    #
+    # arguments:
+    #  starts: the start times of the intervals
+    #  stops: the stop times of the intervals
+    #  ids: the identifiers that are returned (default: the positions)
+    #
+    # return: none
+    #
+    def __init__(self, starts, stops, ids=None):
+        if ids == None:
+            ids = range(len(starts))
+        intervals = sorted(zip(starts, stops, ids), key=lambda ivl: ivl[0])
+        self.root_d = self.build(intervals)
+
+    #
+    # end of method
+
+    # method: Intervals::build
+    #
+    # arguments:
+    #  intervals: a list of (start, stop, id) sorted by start time
+    #
+    # return: a node [center, by_start, by_stop, left, right] (None if
+    #         there are no intervals)
+    #
+    # The center is the median start time, so every subtree has at most
+    # half of the intervals of its parent. Intervals that stop before they
+    # start are kept in a leaf if they can't be split.
+    #
+    def build(self, intervals):
+        if len(intervals) == 0:
+            return None
+
+        center = intervals[len(intervals) // 2][0]
+        left = [ivl for ivl in intervals if ivl[1] < center]
+        if len(left) == len(intervals):
+            left, here, right = [], intervals, []
+        else:
+            here = [ivl for ivl in intervals if ivl[0] <= center <= ivl[1]]
+            right = [ivl for ivl in intervals if ivl[0] > center and ivl[1] >= center]
+
+        return [
+            center,
+            here,
+            sorted(here, key=lambda ivl: ivl[1], reverse=True),
+            self.build(left),
+            self.build(right),
+        ]
+
+    #
+    # end of method
+
+    # method: Intervals::find
+    #
+    # arguments:
+    #  start: the start time of the query interval
+    #  stop: the stop time of the query interval
+    #  strict: if True, intervals that only touch the query interval
+    #          do not overlap
+    #
+    # return: the sorted identifiers of the overlapping intervals, i.e.
+    #         (start_i <= stop and stop_i >= start) or, if strict,
+    #         (start_i < stop and stop_i > start)
+    #
+    def find(self, start, stop, strict=False):
+        if strict:
+            before = lambda a, b: a < b
+        else:
+            before = lambda a, b: a <= b
+
+        ids = []
+        nodes = [self.root_d]
+        while nodes:
+            node = nodes.pop()
+            if node == None:
+                continue
+            center, by_start, by_stop, left, right = node
+
+            # scan the intervals of the node from the end that is nearest
+            # to the query interval, until they can't overlap anymore
+            #
+            if start <= center:
+                for ivl in by_start:
+                    if not before(ivl[0], stop):
+                        break
+                    if before(start, ivl[1]):
+                        ids.append(ivl[2])
+            else:
+                for ivl in by_stop:
+                    if not before(start, ivl[1]):
+                        break
+                    if before(ivl[0], stop):
+                        ids.append(ivl[2])
+
+            # the left subtree stops before the center and the right
+            # subtree starts after it
+            #
+            if start < center:
+                nodes.append(left)
+            if center < stop:
+                nodes.append(right)
+
+        return sorted(ids)
+
+    #
+    # end of method
+
+
+# function: map_events
+#
+# arguments:
+#  events: a list of events ([start, stop, {label: prob}]) or an event
+#          table (nat.EventTable)
+#  pmap: the scoring map
+#
+# return: a list of [start, stop, label, prob] with the mapped labels
+#
+# This function maps the annotations before scoring: only the first label
+# of an event is kept. The labels of an event table are mapped per symbol
+# (or not at all if the table is mapped with the same scoring map).
+#
+def map_events(events, pmap):
+    if isinstance(events, nat.EventTable):
+        return events.get_events(pmap)
+
+    ann = []
+    for event in events:
+        key = next(iter(event[2]))
+        ann.append([event[0], event[1], pmap[key], event[2][key]])
+    return ann
+
+
+#
+# end of function
+
+
+# function: make_event_tables
+#
+# arguments:
+#  anns: a dictionary with lists of events per file (see parse_files)
+#  pmap: the scoring map (None to not map the labels)
+#
+# return: a dictionary with an event table (nat.EventTable) per file
+#
+# This function converts the annotations to event tables once, e.g. after
+# loading, so the labels are mapped once for all scoring algorithms.
+#
+def make_event_tables(anns, pmap=None):
+    return {fname: nat.make_event_table(events, pmap) for fname, events in anns.items()}
+
+
+#
+# end of function
+
+
+# function: event_arrays
+#
+# arguments:
+#  events: a list of events ([start, stop, label])
+#  codes: a dictionary that maps the labels to integer codes, new labels
+#         are added to it
+#
+# return:
+#  starts: an array of start times
+#  stops: an array of stop times
+#  labels: an array of integer label codes
+#
+# This function converts a list of events to arrays.
+#
+def event_arrays(events, codes):
+    starts = np.array([event[0] for event in events], dtype=float)
+    stops = np.array([event[1] for event in events], dtype=float)
+    labels = np.array(
+        [codes.setdefault(event[2], len(codes)) for event in events], dtype=int
+    )
+    return starts, stops, labels
+
+
+#
+# end of function
+
+
+# function: any_overlap
+#
+# arguments:
+#  events: the (starts, stops, labels) arrays of the events
+#  queries: the (starts, stops, labels) arrays of the query intervals
+#
+# return: a boolean array, True if an event with the same label overlaps
+#         partially with the query interval (stop > start of the query and
+#         start < stop of the query)
+#
+# This function sorts the events of each label by start time. The events
+# that start before the stop time of a query are a prefix of the sorted
+# events, so a query overlaps if the maximum stop time of that prefix is
+# larger than its start time.
+#
+def any_overlap(events, queries):
+    starts, stops, labels = events
+    qstarts, qstops, qlabels = queries
+    found = np.zeros(len(qstarts), dtype=bool)
+    for label in np.intersect1d(labels, qlabels):
+        sel = labels == label
+        order = np.argsort(starts[sel], kind="stable")
+        lstarts = starts[sel][order]
+        maxstops = np.maximum.accumulate(stops[sel][order])
+        qsel = np.flatnonzero(qlabels == label)
+        ends = np.searchsorted(lstarts, qstops[qsel], side="left")
+        ovlp = ends > 0
+        ovlp[ovlp] = maxstops[ends[ovlp] - 1] > qstarts[qsel][ovlp]
+        found[qsel] = ovlp
+    return found
+
+
+#
+# end of function
+
+
+# function: zero_counts
+#
+# arguments:
+#  counts: a counter or a (nested) dictionary of counters
+#
+# return: a copy of the counters that are set to zero (of the same type)
+#
+def zero_counts(counts):
+    if isinstance(counts, dict):
+        return {key: zero_counts(val) for key, val in counts.items()}
+    return type(counts)(0)
+
+
+#
+# end of function
+
+# function: get_counts
+#
+# arguments:
+#  scorer: a scoring object
+#
+# return: a dictionary with the counters of the scoring object (see
+#         COUNTERS and COUNTER_DUR)
+#
+def get_counts(scorer):
+    counts = {name: getattr(scorer, name) for name in COUNTERS if hasattr(scorer, name)}
+    counts[COUNTER_DUR] = getattr(scorer, COUNTER_DUR)
+    return counts
+
+
+#
+# end of function
+
+# function: set_counts
+#
+# arguments:
+#  scorer: a scoring object
+#  counts: a dictionary with counters (see get_counts)
+#
+# return: none
+#
+def set_counts(scorer, counts):
+    for name, val in counts.items():
+        setattr(scorer, name, val)
+
+
+#
+# end of function
+
+# function: add_counts
+#
+# arguments:
+#  totals: a counter or a (nested) dictionary of counters
+#  counts: counters with the same structure
+#
+# return: the sum of the counters (dictionaries are updated in place)
+#
+def add_counts(totals, counts):
+    if isinstance(totals, dict):
+        for key, val in counts.items():
+            totals[key] = add_counts(totals[key], val)
+        return totals
+    return totals + counts
+
+
+#
+# end of function
+
+# function: score_chunk
+#
+# arguments:
+#  scorer: a scoring object (after init_score)
+#  files_ref: the reference annotations
+#  files_hyp: the hypothesis annotations
+#  chunk: a list of (index, file name)
+#
+# return: a list with the per file results and the partial counts of
+#         every file (None if an error occurred)
+#
+# Every file is scored with zero counters, the counters of the scoring
+# object are left at zero.
+#
+def score_chunk(scorer, files_ref, files_hyp, chunk):
+    zeros = zero_counts(get_counts(scorer))
+    results = []
+    for i, fname in chunk:
+        set_counts(scorer, zero_counts(zeros))
+        output = scorer.score_file(i, fname, files_ref[fname], files_hyp[fname])
+        if output == None:
+            return None
+        results.append((output, get_counts(scorer)))
+    set_counts(scorer, zeros)
+    return results
+
+
+#
+# end of function
+
+# declare the data shared with the scoring processes (see init_worker)
+#
+worker_data = None
+
+# function: init_worker
+#
+# arguments:
+#  scorer: a scoring object (after init_score)
+#  files_ref: the reference annotations
+#  files_hyp: the hypothesis annotations
+#
+# return: none
+#
+def init_worker(scorer, files_ref, files_hyp):
+    global worker_data
+    worker_data = (scorer, files_ref, files_hyp)
+
+
+#
+# end of function
+
+# function: score_chunk_worker
+#
+# arguments:
+#  chunk: a list of (index, file name)
+#
+# return: see score_chunk
+#
+def score_chunk_worker(chunk):
+    return score_chunk(*worker_data, chunk)
+
+
+#
+# end of function
+
+# function: score_files
+#
+# arguments:
+#  scorer: a scoring object (after init_score)
+#  files_ref: the reference annotations
+#  files_hyp: the hypothesis annotations
+#  rfile: a file that contains per file scoring results
+#  nproc: the number of processes (None for all cpus)
+#
+# return: a boolean value indicating status
+#
+# This function scores the files, in parallel if nproc is not 1. Every
+# file is scored with the score_file method of the scoring object into
+# partial counts (see score_chunk). The files are split in chunks of
+# consecutive files; the per file results are written and the partial
+# counts are added to the totals in the original order of the files, so
+# the totals do not depend on the number of processes.
+#
+def score_files(scorer, files_ref, files_hyp, rfile, nproc=1):
+
+    # check that all annotations are available
+    #
+    for fname in files_ref:
+        if files_ref.get(fname, None) == None or files_hyp.get(fname, None) == None:
+            print(
+                "Error: %s (line: %s) %s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    ndt.__NAME__,
+                    "error getting annotations",
+                    fname,
+                )
+            )
+            return False
+
+    # split the files in chunks of consecutive files
+    #
+    if nproc == None:
+        nproc = multiprocessing.cpu_count()
+    files = list(enumerate(files_ref))
+    nchunks = max(1, min(len(files), nproc * NCHUNKS_PER_PROC))
+    chunks = [
+        files[j * len(files) // nchunks : (j + 1) * len(files) // nchunks]
+        for j in range(nchunks)
+    ]
+
+    # score the chunks and add the partial counts in file order
+    #
+    totals = get_counts(scorer)
+    scorer.rfile_d = nft.make_fp(rfile)
+    if (nproc == 1) or (len(files) < 2):
+        pool = None
+        results = (score_chunk(scorer, files_ref, files_hyp, chunk) for chunk in chunks)
+    else:
+        pool = multiprocessing.Pool(
+            nproc, initializer=init_worker, initargs=(scorer, files_ref, files_hyp)
+        )
+        results = pool.imap(score_chunk_worker, chunks)
+
+    status = True
+    for chunk_results in results:
+        if chunk_results == None:
+            status = False
+            break
+        for output, counts in chunk_results:
+            scorer.rfile_d.write(output)
+            totals = add_counts(totals, counts)
+
+    if pool != None:
+        pool.terminate()
+        pool.join()
+    set_counts(scorer, totals)
+    scorer.rfile_d.close()
+
+    # exit gracefully
+    #
+    return status
+
+
+#
+# end of function
+
+# function: compute_roc_levels
+#
+# arguments:
+#  scorer: a scoring object (after init_score) with a compute method that
+#          counts hits and false alarms per label (dpalign, taes)
+#  roc: an roc engine (nedc_eval_roc.NedcRoc)
+#  ref: the mapped reference events ([start, stop, label, prob])
+#  hyp: the mapped hypothesis events, the probabilities of the events are
+#       their confidences
+#  key: the target class
+#  null: the class of the rejected hypothesis events of the target class
+#
+# return: a boolean value indicating status
+#
+# This function adds the counts of a file to an roc engine for the
+# scoring algorithms whose credit for an admitted event depends on the
+# other admitted events (the flags of taes, the alignment of dpalign),
+# such that it is not a step per event. The counts only change at the
+# confidences of the hypothesis events of the target class in this file:
+# the file is scored once with no event admitted and once per distinct
+# confidence (in decreasing order), and the change of every count is
+# admitted at that confidence with the change as its weight. The counts
+# are (as in compute_performance_roc):
+#  tp: the hits of the target class
+#  fp: the false alarms of the target class
+#  tn: the hits of the other classes
+#
+# The counters of the scoring object are restored.
+#
+def compute_roc_levels(scorer, roc, ref, hyp, key, null):
+
+    # collect the confidences of the hypothesis events of the target class
+    #
+    confs = [event[3] for event in hyp if event[2] == key]
+    roc.add_confidences(confs)
+    roc.npos_d += sum(1 for event in ref if event[2] == key)
+
+    # score the file for every level: None is above all confidences
+    #
+    totals = get_counts(scorer)
+    status = True
+    prev = None
+    for level in [None] + sorted(set(confs), reverse=True):
+        set_counts(scorer, zero_counts(totals))
+        hyp_level = [
+            [event[0], event[1], event[2], event[3]]
+            if (event[2] != key) or ((level != None) and (event[3] >= level))
+            else [event[0], event[1], null, event[3]]
+            for event in hyp
+        ]
+        if scorer.compute(ref, hyp_level) == False:
+            status = False
+            break
+
+        counts = {
+            "tp": scorer.hit_d[key],
+            "fp": scorer.fal_d[key],
+            "tn": sum(val for lbl, val in scorer.hit_d.items() if lbl != key),
+        }
+        for count, val in counts.items():
+            if prev == None:
+                roc.add(count, const=val)
+            elif val != prev[count]:
+                roc.add(count, admit=[level], weights=[val - prev[count]])
+        prev = counts
+    set_counts(scorer, totals)
+
+    # exit gracefully
+    #
+    return status
+
+
 #
 # end of function
 
@@ -19,13 +19,17 @@
 #
 import os
 import sys
-import math
+
+# import required third-party modules
+#
+import numpy as np
 
 # import required NEDC modules
 #
 import nedc_ann_tools as nat
 import nedc_debug_tools as ndt
 import nedc_eval_common as nec
+import nedc_eval_metrics as nmet
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -49,6 +53,12 @@ DPALIGN_ETYPES_DEL = int(0)
 DPALIGN_ETYPES_INS = int(1)
 DPALIGN_ETYPES_SUB = int(2)
 
+# define the minimum size of the cost matrix (no. of nodes) for which the
+# alignment is computed with numpy: for smaller matrices the overhead of
+# numpy is larger than the gain
+#
+DPALIGN_MIN_NODES_NUMPY = int(25000)
+
 # ------------------------------------------------------------------------------
 #
 # functions are listed here
@@ -69,6 +79,7 @@ dbgl = ndt.Dbgl()
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  nproc: the number of processes (None for all cpus)
 #
 # return: a boolean value indicating status
 #
@@ -77,7 +88,7 @@ dbgl = ndt.Dbgl()
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist, hyplist, mapping, nedc_dpalign, odir, rfile, fp):
+def run(reflist, hyplist, mapping, nedc_dpalign, odir, rfile, fp, nproc=1):
 
     # display an informational message
     #
@@ -112,7 +123,7 @@ def run(reflist, hyplist, mapping, nedc_dpalign, odir, rfile, fp):
         )
 
     status = ndpalign.init_score(mapping)
-    status = ndpalign.score(reflist, hyplist, mapping, rfile)
+    status = ndpalign.score(reflist, hyplist, mapping, rfile, nproc)
     if status == False:
         print(
             "Error: %s (line: %s):%s: error during scoring"
@@ -434,12 +445,13 @@ class NedcDpalign:
     #  files_hyp: a hypothesis file list
     #  score_map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  nproc: the number of processes (None for all cpus)
     #
     # return: a boolean value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref, files_hyp, score_map, rfile):
+    def score(self, files_ref, files_hyp, score_map, rfile, nproc=1):
 
         # display informational message
         #
@@ -449,119 +461,84 @@ class NedcDpalign:
                 % (__FILE__, ndt.__LINE__, NedcDpalign.__CLASS_NAME__, ndt.__NAME__)
             )
 
-        # declare local variables
+        # score the files (in parallel if nproc is not 1):
+        #  the per file results and counts are merged in file order
         #
-        status = True
-
-        # create the results file
-        #
-        self.rfile_d = nft.make_fp(rfile)
-
-        # loop over all files
-        #
-        for i, fname in enumerate(files_ref):
-
-            events_ref = files_ref.get(fname, None)
-            if events_ref == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
-
-            # get the hyp eventss
-            #
-            events_hyp = files_hyp.get(fname, None)
-            if events_hyp == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
+        return nec.score_files(self, files_ref, files_hyp, rfile, nproc)
 
-            # update the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
-
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+    #
+    # end of method
 
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+    # method: NedcDpalign::score_file
+    #
+    # arguments:
+    #  i: the index of the file
+    #  fname: the name of the file
+    #  events_ref: the reference events of the file
+    #  events_hyp: the hypothesis events of the file
+    #
+    # return: the per file results (None if an error occurred)
+    #
+    # This method adds a single file to the confusion matrix.
+    #
+    def score_file(self, i, fname, events_ref, events_hyp):
 
-            # add this to the confusion matrix
-            #
-            refo, hypo = self.compute(ann_ref, ann_hyp)
-            if refo == None:
-                print(
-                    "Error: %s (line: %s) %s::%s: %s (%s %s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcDpalign.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "error computing confusion matrix",
-                        files_ref[i],
-                        files_hyp[i],
-                    )
-                )
-                return False
+        # update the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-            # output the files to the per file results file
-            #
-            ref_fm, hyp_fm, hits, subs, inss, dels = nec.format_hyp(refo, hypo)
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
+        #
+        ann_ref = nec.map_events(events_ref, self.pmap_d)
+        ann_hyp = nec.map_events(events_hyp, self.pmap_d)
 
-            self.rfile_d.write("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
-            self.rfile_d.write(
-                "%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write("  Ref: %s" % ref_fm + nft.DELIM_NEWLINE)
-            self.rfile_d.write("  Hyp: %s" % hyp_fm + nft.DELIM_NEWLINE)
-            self.rfile_d.write(
-                "%7s (%s %d  %s %d  %s %d  %s %d  %s %d)"
+        # add this to the confusion matrix
+        #
+        refo, hypo = self.compute(ann_ref, ann_hyp)
+        if refo == None:
+            print(
+                "Error: %s (line: %s) %s::%s: %s (%s)"
                 % (
-                    nft.STRING_EMPTY,
-                    "Hit:",
-                    hits,
-                    "Sub:",
-                    subs,
-                    "Ins:",
-                    inss,
-                    "Del:",
-                    dels,
-                    "Total:",
-                    subs + inss + dels,
+                    __FILE__,
+                    ndt.__LINE__,
+                    NedcDpalign.__CLASS_NAME__,
+                    ndt.__NAME__,
+                    "error computing confusion matrix",
+                    fname,
                 )
-                + nft.DELIM_NEWLINE
             )
-            self.rfile_d.write(nft.DELIM_NEWLINE)
+            return None
 
-        # close the file
-        #
-        self.rfile_d.close()
+        # output the file to the per file results
+        #
+        lines = []
+        ref_fm, hyp_fm, hits, subs, inss, dels = nec.format_hyp(refo, hypo)
+
+        lines.append("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
+        lines.append("%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE)
+        lines.append("  Ref: %s" % ref_fm + nft.DELIM_NEWLINE)
+        lines.append("  Hyp: %s" % hyp_fm + nft.DELIM_NEWLINE)
+        lines.append(
+            "%7s (%s %d  %s %d  %s %d  %s %d  %s %d)"
+            % (
+                nft.STRING_EMPTY,
+                "Hit:",
+                hits,
+                "Sub:",
+                subs,
+                "Ins:",
+                inss,
+                "Del:",
+                dels,
+                "Total:",
+                subs + inss + dels,
+            )
+            + nft.DELIM_NEWLINE
+        )
+        lines.append(nft.DELIM_NEWLINE)
 
-        # exit gracefully
-        #
-        return True
+        return nft.STRING_EMPTY.join(lines)
 
     #
     # end of method
@@ -603,60 +580,16 @@ class NedcDpalign:
             hypi.append(value[2])
         hypi.append(nec.NULL_CLASS)
 
-        # compute the lengths and clear temp variables
+        # compute the lengths and the error types (backpointers) of
+        #  the best path: small matrices are computed with python lists,
+        #  large matrices with numpy
         #
         m = len(refi)
         n = len(hypi)
-        d = []
-        etypes = []
-
-        # zero out the cost matrix and initialize the edges with the
-        # correct error types (backpointers)
-        #
-        for i in range(m):
-            d.append([])
-            etypes.append([])
-            for j in range(n):
-                d[i].append(float(0))
-                etypes[i].append(DPALIGN_ETYPES_NULL)
-
-        for i in range(1, n):
-            d[0][i] = d[0][i - 1] + self.penalty_ins_d
-            etypes[0][i] = DPALIGN_ETYPES_INS
-
-        for i in range(1, m):
-            d[i][0] = d[i - 1][0] + self.penalty_del_d
-            etypes[i][0] = DPALIGN_ETYPES_DEL
-        etypes[0][0] = DPALIGN_ETYPES_SUB
-
-        # iterate over the interior nodes:
-        #  cols (j) correspond to the reference. rows (i) correspond
-        #  to the hypothesis. iterate over a column first (j), matching
-        #  ref to a specific event in a hypothesis, and then over rows (i)
-        #  next (iterating over events in the reference).
-        #
-        for j in range(1, n):
-            for i in range(1, m):
-
-                # compute the node penalties
-                #
-                d_del = d[i - 1][j] + self.penalty_del_d
-                d_ins = d[i][j - 1] + self.penalty_ins_d
-                d_sub = d[i - 1][j - 1]
-                if refi[i] != hypi[j]:
-                    d_sub += self.penalty_sub_d
-
-                # update the best path and save the error type
-                #
-                min_dist = d_sub
-                etypes[i][j] = DPALIGN_ETYPES_SUB
-                if d_ins < min_dist:
-                    min_dist = d_ins
-                    etypes[i][j] = DPALIGN_ETYPES_INS
-                if d_del < min_dist:
-                    min_dist = d_del
-                    etypes[i][j] = DPALIGN_ETYPES_DEL
-                d[i][j] = min_dist
+        if m * n < DPALIGN_MIN_NODES_NUMPY:
+            etypes = self.align_lists(refi, hypi)
+        else:
+            etypes = self.align_diagonals(refi, hypi)
 
         # the last node (m-1, n-1) is where the best path terminates. backtrack
         # to get the best path. start at (m-1, n-1) and end at (0,0).
@@ -736,6 +669,179 @@ class NedcDpalign:
         #
         return [refo, hypo]
 
+    # method: NedcDpalign::align_lists
+    #
+    # arguments:
+    #  refi: the reference labels (with a dummy symbol at both ends)
+    #  hypi: the hypothesis labels (with a dummy symbol at both ends)
+    #
+    # return: the error types (backpointers) as a list of lists
+    #
+    # This method fills the cost matrix node by node with python lists.
+    #
+    def align_lists(self, refi, hypi):
+
+        # compute the lengths and clear temp variables
+        #
+        m = len(refi)
+        n = len(hypi)
+        d = []
+        etypes = []
+
+        # zero out the cost matrix and initialize the edges with the
+        # correct error types (backpointers)
+        #
+        for i in range(m):
+            d.append([])
+            etypes.append([])
+            for j in range(n):
+                d[i].append(float(0))
+                etypes[i].append(DPALIGN_ETYPES_NULL)
+
+        for i in range(1, n):
+            d[0][i] = d[0][i - 1] + self.penalty_ins_d
+            etypes[0][i] = DPALIGN_ETYPES_INS
+
+        for i in range(1, m):
+            d[i][0] = d[i - 1][0] + self.penalty_del_d
+            etypes[i][0] = DPALIGN_ETYPES_DEL
+        etypes[0][0] = DPALIGN_ETYPES_SUB
+
+        # iterate over the interior nodes:
+        #  cols (j) correspond to the reference. rows (i) correspond
+        #  to the hypothesis. iterate over a column first (j), matching
+        #  ref to a specific event in a hypothesis, and then over rows (i)
+        #  next (iterating over events in the reference).
+        #
+        for j in range(1, n):
+            for i in range(1, m):
+
+                # compute the node penalties
+                #
+                d_del = d[i - 1][j] + self.penalty_del_d
+                d_ins = d[i][j - 1] + self.penalty_ins_d
+                d_sub = d[i - 1][j - 1]
+                if refi[i] != hypi[j]:
+                    d_sub += self.penalty_sub_d
+
+                # update the best path and save the error type
+                #
+                min_dist = d_sub
+                etypes[i][j] = DPALIGN_ETYPES_SUB
+                if d_ins < min_dist:
+                    min_dist = d_ins
+                    etypes[i][j] = DPALIGN_ETYPES_INS
+                if d_del < min_dist:
+                    min_dist = d_del
+                    etypes[i][j] = DPALIGN_ETYPES_DEL
+                d[i][j] = min_dist
+
+        # exit gracefully
+        #
+        return etypes
+
+    #
+    # end of method
+
+    # method: NedcDpalign::align_diagonals
+    #
+    # arguments:
+    #  refi: the reference labels (with a dummy symbol at both ends)
+    #  hypi: the hypothesis labels (with a dummy symbol at both ends)
+    #
+    # return: the error types (backpointers) as an int8 array
+    #
+    # This method computes the same cost matrix as align_lists, one
+    # anti-diagonal (i + j constant) at a time: all the nodes of an
+    # anti-diagonal only depend on the two previous anti-diagonals, so they
+    # are computed with vector operations. the operations (and the order of
+    # the comparisons) are the same for every node, so the results are
+    # identical. only the last two anti-diagonals of the costs are kept.
+    #
+    def align_diagonals(self, refi, hypi):
+
+        # convert the labels to integer codes
+        #
+        codes = {}
+        refc = np.array([codes.setdefault(lbl, len(codes)) for lbl in refi])
+        hypc = np.array([codes.setdefault(lbl, len(codes)) for lbl in hypi])
+
+        # initialize the edges with the correct error types (backpointers)
+        #  and costs: the costs of the edges are accumulated sequentially
+        #
+        m = len(refi)
+        n = len(hypi)
+        etypes = np.full((m, n), DPALIGN_ETYPES_NULL, dtype=np.int8)
+        etypes[0, 1:] = DPALIGN_ETYPES_INS
+        etypes[1:, 0] = DPALIGN_ETYPES_DEL
+        etypes[0, 0] = DPALIGN_ETYPES_SUB
+
+        d_row = np.zeros(n)
+        d_row[1:] = self.penalty_ins_d
+        d_row = np.add.accumulate(d_row)
+        d_col = np.zeros(m)
+        d_col[1:] = self.penalty_del_d
+        d_col = np.add.accumulate(d_col)
+
+        # the costs of anti-diagonal k are stored by row (i): d_prv2 is
+        #  anti-diagonal k - 2, d_prv is anti-diagonal k - 1
+        #
+        d_prv2 = np.full(m, np.inf)
+        d_prv2[0] = d_row[0]
+        d_prv = np.full(m, np.inf)
+        if n > 1:
+            d_prv[0] = d_row[1]
+        if m > 1:
+            d_prv[1] = d_col[1]
+
+        # iterate over the anti-diagonals: the interior nodes of
+        #  anti-diagonal k are (i, k - i) for i in [i_start, i_stop)
+        #
+        for k in range(2, m + n - 1):
+            d_cur = np.full(m, np.inf)
+            if k < n:
+                d_cur[0] = d_row[k]
+            if k < m:
+                d_cur[k] = d_col[k]
+
+            i_start = max(1, k - n + 1)
+            i_stop = min(m, k)
+            if i_start < i_stop:
+
+                # compute the node penalties
+                #
+                rows = np.arange(i_start, i_stop)
+                cols = k - rows
+                d_del = d_prv[i_start - 1 : i_stop - 1] + self.penalty_del_d
+                d_ins = d_prv[i_start:i_stop] + self.penalty_ins_d
+                d_sub = d_prv2[i_start - 1 : i_stop - 1]
+                d_sub = np.where(
+                    refc[rows] != hypc[cols], d_sub + self.penalty_sub_d, d_sub
+                )
+
+                # update the best path and save the error type
+                #
+                min_dist = d_sub
+                etype = np.full(len(rows), DPALIGN_ETYPES_SUB, dtype=np.int8)
+                better = d_ins < min_dist
+                min_dist = np.where(better, d_ins, min_dist)
+                etype[better] = DPALIGN_ETYPES_INS
+                better = d_del < min_dist
+                min_dist = np.where(better, d_del, min_dist)
+                etype[better] = DPALIGN_ETYPES_DEL
+                d_cur[i_start:i_stop] = min_dist
+                etypes[rows, cols] = etype
+
+            d_prv2 = d_prv
+            d_prv = d_cur
+
+        # exit gracefully
+        #
+        return etypes
+
+    #
+    # end of method
+
     # method: NedcDpalign::compute_performance
     #
     # arguments: none
@@ -788,270 +894,26 @@ class NedcDpalign:
 
         # ----------------------------------------------------------------------
         # (2) The second block of computations are the derived measures
-        #     such as sensitivity. These are computed using a two-step
-        #     approach:
-        #      (2.2) compute true positives, etc. (tp, tn, fp, fn)
-        #      (2.3) compute the derived measures (e.g., sensitivity)
-        #
-        # loop over all labels
-        #
-        for key1 in self.sub_d:
-
-            # ------------------------------------------------------------------
-            # (2.2) The dp algorithm outputs hits, misses and false alarms
-            #       directly. These must be converted to (tp, tn, fp, fn).
-            #
-            # compute true positives (tp)
-            #
-            self.tp_d[key1] = self.hit_d[key1]
-
-            # compute true negatives (tn)
-            #  sum the submatrix formed when you exclude the row and column
-            #  associated with key1
-            #
-            tn_sum = int(0)
-            for key2 in self.sub_d:
-                for key3 in self.sub_d:
-                    if (key1 != key2) and (key1 != key3):
-                        tn_sum += self.sub_d[key2][key3]
-            self.tn_d[key1] = tn_sum
-
-            # compute false positives (fp)
-            #
-            self.fp_d[key1] = self.ins_d[key1]
-
-            # compute false negatives (fn)
-            #
-            self.fn_d[key1] = self.mis_d[key1]
-
-            # check the health of the confusion matrix
-            #
-            tp = self.tp_d[key1]
-            fp = self.fp_d[key1]
-            tn = self.tn_d[key1]
-            fn = self.fn_d[key1]
-            tdur = self.total_dur_d
-
-            if (
-                ((tp + fn) == 0)
-                or ((fp + tn) == 0)
-                or ((tp + fp) == 0)
-                or ((fn + tn) == 0)
-            ):
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%d %d %d %d)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcDpalign.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "divide by zero",
-                        tp,
-                        fp,
-                        tn,
-                        fn,
-                    )
-                )
-            elif round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%f)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcDpalign.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "duration is zero",
-                        tdur,
-                    )
-                )
-
-            # (2.3) compute derived measures
-            #
-            if (tp + fn) != 0:
-                self.tpr_d[key1] = float(self.tp_d[key1]) / float(tp + fn)
-            else:
-                self.tpr_d[key1] = float(0)
-
-            if (tn + fp) != 0:
-                self.tnr_d[key1] = float(self.tn_d[key1]) / float(tn + fp)
-            else:
-                self.tnr_d[key1] = float(0)
-
-            if (tp + fp) != 0:
-                self.ppv_d[key1] = float(self.tp_d[key1]) / float(tp + fp)
-            else:
-                self.ppv_d[key1] = float(0)
-
-            if (tn + fn) != 0:
-                self.npv_d[key1] = float(self.tn_d[key1]) / float(tn + fn)
-            else:
-                self.npv_d[key1] = float(0)
-
-            self.fnr_d[key1] = 1 - float(self.tpr_d[key1])
-            self.fpr_d[key1] = 1 - float(self.tnr_d[key1])
-            self.fdr_d[key1] = 1 - float(self.ppv_d[key1])
-            self.for_d[key1] = 1 - float(self.npv_d[key1])
-
-            if (tp + tn + fp + fn) != 0:
-                self.acc_d[key1] = float(self.tp_d[key1] + self.tn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-                self.prv_d[key1] = float(self.tp_d[key1] + self.fn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-            else:
-                self.acc_d[key1] = float(0)
-                self.prv_d[key1] = float(0)
-
-            self.msr_d[key1] = 1 - self.acc_d[key1]
-
-            # compute the f1 score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            f1s_denom = float(self.ppv_d[key1] + self.tpr_d[key1])
-            if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcDpalign.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "f ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.f1s_d[key1] = float(0)
-            else:
-                self.f1s_d[key1] = 2.0 * self.ppv_d[key1] * self.tpr_d[key1] / f1s_denom
-
-            # compute the mcc score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            mcc_denom = (tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)
-            mcc_num = (tp * tn) - (fp * fn)
-            if round(mcc_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcDpalign.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "mcc ration divide by zero",
-                        key1,
-                    )
-                )
-                self.mcc_d[key1] = float(0)
-            else:
-                self.mcc_d[key1] = mcc_num / math.sqrt(mcc_denom)
-
-            # compute the false alarm rate
-            #
-            if round(tdur, ndt.MAX_PRECISION) != 0:
-                self.flr_d[key1] = float(fp) / tdur * (60 * 60 * 24)
-
-        # ----------------------------------------------------------------------
-        # (3) the third block of parameters are the summary values
-        #
-        self.sum_tgt_d = sum(self.tgt_d.values())
-        self.sum_hit_d = sum(self.hit_d.values())
-        self.sum_mis_d = sum(self.mis_d.values())
-        self.sum_fal_d = sum(self.fal_d.values())
-        self.sum_ins_d = sum(self.ins_d.values())
-        self.sum_del_d = sum(self.del_d.values())
-
-        self.sum_tp_d = sum(self.tp_d.values())
-        self.sum_tn_d = sum(self.tn_d.values())
-        self.sum_fp_d = sum(self.fp_d.values())
-        self.sum_fn_d = sum(self.fn_d.values())
-
-        if (self.sum_tp_d + self.sum_fn_d) != 0:
-            self.sum_tpr_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fn_d)
-        else:
-            self.sum_tpr_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fp_d) != 0:
-            self.sum_tnr_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fp_d)
-        else:
-            self.sum_tnr_d = float(0)
-
-        if (self.sum_tp_d + self.sum_fp_d) != 0:
-            self.sum_ppv_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fp_d)
-        else:
-            self.sum_ppv_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fn_d) != 0:
-            self.sum_npv_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fn_d)
-        else:
-            self.sum_npv_d = float(0)
-
-        self.sum_fnr_d = 1 - float(self.sum_tpr_d)
-        self.sum_fpr_d = 1 - float(self.sum_tnr_d)
-        self.sum_fdr_d = 1 - float(self.sum_ppv_d)
-        self.sum_for_d = 1 - float(self.sum_npv_d)
-
-        if (self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d) != 0:
-            self.sum_acc_d = float(self.sum_tp_d + self.sum_tn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-            self.sum_prv_d = float(self.sum_tp_d + self.sum_fn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-        else:
-            self.sum_acc_d = float(0)
-            self.sum_prv_d = float(0)
-
-        self.sum_msr_d = 1 - self.sum_acc_d
-
-        if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcDpalign.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "f ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_f1s_d = float(0)
-        else:
-            self.sum_f1s_d = 2.0 * self.sum_ppv_d * self.sum_tpr_d / f1s_denom
-
-        # compute the mcc score:
-        #  this has to be done after sensitivity and prec are computed
-        #
-        sum_mcc_denom = (
-            (self.sum_tp_d + self.sum_fp_d)
-            * (self.sum_tp_d + self.sum_fn_d)
-            * (self.sum_tn_d + self.sum_fp_d)
-            * (self.sum_tn_d + self.sum_fn_d)
-        )
-        sum_mcc_num = (self.sum_tp_d * self.sum_tn_d) - (self.sum_fp_d * self.sum_fn_d)
-        if round(sum_mcc_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcDpalign.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "mcc ration divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_mcc_d = float(0)
-        else:
-            self.sum_mcc_d = sum_mcc_num / math.sqrt(sum_mcc_denom)
-
-        # compute the false alarm rate
-        #
-        if round(self.total_dur_d, ndt.MAX_PRECISION) == 0:
-            self.sum_flr_d = float(0)
-        else:
-            self.sum_flr_d = float(self.sum_fp_d) / self.total_dur_d * (60 * 60 * 24)
+        #     such as sensitivity. The dp algorithm outputs hits, misses
+        #     and false alarms directly. These are converted to (tp, tn,
+        #     fp, fn) per label:
+        #      tp: the hits
+        #      tn: the substitutions that do not involve the label
+        #      fp: the insertions
+        #      fn: the misses
+        #
+        # (3) The third block of parameters are the summary values. The
+        #     measures of all labels and of the summary are computed by
+        #     nedc_eval_metrics.
+        #
+        labels = list(self.hit_d)
+        counts = {
+            "tp": [self.hit_d[key] for key in labels],
+            "tn": nmet.NedcConfusion(self.sub_d).get_counts()["tn"],
+            "fp": [self.ins_d[key] for key in labels],
+            "fn": [self.mis_d[key] for key in labels],
+        }
+        nmet.set_measures(self, labels, counts)
 
         # exit gracefully
         #
@@ -1487,6 +1349,37 @@ class NedcDpalign:
     def get_det(self, key):
         return self.fpr_d[key], self.fnr_d[key]
 
+    #
+    # end of method
+
+    # method: NedcDpalign::compute_roc
+    #
+    # arguments:
+    #  roc: an roc engine (nedc_eval_roc.NedcRoc)
+    #  ref: reference annotation
+    #  hyp: hypothesis annotation (with the confidence as the 4th element)
+    #  key: the target class
+    #  null: the class of the rejected hypothesis events of the target class
+    #
+    # return: a boolean value indicating status
+    #
+    # This method adds the counts of compute_performance_roc for all
+    # thresholds to the roc engine. Since the alignment depends on all the
+    # admitted events, the file is rescored
+    # for every distinct confidence of its hyp events of the target class
+    # (see nec.compute_roc_levels).
+    #
+    def compute_roc(self, roc, ref, hyp, key, null):
+
+        # check to make sure the annotations match
+        #
+        if round(ref[-1][1], 3) != round(hyp[-1][1], 3):
+            return False
+
+        # exit gracefully
+        #
+        return nec.compute_roc_levels(self, roc, ref, hyp, key, null)
+
 
 # end of file
 #
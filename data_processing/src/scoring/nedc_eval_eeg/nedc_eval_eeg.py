@@ -17,9 +17,11 @@
 
 # import system modules
 #
+import io
 import os
 import sys
 import time
+import multiprocessing
 
 # import NEDC support modules
 #
@@ -37,6 +39,7 @@ import nedc_eval_epoch as nepoch
 import nedc_eval_ovlp as novlp
 import nedc_eval_taes as ntaes
 import nedc_eval_ira as nira
+import nedc_eval_roc as nroc
 
 # ------------------------------------------------------------------------------
 #
@@ -72,12 +75,25 @@ ARG_ABRV_NIST = "-n"
 ARG_COMP = "--competition"
 ARG_ABRV_COMP = "-c"
 
+ARG_CACHE = "--cache"
+ARG_ABRV_CACHE = "-a"
+
+ARG_NPROC = "--nproc"
+ARG_ABRV_NPROC = "-j"
+
+ARG_SCORERS = "--scorers"
+ARG_ABRV_SCORERS = "-s"
+
+ARG_CONC = "--concurrent"
+ARG_ABRV_CONC = "-m"
+
 # define default values for arguments:
 #  note we assume the parameter file is in the same
 #  directory as the source code.
 #
 DEF_PFILE = SCRIPT_LOC + "/nedc_eval_eeg_params_v00.txt"
 DEF_ODIR = "./output"
+DEF_NPROC = int(1)
 
 # define the required number of arguments
 #
@@ -113,6 +129,506 @@ SEIZ = "SEIZ"
 BCKG = "BCKG"
 CLASSES = [SEIZ, BCKG]
 
+# define the scoring algorithms that can be run in memory:
+#  name: (scoring class, parameter block, competition parameters)
+#
+SCORERS = {
+    "dpalign": (ndpalign.NedcDpalign, ndpalign.NEDC_DPALIGN, DEF_COMP_DPALIGN),
+    "epoch": (nepoch.NedcEpoch, nepoch.NEDC_EPOCH, DEF_COMP_EPOCH),
+    "ovlp": (novlp.NedcOverlap, novlp.NEDC_OVLP, DEF_COMP_OVLP),
+    "taes": (ntaes.NedcTAES, ntaes.NEDC_TAES, DEF_COMP_TAES),
+}
+
+# define the scoring algorithms that main can run, in the order of the
+# summary file:
+#  name: (scoring module, parameter block, name in messages, title in the
+#         summary file, results file)
+#
+REPORTS = {
+    "dpalign": (
+        ndpalign,
+        ndpalign.NEDC_DPALIGN,
+        "DP Alignment",
+        ("NEDC DP Alignment Scoring Summary (v4.0.0):").upper(),
+        NEDC_DPALIGN_FILE,
+    ),
+    "epoch": (
+        nepoch,
+        nepoch.NEDC_EPOCH,
+        "Epoch",
+        "NEDC Epoch Scoring Summary (v4.0.0):",
+        NEDC_EPOCH_FILE,
+    ),
+    "ovlp": (
+        novlp,
+        novlp.NEDC_OVLP,
+        "Overlap",
+        "NEDC Overlap Scoring Summary (v4.0.0):",
+        NEDC_OVLP_FILE,
+    ),
+    "taes": (
+        ntaes,
+        ntaes.NEDC_TAES,
+        "Time-Aligned Event",
+        "NEDC TAES Scoring Summary (v4.0.0):",
+        NEDC_TAES_FILE,
+    ),
+    "ira": (
+        nira,
+        nira.NEDC_IRA,
+        "IRA",
+        "NEDC Inter-Rater Agreement Summary (v4.0.0):",
+        None,
+    ),
+}
+
+# define the scoring algorithms that are not available in the competition
+# version
+#
+COMP_EXCLUDED = ["ira"]
+
+# define the scoring algorithms that can compute an roc/det curve (see
+# nedc_eval_roc): epoch and ovlp in a single pass, dpalign and taes by
+# rescoring a file for every confidence of its events of the target class
+#
+ROC_SCORERS = ["dpalign", "epoch", "ovlp", "taes"]
+
+# ------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+# ------------------------------------------------------------------------------
+
+# function: load_scoring_map
+#
+# arguments:
+#  pfile: the parameter file (None for the competition version)
+#
+# return: the scoring map (None if an error occurred)
+#
+# This function loads and converts the scoring map.
+#
+def load_scoring_map(pfile=DEF_PFILE):
+
+    # the competition version uses the classes directly
+    #
+    if pfile is None:
+        tmpmap = {}
+        for label in CLASSES:
+            tmpmap[label] = label
+
+    # the research version loads the map from the parameter file
+    #
+    else:
+        tmpmap = nft.load_parameters(pfile, nec.PARAM_MAP)
+        if tmpmap == None:
+            print(
+                "Error: %s (line: %s) %s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    ndt.__NAME__,
+                    "error loading the scoring map",
+                    pfile,
+                )
+            )
+            return None
+
+    # convert the map
+    #
+    return nft.generate_map(tmpmap)
+
+
+#
+# end of function
+
+# function: score
+#
+# arguments:
+#  ref_anns: the reference annotations, a dictionary as produced by
+#            nec.parse_files: {fname: [[start, stop, {label: prob}], ...]}
+#  hyp_anns: the hypothesis annotations (same format)
+#  pfile: the parameter file (None for the competition version)
+#  scorers: the names of the scoring algorithms to run (see SCORERS)
+#  scmap: the scoring map (None to load it from pfile)
+#  nproc: the number of processes per algorithm (None for all cpus)
+#
+# return: a dictionary with the scoring objects, after computing the
+#         performance, organized by algorithm (None if an error occurred)
+#
+# This function scores annotations that are already in memory, such
+# that the hypotheses don't have to be written to (and parsed from)
+# files. No results files are written.
+#
+def score(
+    ref_anns, hyp_anns, pfile=DEF_PFILE, scorers=tuple(SCORERS), scmap=None, nproc=1
+):
+
+    # check for mismatched annotations
+    #
+    if (ref_anns == None) or (hyp_anns == None) or (len(ref_anns) != len(hyp_anns)):
+        print(
+            "Error: %s (line: %s) %s: %s"
+            % (__FILE__, ndt.__LINE__, ndt.__NAME__, "ref and hyp do not match")
+        )
+        return None
+
+    # load the scoring map
+    #
+    if scmap is None:
+        scmap = load_scoring_map(pfile)
+        if scmap == None:
+            return None
+
+    # loop over the scoring algorithms
+    #
+    results = {}
+    for name in scorers:
+
+        # load the parameters
+        #
+        sclass, block, comp_params = SCORERS[name]
+        if pfile is None:
+            params = comp_params
+        else:
+            params = nft.load_parameters(pfile, block)
+
+        # score the annotations and compute the performance
+        #
+        scorer = sclass(params)
+        scorer.init_score(scmap)
+        if scorer.score(ref_anns, hyp_anns, scmap, os.devnull, nproc) == False:
+            print(
+                "Error: %s (line: %s) %s: error in %s scoring"
+                % (__FILE__, ndt.__LINE__, ndt.__NAME__, name.upper())
+            )
+            return None
+        scorer.compute_performance()
+        results[name] = scorer
+
+    # exit gracefully
+    #
+    return results
+
+
+#
+# end of function
+
+# function: score_roc
+#
+# arguments:
+#  ref_anns: the reference annotations (see score)
+#  hyp_anns: the hypothesis annotations, the probabilities of the events
+#            are their confidences
+#  pfile: the parameter file (None for the competition version)
+#  scorer: the name of the scoring algorithm (see ROC_SCORERS)
+#  label: the target class
+#  null: the class of the rejected hypothesis events of the target class
+#  scmap: the scoring map (None to load it from pfile)
+#
+# return: an roc engine (nedc_eval_roc.NedcRoc) with the counts of all
+#         thresholds (None if an error occurred)
+#
+# This function scores the annotations once for all thresholds on the
+# confidence of the hypothesis events of the target class: an event is
+# admitted if its confidence >= threshold, otherwise it is scored as the
+# null class. The curve is computed with the get_curve, get_roc and
+# get_det methods of the engine. The counts of taes are fractional, and
+# its false negatives are the number of ref events of the target class
+# minus the (fractional) hits.
+#
+def score_roc(
+    ref_anns,
+    hyp_anns,
+    pfile=DEF_PFILE,
+    scorer="ovlp",
+    label=SEIZ.lower(),
+    null=BCKG.lower(),
+    scmap=None,
+):
+
+    # check the arguments
+    #
+    if (
+        (ref_anns == None)
+        or (hyp_anns == None)
+        or (len(ref_anns) != len(hyp_anns))
+        or (scorer not in ROC_SCORERS)
+    ):
+        print(
+            "Error: %s (line: %s) %s: %s"
+            % (
+                __FILE__,
+                ndt.__LINE__,
+                ndt.__NAME__,
+                "invalid annotations or scoring algorithm",
+            )
+        )
+        return None
+
+    # load the scoring map
+    #
+    if scmap is None:
+        scmap = load_scoring_map(pfile)
+        if scmap == None:
+            return None
+
+    # create the scoring object (for the mapping and the parameters)
+    #
+    sclass, block, comp_params = SCORERS[scorer]
+    if pfile is None:
+        params = comp_params
+    else:
+        params = nft.load_parameters(pfile, block)
+    scobj = sclass(params)
+    scobj.init_score(scmap)
+
+    # loop over all files
+    #
+    roc = nroc.NedcRoc()
+    for fname, events_ref in ref_anns.items():
+        events_hyp = hyp_anns.get(fname, None)
+        if events_hyp == None:
+            print(
+                "Error: %s (line: %s) %s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    ndt.__NAME__,
+                    "error getting annotations",
+                    fname,
+                )
+            )
+            return None
+
+        # map the annotations: only extract the first label and keep the
+        # confidence
+        #
+        anns = [
+            nec.map_events(events_ref, scobj.pmap_d),
+            nec.map_events(events_hyp, scobj.pmap_d),
+        ]
+
+        # add the file to the roc engine
+        #
+        if scorer == "epoch":
+            status = scobj.compute_roc(roc, anns[0], anns[1], label)
+        else:
+            status = scobj.compute_roc(roc, anns[0], anns[1], label, null)
+        if status == False:
+            print(
+                "Error: %s (line: %s) %s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    ndt.__NAME__,
+                    "error computing confusions",
+                    fname,
+                )
+            )
+            return None
+
+    # exit gracefully
+    #
+    return roc
+
+
+#
+# end of function
+
+# function: get_metrics
+#
+# arguments:
+#  results: the output of score
+#  label: the class to report
+#
+# return: a dictionary with the sensitivity, false alarm rate (per 24
+#         hours), precision and f1 score per algorithm
+#
+def get_metrics(results, label=SEIZ.lower()):
+
+    metrics = {}
+    for name, scorer in results.items():
+        metrics[name + "_sensitivity"] = scorer.tpr_d[label]
+        metrics[name + "_fa_24h"] = scorer.flr_d[label]
+        metrics[name + "_precision"] = scorer.ppv_d[label]
+        metrics[name + "_f1"] = scorer.f1s_d[label]
+    return metrics
+
+
+#
+# end of function
+
+# function: run_scorer
+#
+# arguments:
+#  name: the name of the scoring algorithm (see REPORTS)
+#  ref_anns: the reference annotations
+#  hyp_anns: the hypothesis annotations
+#  scmap: the scoring map
+#  params: the parameters of the scoring algorithm
+#  odir: the output directory
+#  nproc: the number of processes per algorithm (None for all cpus)
+#
+# return: the section of the summary file and the wall time (secs) of
+#         the scoring algorithm (None if an error occurred)
+#
+# This function runs one scoring algorithm. The section of the summary
+# file is written to a buffer, such that the scoring algorithms can be run
+# in any order (or concurrently) and the summary file is still written in
+# the order of REPORTS.
+#
+def run_scorer(name, ref_anns, hyp_anns, scmap, params, odir, nproc=1):
+
+    # write the title of the section
+    #
+    module, block, descr, title, rfile = REPORTS[name]
+    print(" ... executing NEDC %s scoring ..." % descr)
+    fp = io.StringIO()
+    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, title))
+
+    # run the scoring algorithm:
+    #  note that ira does not write a results file and scores the files
+    #  in one process
+    #
+    start = time.time()
+    if rfile == None:
+        status = module.run(ref_anns, hyp_anns, scmap, params, odir, fp)
+    else:
+        fname = nft.concat_names(odir, rfile)
+        status = module.run(ref_anns, hyp_anns, scmap, params, odir, fname, fp, nproc)
+    if status == False:
+        print(
+            "Error: %s (line: %s) %s: error in %s scoring"
+            % (__FILE__, ndt.__LINE__, ndt.__NAME__, name.upper())
+        )
+        return None
+    wtime = time.time() - start
+
+    # write the wall time at the end of the section
+    #
+    fp.write(" Wall time: %.4f secs" % wtime + nft.DELIM_NEWLINE)
+
+    # exit gracefully
+    #
+    return fp.getvalue(), wtime
+
+
+#
+# end of function
+
+# function: init_scorer_worker
+#
+# arguments:
+#  args: the arguments of run_scorer, except the name, with the parameters
+#        of every scoring algorithm
+#
+# return: none
+#
+# This function stores the data that is shared by the scoring algorithms
+# in a worker process. The annotations are not copied to the workers: the
+# workers are forked after the annotations are loaded.
+#
+def init_scorer_worker(*args):
+    global scorer_data
+    scorer_data = args
+
+
+#
+# end of function
+
+# function: run_scorer_worker
+#
+# arguments:
+#  name: the name of the scoring algorithm
+#
+# return: see run_scorer
+#
+def run_scorer_worker(name):
+    ref_anns, hyp_anns, scmap, params, odir, nproc = scorer_data
+    return run_scorer(name, ref_anns, hyp_anns, scmap, params[name], odir, nproc)
+
+
+#
+# end of function
+
+# function: run_scorers
+#
+# arguments:
+#  names: the names of the scoring algorithms (see REPORTS)
+#  ref_anns: the reference annotations
+#  hyp_anns: the hypothesis annotations
+#  scmap: the scoring map
+#  params: a dictionary with the parameters of every scoring algorithm
+#  odir: the output directory
+#  fp: the summary file
+#  concurrent: run the scoring algorithms in separate processes
+#  nproc: the number of processes per algorithm (None for all cpus, not
+#         used if concurrent)
+#
+# return: a dictionary with the wall time (secs) of every scoring
+#         algorithm (None if an error occurred)
+#
+# This function runs the selected scoring algorithms on the same loaded
+# annotations and writes their sections to the summary file, in the order
+# of REPORTS.
+#
+def run_scorers(
+    names, ref_anns, hyp_anns, scmap, params, odir, fp, concurrent=False, nproc=1
+):
+
+    # check the names
+    #
+    for name in names:
+        if name not in REPORTS:
+            print(
+                "Error: %s (line: %s) %s: unknown scoring algorithm (%s)"
+                % (__FILE__, ndt.__LINE__, ndt.__NAME__, name)
+            )
+            return None
+    names = [name for name in REPORTS if name in names]
+
+    # run the scoring algorithms
+    #
+    #  note that the annotations are only stored in scorer_data in the
+    #  worker processes, and that the workers of a pool can't start a pool
+    #  of their own: each algorithm then scores the files in one process
+    #
+    if (concurrent == False) or (len(names) < 2):
+        results = (
+            run_scorer(name, ref_anns, hyp_anns, scmap, params[name], odir, nproc)
+            for name in names
+        )
+        pool = None
+    else:
+        args = (ref_anns, hyp_anns, scmap, params, odir, 1)
+        pool = multiprocessing.Pool(
+            len(names), initializer=init_scorer_worker, initargs=args
+        )
+        results = pool.imap(run_scorer_worker, names)
+
+    # write the sections in order
+    #
+    wtimes = {}
+    for name, result in zip(names, results):
+        if result == None:
+            wtimes = None
+            break
+        fp.write(result[0])
+        wtimes[name] = result[1]
+
+    if pool != None:
+        pool.terminate()
+        pool.join()
+
+    # exit gracefully
+    #
+    return wtimes
+
+
+#
+# end of function
+
 # ------------------------------------------------------------------------------
 #
 # the main program starts here
@@ -149,6 +665,10 @@ def main(argv):
     cmdl.add_argument(ARG_ABRV_PARM, ARG_PARM, type=str)
     cmdl.add_argument(ARG_ABRV_COMP, ARG_COMP, action="store_true")
     cmdl.add_argument(ARG_ABRV_NIST, ARG_NIST, action="store_true")
+    cmdl.add_argument(ARG_ABRV_CACHE, ARG_CACHE, type=str)
+    cmdl.add_argument(ARG_ABRV_NPROC, ARG_NPROC, type=int, default=DEF_NPROC)
+    cmdl.add_argument(ARG_ABRV_SCORERS, ARG_SCORERS, type=str)
+    cmdl.add_argument(ARG_ABRV_CONC, ARG_CONC, action="store_true")
 
     # parse the command line
     #
@@ -159,6 +679,10 @@ def main(argv):
         print(" output directory = %s" % (args.odir))
         print(" nist = %s" % (bool(args.nist)))
         print(" competition = %d" % (bool(args.competition)))
+        print(" cache = %s" % (args.cache))
+        print(" nproc = %d" % (args.nproc))
+        print(" scorers = %s" % (args.scorers))
+        print(" concurrent = %d" % (bool(args.concurrent)))
         print(" ref file  = %s" % (args.files[0]))
         print(" hyp file = %s" % (args.files[1]))
         print("")
@@ -197,6 +721,33 @@ def main(argv):
         cmdl.print_usage("stdout")
         sys.exit(os.EX_SOFTWARE)
 
+    # set the scoring algorithms:
+    #  the competition version does not include ira by default
+    #
+    if args.scorers is not None:
+        scorers = args.scorers.split(nft.DELIM_COMMA)
+    elif args.competition is not False:
+        scorers = [name for name in REPORTS if name not in COMP_EXCLUDED]
+    else:
+        scorers = list(REPORTS)
+
+    for name in scorers:
+        if (name not in REPORTS) or (
+            (args.competition is not False) and (name in COMP_EXCLUDED)
+        ):
+            print(
+                "Error: %s (line: %s) %s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    ndt.__NAME__,
+                    "invalid scoring algorithm",
+                    name,
+                )
+            )
+            cmdl.print_usage("stdout")
+            sys.exit(os.EX_SOFTWARE)
+
     # set argument values
     #
     if args.odir is not None:
@@ -210,20 +761,16 @@ def main(argv):
 
     # if using competition version, define parameters
     #
+    params = {}
     if args.competition is not False:
-        nedc_dpalign = DEF_COMP_DPALIGN
-        nedc_epoch = DEF_COMP_EPOCH
-        nedc_ovlp = DEF_COMP_OVLP
-        nedc_taes = DEF_COMP_TAES
+        for name in scorers:
+            params[name] = SCORERS[name][2]
 
     # if using research version, load parameters
     #
     else:
-        nedc_dpalign = nft.load_parameters(pfile, ndpalign.NEDC_DPALIGN)
-        nedc_epoch = nft.load_parameters(pfile, nepoch.NEDC_EPOCH)
-        nedc_ovlp = nft.load_parameters(pfile, novlp.NEDC_OVLP)
-        nedc_taes = nft.load_parameters(pfile, ntaes.NEDC_TAES)
-        nedc_ira = nft.load_parameters(pfile, nira.NEDC_IRA)
+        for name in scorers:
+            params[name] = nft.load_parameters(pfile, REPORTS[name][1])
 
     # if using NIST scoring algorithm, load NIST parameters
     #
@@ -235,13 +782,14 @@ def main(argv):
     fname_ref = args.files[0]
     fname_hyp = args.files[1]
 
-    # if using research version, parse the ref and hyp file lists
+    # if using research version, parse the ref and hyp file lists:
+    #  the reference annotations are read from the cache (if specified)
     #
     if args.competition is False:
         reflist = nft.get_flist(fname_ref)
         hyplist = nft.get_flist(fname_hyp)
-        ref_anns = nec.parse_files(reflist)
-        hyp_anns = nec.parse_files(hyplist)
+        ref_anns = nec.parse_files(reflist, args.nproc, args.cache)
+        hyp_anns = nec.parse_files(hyplist, args.nproc)
 
     # if using competition version, parse the ref and hyp files:
     #  dur_dict is a dictionary that maps durations to file names and
@@ -319,6 +867,13 @@ def main(argv):
         print(tmpmap)
         sys.exit(os.EX_SOFTWARE)
 
+    # convert the annotations to event tables:
+    #  the labels are mapped once for all scoring algorithms
+    #
+    pmap = nft.permute_map(scmap)
+    ref_anns = nec.make_event_tables(ref_anns, pmap)
+    hyp_anns = nec.make_event_tables(hyp_anns, pmap)
+
     # create the output directory and the output summary file
     #
     print(" ... creating the output directory ...")
@@ -364,78 +919,22 @@ def main(argv):
             )
             sys.exit(os.EX_SOFTWARE)
 
-    # execute dp alignment scoring
+    # execute the selected scoring algorithms
     #
-    print(" ... executing NEDC DP Alignment scoring ...")
-    fp.write(
-        "%s\n%s\n\n"
-        % (NEDC_EVAL_SEP, ("NEDC DP Alignment Scoring Summary (v4.0.0):").upper())
+    wtimes = run_scorers(
+        scorers,
+        ref_anns,
+        hyp_anns,
+        scmap,
+        params,
+        odir,
+        fp,
+        args.concurrent,
+        args.nproc,
     )
-    fname = nft.concat_names(odir, NEDC_DPALIGN_FILE)
-    status = ndpalign.run(ref_anns, hyp_anns, scmap, nedc_dpalign, odir, fname, fp)
-    if status == False:
-        print(
-            "Error: %s (line: %s) %s: error in DPALIGN scoring"
-            % (__FILE__, ndt.__LINE__, ndt.__NAME__)
-        )
-        sys.exit(os.EX_SOFTWARE)
-
-    # execute NEDC epoch-based scoring
-    #
-    print(" ... executing NEDC Epoch scoring ...")
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, "NEDC Epoch Scoring Summary (v4.0.0):"))
-    fname = nft.concat_names(odir, NEDC_EPOCH_FILE)
-    status = nepoch.run(ref_anns, hyp_anns, scmap, nedc_epoch, odir, fname, fp)
-    if status == False:
-        print(
-            "Error: %s (line: %s) %s: error in EPOCH scoring"
-            % (__FILE__, ndt.__LINE__, ndt.__NAME__)
-        )
+    if wtimes == None:
         sys.exit(os.EX_SOFTWARE)
 
-    # execute overlap scoring
-    #
-    print(" ... executing NEDC Overlap scoring ...")
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, "NEDC Overlap Scoring Summary (v4.0.0):"))
-    fname = nft.concat_names(odir, NEDC_OVLP_FILE)
-    status = novlp.run(ref_anns, hyp_anns, scmap, nedc_ovlp, odir, fname, fp)
-    if status == False:
-        print(
-            "Error: %s (line: %s) %s: error in OVLP scoring"
-            % (__FILE__, ndt.__LINE__, ndt.__NAME__)
-        )
-        sys.exit(os.EX_SOFTWARE)
-
-    # execute time-aligned event scoring
-    #
-    print(" ... executing NEDC Time-Aligned Event scoring ...")
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, "NEDC TAES Scoring Summary (v4.0.0):"))
-    fname = nft.concat_names(odir, NEDC_TAES_FILE)
-    status = ntaes.run(ref_anns, hyp_anns, scmap, nedc_taes, odir, fname, fp)
-    if status == False:
-        print(
-            "Error: %s (line: %s) %s: error in TAES scoring"
-            % (__FILE__, ndt.__LINE__, ndt.__NAME__)
-        )
-        sys.exit(os.EX_SOFTWARE)
-
-    # execute ira scoring if using research version
-    #
-    if args.competition is False:
-        print(" ... executing NEDC IRA scoring ...")
-        fp.write(
-            "%s\n%s\n\n"
-            % (NEDC_EVAL_SEP, "NEDC Inter-Rater Agreement Summary (v4.0.0):")
-        )
-        nedc_ira = nft.load_parameters(pfile, nira.NEDC_IRA)
-        status = nira.run(ref_anns, hyp_anns, scmap, nedc_ira, odir, fp)
-        if status == False:
-            print(
-                "Error: %s (line: %s) %s: error in IRA scoring"
-                % (__FILE__, ndt.__LINE__, ndt.__NAME__)
-            )
-            sys.exit(os.EX_SOFTWARE)
-
     # print the final message to the summary file, close it and exit
     #
     print(" ... done ...")
@@ -21,13 +21,17 @@
 #
 import os
 import sys
-import math
+
+# import required third-party modules
+#
+import numpy as np
 
 # import required NEDC modules
 #
 import nedc_ann_tools as nat
 import nedc_debug_tools as ndt
 import nedc_eval_common as nec
+import nedc_eval_metrics as nmet
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -64,6 +68,7 @@ dbgl = ndt.Dbgl()
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  nproc: the number of processes (None for all cpus)
 #
 # return: a boolean value indicating status
 #
@@ -72,7 +77,7 @@ dbgl = ndt.Dbgl()
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist, hyplist, mapping, nedc_epoch, odir, rfile, fp):
+def run(reflist, hyplist, mapping, nedc_epoch, odir, rfile, fp, nproc=1):
 
     # display an informational message
     #
@@ -107,7 +112,7 @@ def run(reflist, hyplist, mapping, nedc_epoch, odir, rfile, fp):
         )
 
     status = nepoch.init_score(mapping)
-    status = nepoch.score(reflist, hyplist, mapping, rfile)
+    status = nepoch.score(reflist, hyplist, mapping, rfile, nproc)
     if status == False:
         print(
             "Error: %s (line: %s) %s: error during scoring"
@@ -423,12 +428,13 @@ class NedcEpoch:
     #  files_hyp: a hypothesis file list
     #  map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  nproc: the number of processes (None for all cpus)
     #
     # return: a boolean value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref, files_hyp, score_map, rfile):
+    def score(self, files_ref, files_hyp, score_map, rfile, nproc=1):
 
         # display informational message
         #
@@ -438,118 +444,84 @@ class NedcEpoch:
                 % (__FILE__, ndt.__LINE__, NedcEpoch.__CLASS_NAME__, ndt.__NAME__)
             )
 
-        # declare local variables
-        #
-        status = True
-
-        # create the results file
-        #
-        self.rfile_d = nft.make_fp(rfile)
-
-        # loop over all files
+        # score the files (in parallel if nproc is not 1):
+        #  the per file results and counts are merged in file order
         #
-        for i, fname in enumerate(files_ref):
+        return nec.score_files(self, files_ref, files_hyp, rfile, nproc)
 
-            events_ref = files_ref.get(fname, None)
-            if events_ref == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
-
-            # get the hyp eventss
-            #
-            events_hyp = files_hyp.get(fname, None)
-            if events_hyp == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
-
-            # update the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
-
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+    #
+    # end of method
 
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+    # method: NedcEpoch::score_file
+    #
+    # arguments:
+    #  i: the index of the file
+    #  fname: the name of the file
+    #  events_ref: the reference events of the file
+    #  events_hyp: the hypothesis events of the file
+    #
+    # return: the per file results (None if an error occurred)
+    #
+    # This method adds a single file to the confusion matrix.
+    #
+    def score_file(self, i, fname, events_ref, events_hyp):
 
-            # add this to the confusion matrix
-            #
-            refo, hypo = self.compute(ann_ref, ann_hyp, self.epoch_dur_d)
-            if refo == None:
-                print(
-                    "Error: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcEpoch.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "error computing confusion matrix",
-                        fname,
-                    )
-                )
-                return False
+        # update the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-            # output the files to the per file results file
-            #
-            ref_fm, hyp_fm, hits, subs, inss, dels = nec.format_hyp(refo, hypo)
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
+        #
+        ann_ref = nec.map_events(events_ref, self.pmap_d)
+        ann_hyp = nec.map_events(events_hyp, self.pmap_d)
 
-            self.rfile_d.write("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
-            self.rfile_d.write(
-                "%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write("  Ref: %s" % ref_fm + nft.DELIM_NEWLINE)
-            self.rfile_d.write("  Hyp: %s" % hyp_fm + nft.DELIM_NEWLINE)
-            self.rfile_d.write(
-                "%7s (%s %d  %s %d  %s %d  %s %d  %s %d)"
+        # add this to the confusion matrix
+        #
+        refo, hypo = self.compute(ann_ref, ann_hyp, self.epoch_dur_d)
+        if refo == None:
+            print(
+                "Error: %s (line: %s) %s::%s: %s (%s)"
                 % (
-                    nft.STRING_EMPTY,
-                    "Hit:",
-                    hits,
-                    "Sub:",
-                    subs,
-                    "Ins:",
-                    inss,
-                    "Del:",
-                    dels,
-                    "Total:",
-                    subs + inss + dels,
+                    __FILE__,
+                    ndt.__LINE__,
+                    NedcEpoch.__CLASS_NAME__,
+                    ndt.__NAME__,
+                    "error computing confusion matrix",
+                    fname,
                 )
-                + nft.DELIM_NEWLINE
             )
-            self.rfile_d.write(nft.DELIM_NEWLINE)
+            return None
 
-        # close the file
-        #
-        self.rfile_d.close()
+        # output the file to the per file results
+        #
+        lines = []
+        ref_fm, hyp_fm, hits, subs, inss, dels = nec.format_hyp(refo, hypo)
+
+        lines.append("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
+        lines.append("%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE)
+        lines.append("  Ref: %s" % ref_fm + nft.DELIM_NEWLINE)
+        lines.append("  Hyp: %s" % hyp_fm + nft.DELIM_NEWLINE)
+        lines.append(
+            "%7s (%s %d  %s %d  %s %d  %s %d  %s %d)"
+            % (
+                nft.STRING_EMPTY,
+                "Hit:",
+                hits,
+                "Sub:",
+                subs,
+                "Ins:",
+                inss,
+                "Del:",
+                dels,
+                "Total:",
+                subs + inss + dels,
+            )
+            + nft.DELIM_NEWLINE
+        )
+        lines.append(nft.DELIM_NEWLINE)
 
-        # exit gracefully
-        #
-        return True
+        return nft.STRING_EMPTY.join(lines)
 
     #
     # end of method
@@ -580,61 +552,99 @@ class NedcEpoch:
         if round(ref[-1][1], 3) != round(hyp[-1][1], 3):
             return False
 
-        # prime the output strings with null characters
-        #
-        reft = [nec.NULL_CLASS]
-        hypt = [nec.NULL_CLASS]
-
-        # loop over the reference annotation starting at the middle
-        # of the first interval.
+        # sample the reference annotation starting at the middle
+        # of the first interval:
+        #  the times are computed from an integer counter to avoid
+        #  roundoff error
         #
         dur_by_2 = dur / float(2.0)
-        curr_time = dur / float(2.0)
-        start_time = float(0)
         stop_time = ref[-1][1]
-        i = 0
+        times = dur_by_2 + np.arange(int((stop_time - dur_by_2) / dur) + 2) * dur
+        times = times[times <= stop_time]
+
+        # convert the times to indices and the labels to integer codes
+        #
+        labels = []
+        codes = {}
+        for event in ref + hyp:
+            if event[2] not in codes:
+                codes[event[2]] = len(labels)
+                labels.append(event[2])
+        ref_codes = np.array([codes[event[2]] for event in ref])
+        hyp_codes = np.array([codes[event[2]] for event in hyp])
+        refc = ref_codes[self.times_to_indices(times, ref)]
+        hypc = hyp_codes[self.times_to_indices(times, hyp)]
+
+        # increment the substitution matrix and count the number of
+        # reference events
+        #
+        nlabels = len(labels)
+        counts = np.bincount(refc * nlabels + hypc, minlength=nlabels * nlabels)
+        for idx in np.flatnonzero(counts):
+            self.sub_d[labels[idx // nlabels]][labels[idx % nlabels]] += int(
+                counts[idx]
+            )
+        counts = np.bincount(refc, minlength=nlabels)
+        for idx in np.flatnonzero(counts):
+            self.tgt_d[labels[idx]] += int(counts[idx])
 
-        while curr_time <= stop_time:
+        # remove duplicate matches and add null characters at the start
+        # and the end of the output
+        #
+        keep = np.ones(len(times), dtype=bool)
+        keep[1:] = (refc[1:] != refc[:-1]) | (hypc[1:] != hypc[:-1])
+        refo = [nec.NULL_CLASS] + [labels[c] for c in refc[keep]]
+        hypo = [nec.NULL_CLASS] + [labels[c] for c in hypc[keep]]
+        if len(times) > 0:
+            refo.append(nec.NULL_CLASS)
+            hypo.append(nec.NULL_CLASS)
 
-            # convert time to an index
-            #
-            j = self.time_to_index(curr_time, ref)
-            k = self.time_to_index(curr_time, hyp)
+        # exit gracefully
+        #
+        return (refo, hypo)
 
-            # increment the substitution matrix
-            #
-            self.sub_d[ref[j][2]][hyp[k][2]] += int(1)
-            reft.append(ref[j][2])
-            hypt.append(hyp[k][2])
+    #
+    # end of method
 
-            # count the number of reference events
-            #
-            self.tgt_d[ref[j][2]] += 1
+    # method: NedcEpoch::times_to_indices
+    #
+    # arguments:
+    #  times: an array of times in secs
+    #  ann: a list of annotation events
+    #
+    # return: an array of indices
+    #
+    # This method finds the annotations corresponding to the times, the
+    # same as time_to_index for every time: the first event that contains
+    # the time, or the last event if no event contains the time.
+    #
+    def times_to_indices(self, times, ann):
 
-            # increment time:
-            #  do this using an integer counter to avoid roundoff error
-            #
-            i += 1
-            curr_time = dur_by_2 + i * dur
+        starts = np.array([entry[0] for entry in ann], dtype=float)
+        stops = np.array([entry[1] for entry in ann], dtype=float)
 
-        # add null characters at the output
+        # sorted events: the events that contain a time are consecutive,
+        #  the first one is the first event that stops at or after the time
         #
-        reft.append(nec.NULL_CLASS)
-        hypt.append(nec.NULL_CLASS)
+        if np.all(np.diff(starts) >= 0) and np.all(np.diff(stops) >= 0):
+            ind = np.searchsorted(stops, times, side="left")
+            ind = np.minimum(ind, len(ann) - 1)
+            found = (starts[ind] <= times) & (stops[ind] >= times)
 
-        # remove duplicate matches
+        # otherwise assign the events from the last to the first one
         #
-        refo = [reft[0]]
-        hypo = [hypt[0]]
-
-        for i in range(1, len(reft)):
-            if (reft[i] != reft[i - 1]) or (hypt[i] != hypt[i - 1]):
-                refo.append(reft[i])
-                hypo.append(hypt[i])
+        else:
+            ind = np.full(len(times), len(ann) - 1)
+            found = np.zeros(len(times), dtype=bool)
+            for i in range(len(ann) - 1, -1, -1):
+                contains = (starts[i] <= times) & (stops[i] >= times)
+                ind[contains] = i
+                found |= contains
 
-        # exit gracefully
+        # no match was found: use the last event (as index -1)
         #
-        return (refo, hypo)
+        ind[~found] = len(ann) - 1
+        return ind
 
     #
     # end of method
@@ -715,350 +725,41 @@ class NedcEpoch:
 
         # ----------------------------------------------------------------------
         # (1) The first block of parameters count events such as hits,
-        #     missses and false alarms.
-        #
-        # compute hits and misses
-        #
-        for key1 in self.sub_d:
-
-            # count the hits
-            #
-            self.hit_d[key1] += self.sub_d[key1][key1]
-
-            # count the misses
-            #
-            for key2 in self.sub_d:
-                if key1 != key2:
-                    self.mis_d[key1] += self.sub_d[key1][key2]
-
-        # compute false alarms relative to a designated null class:
-        #  assign this to insertions
-        #
-        for key1 in self.sub_d[self.null_class_d]:
+        #     missses and false alarms:
+        #      hits: the diagonal of the substitution matrix
+        #      misses: the rest of the row of the label
+        #      false alarms and insertions: the times the null class is
+        #       recognized as the label
+        #      deletions: the times the label is recognized as the null
+        #       class
+        #
+        cnf = nmet.NedcConfusion(self.sub_d)
+        counts = cnf.get_counts()
+        null = cnf.index(self.null_class_d)
+        fals = cnf.matrix_d[null, :].tolist()
+        dels = cnf.matrix_d[:, null].tolist()
+        for k, key1 in enumerate(cnf.labels_d):
+            self.hit_d[key1] += counts["tp"][k].item()
+            self.mis_d[key1] += counts["fn"][k].item()
             if key1 != self.null_class_d:
-                self.fal_d[key1] = self.sub_d[self.null_class_d][key1]
-
-        # compute insertions and deletions:
-        #  insertions are defined as the number of times 'key' is
-        #   recognized as the null_class
-        #  deletions are defined as the number of times the null class
-        #   is hypothesized as 'key'
-        #
-        for key1 in self.sub_d:
-            if key1 != self.null_class_d:
-                self.ins_d[key1] = self.sub_d[self.null_class_d][key1]
-                self.del_d[key1] = self.sub_d[key1][self.null_class_d]
+                self.fal_d[key1] = fals[k]
+                self.ins_d[key1] = fals[k]
+                self.del_d[key1] = dels[k]
             else:
                 self.ins_d[key1] = int(0)
                 self.del_d[key1] = int(0)
 
         # ----------------------------------------------------------------------
         # (2) The second block of computations are the derived measures
-        #     such as sensitivity. These are computed using a three-step
-        #     approach:
-        #      (2.1) convert the NxN matrix to an MxM matrix
-        #      (2.2) compute true positives, etc. (tp, tn, fp, fn)
-        #      (2.3) compute the derived measures (e.g., sensitivity)
+        #     such as sensitivity. The NxN substitution matrix is converted
+        #     to a 2x2 matrix per label: the "yes" condition corresponds to
+        #     the label, the "no" condition to the other labels.
         #
-        # loop over all labels
+        # (3) The third block of parameters are the summary values. The
+        #     measures of all labels and of the summary are computed by
+        #     nedc_eval_metrics: a false positive is an epoch.
         #
-        for key1 in self.sub_d:
-
-            # (2.1) convert the NxN substitution matrix to a 2x2 matrix:
-            #       the "yes" condition corresponds to label key1
-            #       the "no" condition corresponds to the other labels
-            #
-
-            # initialize and assign the "yes/yes" condition
-            #
-            subs = {}
-            subs["tp"] = self.sub_d[key1][key1]
-            subs["fn"] = int(0)
-            subs["fp"] = int(0)
-            subs["tn"] = int(0)
-
-            # assign the "tn" condition by summing all values
-            # correctly classified as not key1 (this is a sub-matrix
-            # with a row and column corresponding to key1 removed)
-            #
-            for key2 in self.sub_d:
-                for key3 in self.sub_d:
-                    if (key1 != key2) and (key1 != key3):
-                        subs["tn"] += self.sub_d[key2][key3]
-
-            # assign the "fn" and "fp" conditions by summing all values
-            # classified as not key1 in the key1 row and key1 column
-            #
-            for key2 in self.sub_d:
-                if key1 != key2:
-                    subs["fn"] += self.sub_d[key1][key2]
-                    subs["fp"] += self.sub_d[key2][key1]
-
-            # (2.2) compute true positives (tp), true negatives (tn),
-            #       false positives (fp) and false negatives (fn)
-            #
-            self.tp_d[key1] = subs["tp"]
-            self.tn_d[key1] = subs["tn"]
-            self.fp_d[key1] = subs["fp"]
-            self.fn_d[key1] = subs["fn"]
-
-            # check the health of the confusion matrix
-            #
-            tp = self.tp_d[key1]
-            fp = self.fp_d[key1]
-            tn = self.tn_d[key1]
-            fn = self.fn_d[key1]
-            tdur = self.total_dur_d
-
-            if (
-                ((tp + fn) == 0)
-                or ((fp + tn) == 0)
-                or ((tp + fp) == 0)
-                or ((fn + tn) == 0)
-            ):
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%d %d %d %d)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcEpoch.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "divide by zero",
-                        tp,
-                        fp,
-                        tn,
-                        fn,
-                    )
-                )
-            elif round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%f)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcEpoch.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "duration is zero",
-                        tdur,
-                    )
-                )
-
-            # (2.3) compute derived measures
-            #
-            if (tp + fn) != 0:
-                self.tpr_d[key1] = float(self.tp_d[key1]) / float(tp + fn)
-            else:
-                self.tpr_d[key1] = float(0)
-
-            if (tn + fp) != 0:
-                self.tnr_d[key1] = float(self.tn_d[key1]) / float(tn + fp)
-            else:
-                self.tnr_d[key1] = float(0)
-
-            if (tp + fp) != 0:
-                self.ppv_d[key1] = float(self.tp_d[key1]) / float(tp + fp)
-            else:
-                self.ppv_d[key1] = float(0)
-
-            if (tn + fn) != 0:
-                self.npv_d[key1] = float(self.tn_d[key1]) / float(tn + fn)
-            else:
-                self.npv_d[key1] = float(0)
-
-            self.fnr_d[key1] = 1 - float(self.tpr_d[key1])
-            self.fpr_d[key1] = 1 - float(self.tnr_d[key1])
-            self.fdr_d[key1] = 1 - float(self.ppv_d[key1])
-            self.for_d[key1] = 1 - float(self.npv_d[key1])
-
-            if (tp + tn + fp + fn) != 0:
-                self.acc_d[key1] = float(self.tp_d[key1] + self.tn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-                self.prv_d[key1] = float(self.tp_d[key1] + self.fn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-            else:
-                self.acc_d[key1] = float(0)
-                self.prv_d[key1] = float(0)
-
-            self.msr_d[key1] = 1 - self.acc_d[key1]
-
-            # compute the f1 score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            f1s_denom = float(self.ppv_d[key1] + self.tpr_d[key1])
-            if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcEpoch.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "f ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.f1s_d[key1] = float(0)
-            else:
-                self.f1s_d[key1] = 2.0 * self.ppv_d[key1] * self.tpr_d[key1] / f1s_denom
-
-            # compute the mcc score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            mcc_denom = (tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)
-            mcc_num = (tp * tn) - (fp * fn)
-            if round(mcc_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcEpoch.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "mcc ration divide by zero",
-                        key1,
-                    )
-                )
-                self.mcc_d[key1] = float(0)
-            else:
-                self.mcc_d[key1] = mcc_num / math.sqrt(mcc_denom)
-
-            # compute the false alarm rate
-            #
-            if round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcEpoch.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "zero duration",
-                        key1,
-                    )
-                )
-                self.flr_d[key1] = float(0)
-            else:
-                self.flr_d[key1] = float(fp) * self.epoch_dur_d / tdur * (60 * 60 * 24)
-
-        # ----------------------------------------------------------------------
-        # (3) the third block of parameters are the summary values
-        #
-        self.sum_tgt_d = sum(self.tgt_d.values())
-        self.sum_hit_d = sum(self.hit_d.values())
-        self.sum_mis_d = sum(self.mis_d.values())
-        self.sum_fal_d = sum(self.fal_d.values())
-        self.sum_ins_d = sum(self.ins_d.values())
-        self.sum_del_d = sum(self.del_d.values())
-
-        self.sum_tp_d = sum(self.tp_d.values())
-        self.sum_tn_d = sum(self.tn_d.values())
-        self.sum_fp_d = sum(self.fp_d.values())
-        self.sum_fn_d = sum(self.fn_d.values())
-
-        if (self.sum_tp_d + self.sum_fn_d) != 0:
-            self.sum_tpr_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fn_d)
-        else:
-            self.sum_tpr_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fp_d) != 0:
-            self.sum_tnr_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fp_d)
-        else:
-            self.sum_tnr_d = float(0)
-
-        if (self.sum_tp_d + self.sum_fp_d) != 0:
-            self.sum_ppv_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fp_d)
-        else:
-            self.sum_ppv_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fn_d) != 0:
-            self.sum_npv_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fn_d)
-        else:
-            self.sum_npv_d = float(0)
-
-        self.sum_fnr_d = 1 - float(self.sum_tpr_d)
-        self.sum_fpr_d = 1 - float(self.sum_tnr_d)
-        self.sum_fdr_d = 1 - float(self.sum_ppv_d)
-        self.sum_for_d = 1 - float(self.sum_npv_d)
-
-        if (self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d) != 0:
-            self.sum_acc_d = float(self.sum_tp_d + self.sum_tn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-            self.sum_prv_d = float(self.sum_tp_d + self.sum_fn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-        else:
-            self.sum_acc_d = float(0)
-            self.sum_prv_d = float(0)
-
-        self.sum_msr_d = 1 - self.sum_acc_d
-
-        if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcEpoch.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "f ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_f1s_d = float(0)
-        else:
-            self.sum_f1s_d = 2.0 * self.sum_ppv_d * self.sum_tpr_d / f1s_denom
-
-        # compute the mcc score:
-        #  this has to be done after sensitivity and prec are computed
-        #
-        sum_mcc_denom = (
-            (self.sum_tp_d + self.sum_fp_d)
-            * (self.sum_tp_d + self.sum_fn_d)
-            * (self.sum_tn_d + self.sum_fp_d)
-            * (self.sum_tn_d + self.sum_fn_d)
-        )
-        sum_mcc_num = (self.sum_tp_d * self.sum_tn_d) - (self.sum_fp_d * self.sum_fn_d)
-        if round(sum_mcc_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcEpoch.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "mcc ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_mcc_d = float(0)
-        else:
-            self.sum_mcc_d = sum_mcc_num / math.sqrt(sum_mcc_denom)
-
-        # compute the false alarm rate
-        #
-        if round(self.total_dur_d, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcEpoch.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "zero duration",
-                    "summary",
-                )
-            )
-            self.sum_flr_d = float(0)
-        else:
-            self.sum_flr_d = (
-                float(self.sum_fp_d)
-                * self.epoch_dur_d
-                / self.total_dur_d
-                * (60 * 60 * 24)
-            )
+        nmet.set_measures(self, cnf.labels_d, counts, self.epoch_dur_d)
 
         # exit gracefully
         #
@@ -1489,6 +1190,64 @@ class NedcEpoch:
     def get_det(self, key):
         return self.fpr_d[key], self.fnr_d[key]
 
+    # method: NedcEpoch::compute_roc
+    #
+    # arguments:
+    #  roc: an roc engine (nedc_eval_roc.NedcRoc)
+    #  ref: reference annotation
+    #  hyp: hypothesis annotation (with the confidence as the 4th element)
+    #  key: the target class
+    #
+    # return: a boolean value indicating status
+    #
+    # This method adds the counts of the 2x2 confusion matrix of the
+    # target class (see compute_performance) for all thresholds to the roc
+    # engine: an epoch that is hypothesized as the target class counts as
+    # a tp or fp if the confidence of the hyp event is admitted; an epoch
+    # of another class counts as a tn otherwise.
+    #
+    def compute_roc(self, roc, ref, hyp, key):
+
+        # check to make sure the annotations match
+        #
+        if round(ref[-1][1], 3) != round(hyp[-1][1], 3):
+            return False
+
+        # sample the annotations at the same times as compute
+        #
+        dur = self.epoch_dur_d
+        dur_by_2 = dur / float(2.0)
+        stop_time = ref[-1][1]
+        times = dur_by_2 + np.arange(int((stop_time - dur_by_2) / dur) + 2) * dur
+        times = times[times <= stop_time]
+
+        ref_tgt = np.array([event[2] == key for event in ref], dtype=bool)
+        hyp_tgt = np.array([event[2] == key for event in hyp], dtype=bool)
+        hyp_confs = np.array([event[3] for event in hyp], dtype=float)
+        hyp_idx = self.times_to_indices(times, hyp)
+        ref_pos = ref_tgt[self.times_to_indices(times, ref)]
+        hyp_pos = hyp_tgt[hyp_idx]
+        confs = hyp_confs[hyp_idx]
+
+        # add the counts
+        #
+        roc.add_confidences(hyp_confs[hyp_tgt])
+        roc.npos_d += int(np.count_nonzero(ref_pos))
+        roc.add("tp", admit=confs[ref_pos & hyp_pos])
+        roc.add("fp", admit=confs[~ref_pos & hyp_pos])
+        roc.add(
+            "tn",
+            const=np.count_nonzero(~ref_pos & ~hyp_pos),
+            reject=confs[~ref_pos & hyp_pos],
+        )
+
+        # exit gracefully
+        #
+        return True
+
+    #
+    # end of method
+
 
 # end of file
 #
@@ -31,6 +31,7 @@ import math
 import nedc_ann_tools as nat
 import nedc_debug_tools as ndt
 import nedc_eval_common as nec
+import nedc_eval_metrics as nmet
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -340,15 +341,8 @@ class NedcIra:
             # map the annotations before scoring:
             #  only extract the first label and convert to a pure list
             #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], self.pmap_d[key], event[2][key]])
-
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+            ann_ref = nec.map_events(events_ref, self.pmap_d)
+            ann_hyp = nec.map_events(events_hyp, self.pmap_d)
 
             # add this to the confusion matrix
             #
@@ -496,121 +490,15 @@ class NedcIra:
                 % (__FILE__, ndt.__LINE__, NedcIra.__CLASS_NAME__, ndt.__NAME__)
             )
 
-        # loop over all labels:
-        #  note that the confusion matrix is square by definition,
-        #  so loop counters can be interchanged.
-        #
-        for label in self.sub_d:
-
-            # compute the elements of the "yes/no" matrix
-            #
-            a = float(self.sub_d[label][label])
-            b = float(0)
-            c = float(0)
-            d = float(0)
-            for label2 in self.sub_d[label]:
-                if label != label2:
-                    b += float(self.sub_d[label][label2])
-                    c += float(self.sub_d[label2][label])
-                    d += float(self.sub_d[label2][label2])
-
-            # compute the intermediate probabilities
-            #
-            denom = a + b + c + d
-            if denom == float(0):
-                print(
-                    "Error: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcIra.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "error computing intermediate probabilities",
-                        label,
-                    )
-                )
-                p_o = float(0)
-                p_yes = float(0)
-                p_no = float(0)
-                p_e = float(0)
-            else:
-                p_o = (a + d) / (a + b + c + d)
-                p_yes = (a + b) / (a + b + c + d) * (a + c) / (a + b + c + d)
-                p_no = (c + d) / (a + b + c + d) * (b + d) / (a + b + c + d)
-                p_e = p_yes + p_no
-
-            # compute the final statistic
-            #
-            num = float(p_o - p_e)
-            denom = float(1) - p_e
-            if (denom == float(0)) and (num != float(0)):
-                print(
-                    "Error: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcIra.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "error computing kappa statistic",
-                        label,
-                    )
-                )
-                self.kappa_d[label] = 0
-            elif denom == float(0):
-                self.kappa_d[label] = float(1.0)
-            else:
-                self.kappa_d[label] = float((p_o - p_e) / (1 - p_e))
-
-        # compute a Kappa statistic over the entire matrix:
-        #  (1) compute the sum of the rows and columns
-        #  (2) sum of the diagonal
-        #  (3) sum of the matrix
-        #  (4) sum of the product of the rows and colums sums
+        # compute the kappa statistic of every label (against all other
+        # labels) and the multi-class kappa statistic over the entire
+        # matrix
         #
-        sum_rows = {}
-        for label1 in self.sub_d:
-            sum_rows[label1] = int(0)
-        sum_cols = {}
-        flbl = next(iter(self.sub_d))
-        for label1 in self.sub_d[flbl]:
-            sum_cols[label1] = int(0)
-
-        sum_M = int(0)
-        for label1 in self.sub_d:
-            sum_M += self.sub_d[label1][label1]
-            for label2 in self.sub_d[label1]:
-                sum_rows[label1] += self.sub_d[label1][label2]
-                sum_cols[label2] += self.sub_d[label1][label2]
-
-        sum_N = int(0)
-        sum_gc = int(0)
-        for label1 in self.sub_d:
-            sum_N += sum_rows[label1]
-            sum_gc += sum_rows[label1] * sum_cols[label1]
-
-        # (5) compute multi-class Kappa statistic
-        #
-        num = sum_N * sum_M - sum_gc
-        denom = sum_N * sum_N - sum_gc
-        if (denom == int(0)) and (num == int(0)):
-            self.mkappa_d = float(1)
-        elif denom == int(0):
-            print(
-                "Error: %s (line: %s) %s::%s: %s (%s %f %f)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcIra.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "error computing the multi-class kappa statistic",
-                    label,
-                    num,
-                    denom,
-                )
-            )
-            self.mkappa_d = 0
-        else:
-            self.mkappa_d = float(num) / float(denom)
+        cnf = nmet.NedcConfusion(self.sub_d)
+        kappa = cnf.get_kappa(NedcIra.__CLASS_NAME__)
+        for label, value in zip(cnf.labels_d, kappa.tolist()):
+            self.kappa_d[label] = value
+        self.mkappa_d = cnf.get_mkappa(NedcIra.__CLASS_NAME__)
 
         # exit gracefully
         #
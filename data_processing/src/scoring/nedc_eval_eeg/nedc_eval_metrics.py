@@ -0,0 +1,499 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/class/python/nedc_eval_tools/nedc_eval_metrics.py
+#
+# usage:
+#  import nedc_eval_metrics as nmet
+#
+# This file implements the derived measures that the NEDC scoring
+# algorithms report (sensitivity, specificity, f1 score, kappa, ...).
+#
+# A confusion matrix is held as a small numpy matrix whose rows and
+# columns are the interned labels (see nedc_ann_tools.intern_symbol) in
+# the order of the scoring map. Every label is reduced to a 2x2 matrix
+# ("yes": the label, "no": the other labels), such that the counts (tp,
+# tn, fp, fn) and the measures of all labels are arrays that are computed
+# at once. The scoring algorithms only differ in how they count tp, tn, fp
+# and fn, so they all use the same measures.
+# ------------------------------------------------------------------------------
+
+# import system modules
+#
+import os
+
+# import required third-party modules
+#
+import numpy as np
+
+# import NEDC modules
+#
+import nedc_ann_tools as nat
+import nedc_debug_tools as ndt
+
+# ------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+# ------------------------------------------------------------------------------
+
+# set the filename using basename
+#
+__FILE__ = os.path.basename(__file__)
+
+# define the counts of the 2x2 confusion matrix of a label
+#
+COUNTS = ["tp", "tn", "fp", "fn"]
+
+# define the derived measures: these are also the names of the attributes
+# of the scoring objects (without the "_d" suffix)
+#
+MEASURES = [
+    "tpr",
+    "tnr",
+    "ppv",
+    "npv",
+    "fnr",
+    "fpr",
+    "fdr",
+    "for",
+    "acc",
+    "prv",
+    "msr",
+    "f1s",
+    "mcc",
+    "flr",
+]
+
+# define the event counts that are added in the summary
+#
+TOTALS = ["tgt", "hit", "mis", "fal", "ins", "del"]
+
+# define the number of seconds per day: false alarm rates are per 24 hours
+#
+SECS_PER_DAY = 60 * 60 * 24
+
+# ------------------------------------------------------------------------------
+#
+# classes are listed here
+#
+# ------------------------------------------------------------------------------
+
+# class: NedcConfusion
+#
+# This class holds a confusion matrix (rows: reference, columns:
+# hypothesis) as a numpy matrix indexed by the position of the labels.
+#
+class NedcConfusion:
+
+    # define static variables for debug and verbosity
+    #
+    __CLASS_NAME__ = "NedcConfusion"
+
+    # method: NedcConfusion::constructor
+    #
+    # arguments:
+    #  sub: a confusion matrix as a dictionary ({ref: {hyp: count}})
+    #
+    # return: none
+    #
+    def __init__(self, sub):
+        self.labels_d = list(sub)
+        self.ids_d = np.array(
+            [nat.intern_symbol(label) for label in self.labels_d], dtype=np.int16
+        )
+        self.matrix_d = np.array(
+            [[sub[key1][key2] for key2 in self.labels_d] for key1 in self.labels_d]
+        ).reshape(len(self.labels_d), len(self.labels_d))
+
+    #
+    # end of method
+
+    # method: NedcConfusion::index
+    #
+    # arguments:
+    #  label: a label
+    #
+    # return: the row (and column) of the label in the matrix
+    #
+    def index(self, label):
+        return int(np.flatnonzero(self.ids_d == nat.intern_symbol(label))[0])
+
+    #
+    # end of method
+
+    # method: NedcConfusion::get_counts
+    #
+    # arguments: none
+    #
+    # return: a dictionary with the arrays of tp, tn, fp and fn per label
+    #
+    # For every label, tp is the diagonal element, fn the rest of its row,
+    # fp the rest of its column and tn the sum of the matrix without its
+    # row and column.
+    #
+    def get_counts(self):
+        diag = np.diagonal(self.matrix_d)
+        rows = self.matrix_d.sum(axis=1)
+        cols = self.matrix_d.sum(axis=0)
+        return {
+            "tp": diag,
+            "tn": self.matrix_d.sum() - rows - cols + diag,
+            "fp": cols - diag,
+            "fn": rows - diag,
+        }
+
+    #
+    # end of method
+
+    # method: NedcConfusion::get_kappa
+    #
+    # arguments:
+    #  cname: the name of the calling class (for messages)
+    #
+    # return: an array with Cohen's kappa statistic per label
+    #
+    # The kappa of a label is computed from a "yes/no" matrix: a, b and c
+    # are tp, fn and fp of its 2x2 matrix (see get_counts). as in NEDC
+    # v4.0.0, d is the sum of the diagonal elements of the other labels
+    # (not tn, which also counts the confusions between the other labels).
+    #
+    def get_kappa(self, cname=__CLASS_NAME__):
+
+        # compute the intermediate probabilities
+        #
+        counts = self.get_counts()
+        diag = np.diagonal(self.matrix_d)
+        a = counts["tp"].astype(np.float64)
+        b = counts["fn"].astype(np.float64)
+        c = counts["fp"].astype(np.float64)
+        d = other_sums(diag).astype(np.float64)
+        n = a + b + c + d
+        for k in np.flatnonzero(n == 0).tolist():
+            print(
+                "Error: %s (line: %s) %s::%s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    cname,
+                    ndt.__NAME__,
+                    "error computing intermediate probabilities",
+                    self.labels_d[k],
+                )
+            )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_o = np.where(n != 0, (a + d) / n, float(0))
+            p_yes = np.where(n != 0, (a + b) / n * (a + c) / n, float(0))
+            p_no = np.where(n != 0, (c + d) / n * (b + d) / n, float(0))
+            p_e = p_yes + p_no
+
+            # compute the final statistic:
+            #  the kappa is 1 if both the numerator and denominator are zero
+            #
+            num = p_o - p_e
+            denom = float(1) - p_e
+            kappa = np.where(denom != 0, num / denom, float(1))
+        for k in np.flatnonzero((denom == 0) & (num != 0)).tolist():
+            print(
+                "Error: %s (line: %s) %s::%s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    cname,
+                    ndt.__NAME__,
+                    "error computing kappa statistic",
+                    self.labels_d[k],
+                )
+            )
+            kappa[k] = float(0)
+
+        # exit gracefully
+        #
+        return kappa
+
+    #
+    # end of method
+
+    # method: NedcConfusion::get_mkappa
+    #
+    # arguments:
+    #  cname: the name of the calling class (for messages)
+    #
+    # return: the multi-class kappa statistic of the matrix
+    #
+    # The statistic is (N * M - G) / (N * N - G), with N the sum of the
+    # matrix, M the sum of the diagonal and G the sum of the products of
+    # the row and column sums.
+    #
+    def get_mkappa(self, cname=__CLASS_NAME__):
+        matrix = self.matrix_d.astype(object)
+        sum_n = matrix.sum()
+        sum_m = np.diagonal(matrix).sum()
+        sum_gc = (matrix.sum(axis=1) * matrix.sum(axis=0)).sum()
+
+        num = sum_n * sum_m - sum_gc
+        denom = sum_n * sum_n - sum_gc
+        if (denom == 0) and (num == 0):
+            return float(1)
+        elif denom == 0:
+            print(
+                "Error: %s (line: %s) %s::%s: %s (%f %f)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    cname,
+                    ndt.__NAME__,
+                    "error computing the multi-class kappa statistic",
+                    num,
+                    denom,
+                )
+            )
+            return float(0)
+        return float(num) / float(denom)
+
+    #
+    # end of method
+
+
+#
+# end of class
+
+# ------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+# ------------------------------------------------------------------------------
+
+# function: other_sums
+#
+# arguments:
+#  values: an array with a value per label
+#
+# return: an array with, for every label, the sum of the values of the
+#         other labels
+#
+def other_sums(values):
+    values = np.asarray(values)
+    mask = ~np.eye(len(values), dtype=bool)
+    return np.where(mask, values[np.newaxis, :], 0).sum(axis=1).astype(values.dtype)
+
+
+#
+# end of function
+
+# function: is_zero
+#
+# arguments:
+#  values: an array
+#
+# return: a boolean array, True where a value rounds to zero (see
+#         ndt.MAX_PRECISION)
+#
+def is_zero(values):
+    return np.array(
+        [round(value, ndt.MAX_PRECISION) == 0 for value in np.asarray(values).tolist()],
+        dtype=bool,
+    )
+
+
+#
+# end of function
+
+# function: compute_measures
+#
+# arguments:
+#  counts: a dictionary with the arrays of tp, tn, fp and fn per label
+#  dur: the total duration of the data (secs)
+#  scale: the duration of a false positive (secs) relative to the unit of
+#         the false alarm rate (1 for events, the epoch duration for
+#         epochs)
+#  labels: the labels (for messages)
+#  cname: the name of the calling class (for messages)
+#
+# return: a dictionary with the arrays of the derived measures (see
+#         MEASURES)
+#
+# A measure is zero if its denominator is zero.
+#
+def compute_measures(counts, dur, scale=1.0, labels=None, cname=__FILE__):
+
+    # the products of the counts are computed with python numbers, such
+    # that large integer counts do not overflow
+    #
+    tp, tn, fp, fn = [np.asarray(counts[key]) for key in COUNTS]
+    if labels == None:
+        labels = list(range(len(tp)))
+
+    # check the health of the confusion matrices
+    #
+    bad = ((tp + fn) == 0) | ((fp + tn) == 0) | ((tp + fp) == 0) | ((fn + tn) == 0)
+    for k in np.flatnonzero(bad).tolist():
+        print(
+            "Warning: %s (line: %s) %s::%s: %s (%d %d %d %d)"
+            % (
+                __FILE__,
+                ndt.__LINE__,
+                cname,
+                ndt.__NAME__,
+                "divide by zero",
+                tp[k],
+                fp[k],
+                tn[k],
+                fn[k],
+            )
+        )
+    if round(dur, ndt.MAX_PRECISION) == 0:
+        print(
+            "Warning: %s (line: %s) %s::%s: %s (%f)"
+            % (__FILE__, ndt.__LINE__, cname, ndt.__NAME__, "duration is zero", dur)
+        )
+
+    # compute the rates
+    #
+    def ratio(num, denom):
+        num = np.asarray(num, dtype=np.float64)
+        denom = np.asarray(denom, dtype=np.float64)
+        out = np.zeros(len(num), dtype=np.float64)
+        return np.divide(num, denom, out=out, where=(denom != 0))
+
+    msr = {}
+    msr["tpr"] = ratio(tp, tp + fn)
+    msr["tnr"] = ratio(tn, tn + fp)
+    msr["ppv"] = ratio(tp, tp + fp)
+    msr["npv"] = ratio(tn, tn + fn)
+    msr["fnr"] = 1 - msr["tpr"]
+    msr["fpr"] = 1 - msr["tnr"]
+    msr["fdr"] = 1 - msr["ppv"]
+    msr["for"] = 1 - msr["npv"]
+    msr["acc"] = ratio(tp + tn, tp + tn + fp + fn)
+    msr["prv"] = ratio(tp + fn, tp + tn + fp + fn)
+    msr["msr"] = 1 - msr["acc"]
+
+    # compute the f1 score
+    #
+    f1s_denom = msr["ppv"] + msr["tpr"]
+    zero = is_zero(f1s_denom)
+    for k in np.flatnonzero(zero).tolist():
+        print(
+            "Warning: %s (line: %s) %s::%s: %s (%s)"
+            % (
+                __FILE__,
+                ndt.__LINE__,
+                cname,
+                ndt.__NAME__,
+                "f ratio divide by zero",
+                labels[k],
+            )
+        )
+    msr["f1s"] = ratio(2.0 * msr["ppv"] * msr["tpr"], np.where(zero, 0, f1s_denom))
+
+    # compute the mcc score
+    #
+    tp, tn, fp, fn = [x.astype(object) for x in (tp, tn, fp, fn)]
+    mcc_denom = (tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)
+    mcc_num = (tp * tn) - (fp * fn)
+    zero = is_zero(mcc_denom)
+    for k in np.flatnonzero(zero).tolist():
+        print(
+            "Warning: %s (line: %s) %s::%s: %s (%s)"
+            % (
+                __FILE__,
+                ndt.__LINE__,
+                cname,
+                ndt.__NAME__,
+                "mcc ratio divide by zero",
+                labels[k],
+            )
+        )
+    msr["mcc"] = ratio(
+        mcc_num.astype(np.float64),
+        np.sqrt(np.where(zero, 0, mcc_denom).astype(np.float64)),
+    )
+
+    # compute the false alarm rate
+    #
+    if round(dur, ndt.MAX_PRECISION) == 0:
+        msr["flr"] = np.zeros(len(tp), dtype=np.float64)
+    else:
+        msr["flr"] = fp.astype(np.float64) * scale / dur * SECS_PER_DAY
+
+    # exit gracefully
+    #
+    return msr
+
+
+#
+# end of function
+
+# function: set_measures
+#
+# arguments:
+#  scorer: a scoring object
+#  labels: the labels
+#  counts: a dictionary with the arrays of tp, tn, fp and fn per label
+#  scale: see compute_measures
+#  last_f1s: compute the summary f1 score with the denominator of the
+#            last label
+#
+# return: none
+#
+# This function computes the measures of every label and of the summary,
+# and stores them in the dictionaries (e.g. tpr_d[label]) and summary
+# values (e.g. sum_tpr_d) of a scoring object. The summary adds the event
+# counts and the counts (tp, tn, fp, fn) of all labels, and computes the
+# measures of these totals.
+#
+# The summary f1 score of NEDC v4.0.0 divides by the sum of precision
+# and sensitivity of the last label (all scoring algorithms except
+# NIST). last_f1s reproduces this, such that the results can be compared
+# with published NEDC v4.0.0 results.
+#
+def set_measures(scorer, labels, counts, scale=1.0, last_f1s=True):
+
+    # compute and store the measures per label
+    #
+    cname = scorer.__CLASS_NAME__
+    msr = compute_measures(counts, scorer.total_dur_d, scale, labels, cname)
+    for name in COUNTS:
+        values = getattr(scorer, name + "_d")
+        for label, value in zip(labels, np.asarray(counts[name]).tolist()):
+            values[label] = value
+    for name in MEASURES:
+        values = getattr(scorer, name + "_d")
+        for label, value in zip(labels, msr[name].tolist()):
+            values[label] = value
+
+    # compute and store the summary
+    #
+    for name in TOTALS + COUNTS:
+        setattr(scorer, "sum_%s_d" % name, sum(getattr(scorer, name + "_d").values()))
+    totals = {name: [getattr(scorer, "sum_%s_d" % name)] for name in COUNTS}
+    msr = compute_measures(totals, scorer.total_dur_d, scale, ["summary"], cname)
+    for name in MEASURES:
+        setattr(scorer, "sum_%s_d" % name, msr[name][0].item())
+
+    # compute the summary f1 score as NEDC v4.0.0
+    #
+    if last_f1s and (len(labels) > 0):
+        f1s_denom = float(scorer.ppv_d[labels[-1]] + scorer.tpr_d[labels[-1]])
+        if round(f1s_denom, ndt.MAX_PRECISION) == 0:
+            print(
+                "Warning: %s (line: %s) %s::%s: %s (%s)"
+                % (
+                    __FILE__,
+                    ndt.__LINE__,
+                    cname,
+                    ndt.__NAME__,
+                    "f ratio divide by zero",
+                    "summary",
+                )
+            )
+            scorer.sum_f1s_d = float(0)
+        else:
+            scorer.sum_f1s_d = 2.0 * scorer.sum_ppv_d * scorer.sum_tpr_d / f1s_denom
+
+
+#
+# end of function
+
+#
+# end of file
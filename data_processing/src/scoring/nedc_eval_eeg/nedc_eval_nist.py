@@ -27,12 +27,12 @@ import os
 import sys
 import re
 from collections import OrderedDict
-import math
 
 # import required NEDC modules
 #
 import nedc_ann_tools as nat
 import nedc_debug_tools as ndt
+import nedc_eval_metrics as nmet
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -1184,298 +1184,27 @@ class NISTF4DE:
 
         # ----------------------------------------------------------------------
         # (2) The second block of computations are the derived measures
-        #     such as sensitivity. These are computed using a three-step
-        #     approach:
-        #      (2.2) compute true positives, etc. (tp, tn, fp, fn)
-        #      (2.3) compute the derived measures (e.g., sensitivity)
-        #
-        # loop over all labels
-        #
-        for key1 in self.hit_d:
-
-            # ------------------------------------------------------------------
-            # (2.2) The NIST algorithm outputs hits, misses and false alarms
-            #       directly. These must be converted to (tp, tn, fp, fn).
-            #
-            # compute true positives (tp): copy hits
-            #
-            self.tp_d[key1] = self.hit_d[key1]
-
-            # compute true negatives (tn):
-            #  sum the hits that are not the current label
-            #
-            tn_sum = int(0)
-            for key2 in self.hit_d:
-                if key1 != key2:
-                    tn_sum += self.hit_d[key2]
-            self.tn_d[key1] = tn_sum
-
-            # compute false positives (fp): copy false alarms
-            #
-            self.fp_d[key1] = self.fal_d[key1]
-
-            # compute false negatives (fn): copy misses
-            #
-            self.fn_d[key1] = self.mis_d[key1]
-
-            # check the health of the confusion matrix
-            #
-            tp = self.tp_d[key1]
-            fp = self.fp_d[key1]
-            tn = self.tn_d[key1]
-            fn = self.fn_d[key1]
-            tdur = self.total_dur_d
-
-            if (
-                ((tp + fn) == 0)
-                or ((fp + tn) == 0)
-                or ((tp + fp) == 0)
-                or ((fn + tn) == 0)
-            ):
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%d %d %d %d)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NISTF4DE.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "divide by zero",
-                        tp,
-                        fp,
-                        tn,
-                        fn,
-                    )
-                )
-            elif round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: duration is zero (%f)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NISTF4DE.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        tdur,
-                    )
-                )
-
-            # (2.3) compute derived measures
-            #
-            if (tp + fn) != 0:
-                self.tpr_d[key1] = float(self.tp_d[key1]) / float(tp + fn)
-            else:
-                self.tpr_d[key1] = float(0)
-
-            if (tn + fp) != 0:
-                self.tnr_d[key1] = float(self.tn_d[key1]) / float(tn + fp)
-            else:
-                self.tnr_d[key1] = float(0)
-
-            if (tp + fp) != 0:
-                self.ppv_d[key1] = float(self.tp_d[key1]) / float(tp + fp)
-            else:
-                self.ppv_d[key1] = float(0)
-
-            if (tn + fn) != 0:
-                self.npv_d[key1] = float(self.tn_d[key1]) / float(tn + fn)
-            else:
-                self.npv_d[key1] = float(0)
-
-            self.fnr_d[key1] = 1 - float(self.tpr_d[key1])
-            self.fpr_d[key1] = 1 - float(self.tnr_d[key1])
-            self.fdr_d[key1] = 1 - float(self.ppv_d[key1])
-            self.for_d[key1] = 1 - float(self.npv_d[key1])
-
-            if (tp + tn + fp + fn) != 0:
-                self.acc_d[key1] = float(self.tp_d[key1] + self.tn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-                self.prv_d[key1] = float(self.tp_d[key1] + self.fn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-            else:
-                self.acc_d[key1] = float(0)
-                self.prv_d[key1] = float(0)
-
-            self.msr_d[key1] = 1 - self.acc_d[key1]
-
-            # compute the f1 score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            f1s_denom = float(self.ppv_d[key1] + self.tpr_d[key1])
-            if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NISTF4DE.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "f ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.f1s_d[key1] = float(0)
-            else:
-                self.f1s_d[key1] = 2.0 * self.ppv_d[key1] * self.tpr_d[key1] / f1s_denom
-
-            # compute the mcc score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            mcc_denom = (tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)
-            mcc_num = (tp * tn) - (fp * fn)
-            if round(mcc_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NISTF4DE.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "mcc ration divide by zero",
-                        key1,
-                    )
-                )
-                self.mcc_d[key1] = float(0)
-            else:
-                self.mcc_d[key1] = mcc_num / math.sqrt(mcc_denom)
-
-            # compute the false alarm rate
-            #
-            if round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NISTF4DE.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "zero duration",
-                        key1,
-                    )
-                )
-                self.flr_d[key1] = float(0)
-            else:
-                self.flr_d[key1] = float(fp) / tdur * (60 * 60 * 24)
-
-        # ----------------------------------------------------------------------
-        # (3) the third block of parameters are the summary values
-        #
-        self.sum_tgt_d = sum(self.tgt_d.values())
-        self.sum_hit_d = sum(self.hit_d.values())
-        self.sum_mis_d = sum(self.mis_d.values())
-        self.sum_fal_d = sum(self.fal_d.values())
-        self.sum_ins_d = sum(self.ins_d.values())
-        self.sum_del_d = sum(self.del_d.values())
-
-        self.sum_tp_d = sum(self.tp_d.values())
-        self.sum_tn_d = sum(self.tn_d.values())
-        self.sum_fp_d = sum(self.fp_d.values())
-        self.sum_fn_d = sum(self.fn_d.values())
-
-        if (self.sum_tp_d + self.sum_fn_d) != 0:
-            self.sum_tpr_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fn_d)
-        else:
-            self.sum_tpr_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fp_d) != 0:
-            self.sum_tnr_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fp_d)
-        else:
-            self.sum_tnr_d = float(0)
-
-        if (self.sum_tp_d + self.sum_fp_d) != 0:
-            self.sum_ppv_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fp_d)
-        else:
-            self.sum_ppv_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fn_d) != 0:
-            self.sum_npv_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fn_d)
-        else:
-            self.sum_npv_d = float(0)
-
-        self.sum_fnr_d = 1 - float(self.sum_tpr_d)
-        self.sum_fpr_d = 1 - float(self.sum_tnr_d)
-        self.sum_fdr_d = 1 - float(self.sum_ppv_d)
-        self.sum_for_d = 1 - float(self.sum_npv_d)
-
-        if (self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d) != 0:
-            self.sum_acc_d = float(self.sum_tp_d + self.sum_tn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-            self.sum_prv_d = float(self.sum_tp_d + self.sum_fn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-        else:
-            self.sum_acc_d = float(0)
-            self.sum_prv_d = float(0)
-
-        self.sum_msr_d = 1 - self.sum_acc_d
-
-        # compute the f1 score
-        #
-        f1s_denom = self.sum_ppv_d + self.sum_tpr_d
-        if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NISTF4DE.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "f ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_f1s_d = float(0)
-        else:
-            self.sum_f1s_d = 2.0 * self.sum_ppv_d * self.sum_tpr_d / f1s_denom
-
-        # compute the mcc score:
-        #  this has to be done after sensitivity and prec are computed
-        #
-        sum_mcc_denom = (
-            (self.sum_tp_d + self.sum_fp_d)
-            * (self.sum_tp_d + self.sum_fn_d)
-            * (self.sum_tn_d + self.sum_fp_d)
-            * (self.sum_tn_d + self.sum_fn_d)
-        )
-        sum_mcc_num = (self.sum_tp_d * self.sum_tn_d) - (self.sum_fp_d * self.sum_fn_d)
-        if round(sum_mcc_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NISTF4DE.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "mcc ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_mcc_d = float(0)
-        else:
-            self.sum_mcc_d = sum_mcc_num / math.sqrt(sum_mcc_denom)
-
-        # compute the false alarm rate
-        #
-        if round(self.total_dur_d, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NISTF4DE.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "zero duration",
-                    "summary",
-                )
-            )
-            self.sum_flr_d = float(0)
-        else:
-            self.sum_flr_d = float(self.sum_fp_d) / self.total_dur_d * (60 * 60 * 24)
-
-        # compute the summary TWV as the average
-        #
-        self.sum_twv_d = float(sum(self.twv_d.values())) / len(self.twv_d)
+        #     such as sensitivity. The NIST algorithm outputs hits, misses
+        #     and false alarms directly. These are converted to (tp, tn,
+        #     fp, fn) per label:
+        #      tp: the hits
+        #      tn: the hits of the other labels
+        #      fp: the false alarms
+        #      fn: the misses
+        #
+        # (3) The third block of parameters are the summary values. The
+        #     measures of all labels and of the summary are computed by
+        #     nedc_eval_metrics.
+        #
+        labels = list(self.hit_d)
+        hits = [self.hit_d[key] for key in labels]
+        counts = {
+            "tp": hits,
+            "tn": nmet.other_sums(hits),
+            "fp": [self.fal_d[key] for key in labels],
+            "fn": [self.mis_d[key] for key in labels],
+        }
+        nmet.set_measures(self, labels, counts, last_f1s=False)
 
         # exit gracefully
         #
@@ -41,12 +41,13 @@
 #
 import os
 import sys
-import math
 
 # import required NEDC modules
 #
 import nedc_ann_tools as nat
 import nedc_debug_tools as ndt
+import nedc_eval_common as nec
+import nedc_eval_metrics as nmet
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -83,6 +84,7 @@ dbgl = ndt.Dbgl()
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  nproc: the number of processes (None for all cpus)
 #
 # return: a boolean value indicating status
 #
@@ -91,7 +93,7 @@ dbgl = ndt.Dbgl()
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist, hyplist, mapping, nedc_ovlp, odir, rfile, fp):
+def run(reflist, hyplist, mapping, nedc_ovlp, odir, rfile, fp, nproc=1):
 
     # display an informational message
     #
@@ -126,7 +128,7 @@ def run(reflist, hyplist, mapping, nedc_ovlp, odir, rfile, fp):
         )
 
     status = novlp.init_score(mapping)
-    status = novlp.score(reflist, hyplist, mapping, rfile)
+    status = novlp.score(reflist, hyplist, mapping, rfile, nproc)
     if status == False:
         print(
             "Error: %s (line: %s):%s: error during results"
@@ -440,12 +442,13 @@ class NedcOverlap:
     #  files_hyp: a hypothesis file list
     #  score_map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  nproc: the number of processes (None for all cpus)
     #
     # return: a boolean value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref, files_hyp, score_map, rfile):
+    def score(self, files_ref, files_hyp, score_map, rfile, nproc=1):
 
         # display informational message
         #
@@ -455,117 +458,79 @@ class NedcOverlap:
                 % (__FILE__, ndt.__LINE__, NedcOverlap.__CLASS_NAME__, ndt.__NAME__)
             )
 
-        # declare local variables
-        #
-        status = True
-
-        # create the results file
+        # score the files (in parallel if nproc is not 1):
+        #  the per file results and counts are merged in file order
         #
-        self.rfile_d = nft.make_fp(rfile)
-
-        # loop over all files
-        #
-        for i, fname in enumerate(files_ref):
-
-            events_ref = files_ref.get(fname, None)
-            if events_ref == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
-
-            # get the hyp eventss
-            #
-            events_hyp = files_hyp.get(fname, None)
-            if events_hyp == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
+        return nec.score_files(self, files_ref, files_hyp, rfile, nproc)
 
-            # update the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
+    #
+    # end of method
 
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+    # method: NedcOverlap::score_file
+    #
+    # arguments:
+    #  i: the index of the file
+    #  fname: the name of the file
+    #  events_ref: the reference events of the file
+    #  events_hyp: the hypothesis events of the file
+    #
+    # return: the per file results (None if an error occurred)
+    #
+    # This method adds a single file to the confusion matrix.
+    #
+    def score_file(self, i, fname, events_ref, events_hyp):
 
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], self.pmap_d[key], event[2][key]])
+        # update the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-            # add this to the confusion matrix
-            #
-            refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
-            if refo == None:
-                print(
-                    "Error: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcOverlap.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "error computing confusions",
-                        fname,
-                    )
-                )
-                return False
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
+        #
+        ann_ref = nec.map_events(events_ref, self.pmap_d)
+        ann_hyp = nec.map_events(events_hyp, self.pmap_d)
 
-            # output the files to the per file results file
-            #
-            self.rfile_d.write("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
-            self.rfile_d.write(
-                "%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write(
-                "  Ref: %s" % nft.DELIM_SPACE.join(refo) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write(
-                "  Hyp: %s" % nft.DELIM_SPACE.join(hypo) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write(
-                "%6s (%s %d  %s %d  %s %d  Total: %d)"
+        # add this to the confusion matrix
+        #
+        refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
+        if refo == None:
+            print(
+                "Error: %s (line: %s) %s::%s: %s (%s)"
                 % (
-                    nft.STRING_EMPTY,
-                    "Hit:",
-                    hit,
-                    "Miss:",
-                    mis,
-                    "False Alarms:",
-                    fal,
-                    hit + mis + fal,
+                    __FILE__,
+                    ndt.__LINE__,
+                    NedcOverlap.__CLASS_NAME__,
+                    ndt.__NAME__,
+                    "error computing confusions",
+                    fname,
                 )
-                + nft.DELIM_NEWLINE
             )
-            self.rfile_d.write(nft.DELIM_NEWLINE)
+            return None
 
-        # close the file
+        # output the file to the per file results
         #
-        self.rfile_d.close()
+        lines = []
+        lines.append("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
+        lines.append("%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE)
+        lines.append("  Ref: %s" % nft.DELIM_SPACE.join(refo) + nft.DELIM_NEWLINE)
+        lines.append("  Hyp: %s" % nft.DELIM_SPACE.join(hypo) + nft.DELIM_NEWLINE)
+        lines.append(
+            "%6s (%s %d  %s %d  %s %d  Total: %d)"
+            % (
+                nft.STRING_EMPTY,
+                "Hit:",
+                hit,
+                "Miss:",
+                mis,
+                "False Alarms:",
+                fal,
+                hit + mis + fal,
+            )
+            + nft.DELIM_NEWLINE
+        )
+        lines.append(nft.DELIM_NEWLINE)
 
-        # exit gracefully
-        #
-        return True
+        return nft.STRING_EMPTY.join(lines)
 
     #
     # end of method
@@ -601,17 +566,26 @@ class NedcOverlap:
         refo = []
         hypo = []
 
+        # find the events that overlap with an event with the same label
+        #  in the other annotation: a sweep over the events sorted by
+        #  start time (see nec.any_overlap)
+        #
+        codes = {}
+        ref_arrays = nec.event_arrays(ref, codes)
+        hyp_arrays = nec.event_arrays(hyp, codes)
+        ref_hits = nec.any_overlap(hyp_arrays, ref_arrays)
+        hyp_hits = nec.any_overlap(ref_arrays, hyp_arrays)
+
         # loop over the ref annotation to collect hits and misses
         #
         hit = int(0)
         mis = int(0)
         fal = int(0)
 
-        for event in ref:
+        for event, is_hit in zip(ref, ref_hits):
             self.tgt_d[event[2]] += 1
             refo.append(event[2])
-            labels, starts, stops = self.get_events(event[0], event[1], hyp)
-            if event[2] in labels:
+            if is_hit:
                 self.hit_d[event[2]] += 1
                 hit += 1
             else:
@@ -620,10 +594,9 @@ class NedcOverlap:
 
         # loop over the hyp annotation to collect false alarms
         #
-        for event in hyp:
+        for event, is_hit in zip(hyp, hyp_hits):
             hypo.append(event[2])
-            labels, starts, stops = self.get_events(event[0], event[1], ref)
-            if event[2] not in labels:
+            if not is_hit:
                 self.fal_d[event[2]] += 1
                 fal += 1
 
@@ -737,292 +710,27 @@ class NedcOverlap:
 
         # ----------------------------------------------------------------------
         # (2) The second block of computations are the derived measures
-        #     such as sensitivity. These are computed using a two-step
-        #     approach:
-        #      (2.2) compute true positives, etc. (tp, tn, fp, fn)
-        #      (2.3) compute the derived measures (e.g., sensitivity)
+        #     such as sensitivity. The overlap algorithm outputs hits, misses
+        #     and false alarms directly. These are converted to (tp, tn,
+        #     fp, fn) per label:
+        #      tp: the hits
+        #      tn: the hits of the other labels
+        #      fp: the false alarms
+        #      fn: the misses
         #
-        # loop over all labels
+        # (3) The third block of parameters are the summary values. The
+        #     measures of all labels and of the summary are computed by
+        #     nedc_eval_metrics.
         #
-        for key1 in self.hit_d:
-
-            # ------------------------------------------------------------------
-            # (2.2) The overlap algorithm outputs hits, misses and false alarms
-            #       directly. These must be converted to (tp, tn, fp, fn).
-            #
-            # compute true positives (tp)
-            #
-            self.tp_d[key1] = self.hit_d[key1]
-
-            # compute true negatives (tn):
-            #  sum the hits that are not the current label
-            #
-            tn_sum = int(0)
-            for key2 in self.hit_d:
-                if key1 != key2:
-                    tn_sum += self.hit_d[key2]
-            self.tn_d[key1] = tn_sum
-
-            # compute false positives (fp): copy false alarms
-            #
-            self.fp_d[key1] = self.fal_d[key1]
-
-            # compute false negatives (fn): copy misses
-            #
-            self.fn_d[key1] = self.mis_d[key1]
-
-            # check the health of the confusion matrix
-            #
-            tp = self.tp_d[key1]
-            fp = self.fp_d[key1]
-            tn = self.tn_d[key1]
-            fn = self.fn_d[key1]
-            tdur = self.total_dur_d
-
-            if (
-                ((tp + fn) == 0)
-                or ((fp + tn) == 0)
-                or ((tp + fp) == 0)
-                or ((fn + tn) == 0)
-            ):
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%d %d %d %d)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcOverlap.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "divide by zero",
-                        tp,
-                        fp,
-                        tn,
-                        fn,
-                    )
-                )
-            elif round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%f)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcOverlap.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "duration is zero",
-                        tdur,
-                    )
-                )
-
-            # (2.3) compute derived measures
-            #
-            if (tp + fn) != 0:
-                self.tpr_d[key1] = float(self.tp_d[key1]) / float(tp + fn)
-            else:
-                self.tpr_d[key1] = float(0)
-
-            if (tn + fp) != 0:
-                self.tnr_d[key1] = float(self.tn_d[key1]) / float(tn + fp)
-            else:
-                self.tnr_d[key1] = float(0)
-
-            if (tp + fp) != 0:
-                self.ppv_d[key1] = float(self.tp_d[key1]) / float(tp + fp)
-            else:
-                self.ppv_d[key1] = float(0)
-
-            if (tn + fn) != 0:
-                self.npv_d[key1] = float(self.tn_d[key1]) / float(tn + fn)
-            else:
-                self.npv_d[key1] = float(0)
-
-            self.fnr_d[key1] = 1 - float(self.tpr_d[key1])
-            self.fpr_d[key1] = 1 - float(self.tnr_d[key1])
-            self.fdr_d[key1] = 1 - float(self.ppv_d[key1])
-            self.for_d[key1] = 1 - float(self.npv_d[key1])
-
-            if (tp + tn + fp + fn) != 0:
-                self.acc_d[key1] = float(self.tp_d[key1] + self.tn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-                self.prv_d[key1] = float(self.tp_d[key1] + self.fn_d[key1]) / (
-                    tp + tn + fp + fn
-                )
-            else:
-                self.acc_d[key1] = float(0)
-                self.prv_d[key1] = float(0)
-
-            self.msr_d[key1] = 1 - self.acc_d[key1]
-
-            # compute the f1 score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            f1s_denom = float(self.ppv_d[key1] + self.tpr_d[key1])
-            if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcOverlap.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "f ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.f1s_d[key1] = float(0)
-            else:
-                self.f1s_d[key1] = 2.0 * self.ppv_d[key1] * self.tpr_d[key1] / f1s_denom
-
-            # compute the mcc score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            mcc_denom = (tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)
-            mcc_num = (tp * tn) - (fp * fn)
-            if round(mcc_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcOverlap.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "mcc ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.mcc_d[key1] = float(0)
-            else:
-                self.mcc_d[key1] = mcc_num / math.sqrt(mcc_denom)
-
-            # compute the false alarm rate
-            #
-            if round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcOverlap.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "zero duration",
-                        key1,
-                    )
-                )
-                self.flr_d[key1] = float(0)
-            else:
-                self.flr_d[key1] = float(fp) / tdur * (60 * 60 * 24)
-
-        # ----------------------------------------------------------------------
-        # (3) the third block of parameters are the summary values
-        #
-        self.sum_tgt_d = sum(self.tgt_d.values())
-        self.sum_hit_d = sum(self.hit_d.values())
-        self.sum_mis_d = sum(self.mis_d.values())
-        self.sum_fal_d = sum(self.fal_d.values())
-        self.sum_ins_d = sum(self.ins_d.values())
-        self.sum_del_d = sum(self.del_d.values())
-
-        self.sum_tp_d = sum(self.tp_d.values())
-        self.sum_tn_d = sum(self.tn_d.values())
-        self.sum_fp_d = sum(self.fp_d.values())
-        self.sum_fn_d = sum(self.fn_d.values())
-
-        if (self.sum_tp_d + self.sum_fn_d) != 0:
-            self.sum_tpr_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fn_d)
-        else:
-            self.sum_tpr_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fp_d) != 0:
-            self.sum_tnr_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fp_d)
-        else:
-            self.sum_tnr_d = float(0)
-
-        if (self.sum_tp_d + self.sum_fp_d) != 0:
-            self.sum_ppv_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fp_d)
-        else:
-            self.sum_ppv_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fn_d) != 0:
-            self.sum_npv_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fn_d)
-        else:
-            self.sum_npv_d = float(0)
-
-        self.sum_fnr_d = 1 - float(self.sum_tpr_d)
-        self.sum_fpr_d = 1 - float(self.sum_tnr_d)
-        self.sum_fdr_d = 1 - float(self.sum_ppv_d)
-        self.sum_for_d = 1 - float(self.sum_npv_d)
-
-        if (self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d) != 0:
-            self.sum_acc_d = float(self.sum_tp_d + self.sum_tn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-            self.sum_prv_d = float(self.sum_tp_d + self.sum_fn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-        else:
-            self.sum_acc_d = float(0)
-            self.sum_prv_d = float(0)
-
-        self.sum_msr_d = 1 - self.sum_acc_d
-
-        if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcOverlap.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "f ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_f1s_d = float(0)
-        else:
-            self.sum_f1s_d = 2.0 * self.sum_ppv_d * self.sum_tpr_d / f1s_denom
-
-        # compute the mcc score:
-        #  this has to be done after sensitivity and prec are computed
-        #
-        sum_mcc_denom = (
-            (self.sum_tp_d + self.sum_fp_d)
-            * (self.sum_tp_d + self.sum_fn_d)
-            * (self.sum_tn_d + self.sum_fp_d)
-            * (self.sum_tn_d + self.sum_fn_d)
-        )
-        sum_mcc_num = (self.sum_tp_d * self.sum_tn_d) - (self.sum_fp_d * self.sum_fn_d)
-        if round(sum_mcc_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcOverlap.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "mcc ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_mcc_d = float(0)
-        else:
-            self.sum_mcc_d = sum_mcc_num / math.sqrt(sum_mcc_denom)
-
-        # compute the false alarm rate
-        #
-        if round(self.total_dur_d, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcOverlap.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "zero duration",
-                    "summary",
-                )
-            )
-            self.sum_flr_d = float(0)
-        else:
-            self.sum_flr_d = float(self.sum_fp_d) / self.total_dur_d * (60 * 60 * 24)
+        labels = list(self.hit_d)
+        hits = [self.hit_d[key] for key in labels]
+        counts = {
+            "tp": hits,
+            "tn": nmet.other_sums(hits),
+            "fp": [self.fal_d[key] for key in labels],
+            "fn": [self.mis_d[key] for key in labels],
+        }
+        nmet.set_measures(self, labels, counts)
 
         # exit gracefully
         #
@@ -1460,6 +1168,82 @@ class NedcOverlap:
     def get_det(self, key):
         return self.fpr_d[key], self.fnr_d[key]
 
+    # method: NedcOverlap::compute_roc
+    #
+    # arguments:
+    #  roc: an roc engine (nedc_eval_roc.NedcRoc)
+    #  ref: reference annotation
+    #  hyp: hypothesis annotation (with the confidence as the 4th element)
+    #  key: the target class
+    #  null: the class of the rejected hypothesis events of the target class
+    #
+    # return: a boolean value indicating status
+    #
+    # This method adds the counts of compute_performance_roc for all
+    # thresholds to the roc engine:
+    #  a ref event of the target class is a hit (tp) if the maximum
+    #   confidence of the overlapping hyp events of the target class is
+    #   admitted
+    #  a ref event of another class is a hit (tn) if it overlaps with a
+    #   hyp event with the same label, or, for the null class, if the
+    #   minimum confidence of the overlapping hyp events of the target
+    #   class is rejected
+    #  a hyp event of the target class that doesn't overlap with a ref
+    #   event of the target class is a false alarm (fp) if it is admitted
+    #
+    def compute_roc(self, roc, ref, hyp, key, null):
+
+        # check to make sure the annotations match
+        #
+        if round(ref[-1][1], 3) != round(hyp[-1][1], 3):
+            return False
+
+        # split the hyp events of the target class from the other events:
+        #  the hyp events of the target class are found with an interval
+        #  index, the other events with a sweep (see nec.any_overlap)
+        #
+        tgt = [event for event in hyp if event[2] == key]
+        confs = [event[3] for event in tgt]
+        index = nec.Intervals([event[0] for event in tgt], [event[1] for event in tgt])
+        roc.add_confidences(confs)
+
+        codes = {}
+        ref_arrays = nec.event_arrays(ref, codes)
+        oth_arrays = nec.event_arrays([ev for ev in hyp if ev[2] != key], codes)
+        ref_hits = nec.any_overlap(oth_arrays, ref_arrays)
+
+        # loop over the ref annotation to collect hits
+        #
+        tp_admit = []
+        tn_const = int(0)
+        tn_reject = []
+        for event, is_hit in zip(ref, ref_hits):
+            ovlp = [confs[k] for k in index.find(event[0], event[1], strict=True)]
+            if event[2] == key:
+                roc.npos_d += 1
+                if len(ovlp) > 0:
+                    tp_admit.append(max(ovlp))
+            elif is_hit:
+                tn_const += 1
+            elif (event[2] == null) and (len(ovlp) > 0):
+                tn_reject.append(min(ovlp))
+        roc.add("tp", admit=tp_admit)
+        roc.add("tn", const=tn_const, reject=tn_reject)
+
+        # collect the false alarms of the hyp events of the target class
+        #
+        tgt_arrays = nec.event_arrays(tgt, codes)
+        ref_tgt_arrays = nec.event_arrays([ev for ev in ref if ev[2] == key], codes)
+        tgt_hits = nec.any_overlap(ref_tgt_arrays, tgt_arrays)
+        roc.add("fp", admit=[conf for conf, hit in zip(confs, tgt_hits) if not hit])
+
+        # exit gracefully
+        #
+        return True
+
+    #
+    # end of method
+
 
 # end of file
 #
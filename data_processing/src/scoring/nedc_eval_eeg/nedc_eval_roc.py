@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/class/python/nedc_eval_tools/nedc_eval_roc.py
+#
+# usage:
+#  import nedc_eval_roc as nroc
+#
+# This file implements an ROC/DET engine for the NEDC scoring algorithms.
+#
+# An operating point is a threshold on the confidence of the hypothesis
+# events of the target class: events with a confidence >= threshold are
+# admitted, the other events of the target class are scored as the null
+# class. Instead of rescoring the annotations for every threshold, the
+# scoring algorithms record for every scored unit (an event or an epoch)
+# the confidence at which it changes from one count to another. These
+# confidences are sorted once, so the counts of all operating points are
+# found by bisection. Scoring algorithms with fractional counts (taes)
+# record the change of a count at a confidence as a weight.
+# ------------------------------------------------------------------------------
+
+# import system modules
+#
+import os
+
+# import required third-party modules
+#
+import numpy as np
+
+# ------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+# ------------------------------------------------------------------------------
+
+# set the filename using basename
+#
+__FILE__ = os.path.basename(__file__)
+
+# define the counts of a 2x2 confusion matrix that depend on the threshold:
+#  the false negatives follow from the number of positives (tp + fn)
+#
+ROC_COUNTS = ["tp", "fp", "tn"]
+
+# ------------------------------------------------------------------------------
+#
+# classes are listed here
+#
+# ------------------------------------------------------------------------------
+
+# class: NedcRoc
+#
+# This class accumulates the counts of all operating points of an ROC or
+# DET curve. For every count, a unit is either counted at all thresholds,
+# counted if the threshold is <= a value (it is admitted, with a weight)
+# or counted if the threshold is > a value (it is rejected).
+#
+class NedcRoc:
+
+    # define static variables for debug and verbosity
+    #
+    __CLASS_NAME__ = "NedcRoc"
+
+    # method: NedcRoc::constructor
+    #
+    # arguments: none
+    #
+    # return: none
+    #
+    def __init__(self):
+
+        # the number of positive units (tp + fn)
+        #
+        self.npos_d = int(0)
+
+        # the units that are counted at all thresholds, the values (and
+        # weights) at which units are admitted and the values at which
+        # units are rejected, per count
+        #
+        self.const_d = {count: int(0) for count in ROC_COUNTS}
+        self.admit_d = {count: [] for count in ROC_COUNTS}
+        self.weights_d = {count: [] for count in ROC_COUNTS}
+        self.reject_d = {count: [] for count in ROC_COUNTS}
+
+        # the confidences of the hypothesis events of the target class
+        #
+        self.confs_d = []
+
+    #
+    # end of method
+
+    # method: NedcRoc::add
+    #
+    # arguments:
+    #  count: the count ("tp", "fp" or "tn")
+    #  const: the number of units counted at all thresholds
+    #  admit: the values at which units are counted (threshold <= value)
+    #  reject: the values at which units are counted (threshold > value)
+    #  weights: the weights of the admitted units (None: one per unit)
+    #
+    # return: none
+    #
+    def add(self, count, const=0, admit=(), reject=(), weights=None):
+        self.const_d[count] += const
+        if len(admit) > 0:
+            if weights is None:
+                weights = np.ones(len(admit), dtype=int)
+            self.admit_d[count].append(np.asarray(admit, dtype=float))
+            self.weights_d[count].append(np.asarray(weights))
+        if len(reject) > 0:
+            self.reject_d[count].append(np.asarray(reject, dtype=float))
+
+    #
+    # end of method
+
+    # method: NedcRoc::add_confidences
+    #
+    # arguments:
+    #  confs: the confidences of hypothesis events of the target class
+    #
+    # return: none
+    #
+    # The confidences are the default thresholds of the curve.
+    #
+    def add_confidences(self, confs):
+        if len(confs) > 0:
+            self.confs_d.append(np.asarray(confs, dtype=float))
+
+    #
+    # end of method
+
+    # method: NedcRoc::get_thresholds
+    #
+    # arguments: none
+    #
+    # return: the sorted unique confidences, followed by infinity (no
+    #         event is admitted)
+    #
+    def get_thresholds(self):
+        confs = np.concatenate([np.zeros(0)] + self.confs_d)
+        return np.append(np.unique(confs), np.inf)
+
+    #
+    # end of method
+
+    # method: NedcRoc::get_counts
+    #
+    # arguments:
+    #  thresholds: the thresholds (None for get_thresholds)
+    #
+    # return: a dictionary with the thresholds and the arrays of the
+    #         counts (tp, fn, fp, tn) at these thresholds
+    #
+    # This method sorts the values of every count once; the (weighted)
+    # number of admitted (value >= threshold) and the number of rejected
+    # (value < threshold) units are then found by bisection.
+    #
+    def get_counts(self, thresholds=None):
+        if thresholds is None:
+            thresholds = self.get_thresholds()
+        thresholds = np.asarray(thresholds, dtype=float)
+
+        counts = {"thresholds": thresholds}
+        for count in ROC_COUNTS:
+            admit = np.concatenate([np.zeros(0)] + self.admit_d[count])
+            weights = np.concatenate([np.zeros(0, dtype=int)] + self.weights_d[count])
+            order = np.argsort(admit, kind="stable")
+            admit = admit[order]
+            cumw = np.concatenate([np.zeros(1, dtype=int), np.cumsum(weights[order])])
+            reject = np.sort(np.concatenate([np.zeros(0)] + self.reject_d[count]))
+            counts[count] = (
+                self.const_d[count]
+                + cumw[-1]
+                - cumw[np.searchsorted(admit, thresholds, side="left")]
+                + np.searchsorted(reject, thresholds, side="left")
+            )
+        counts["fn"] = self.npos_d - counts["tp"]
+        return counts
+
+    #
+    # end of method
+
+    # method: NedcRoc::get_curve
+    #
+    # arguments:
+    #  thresholds: the thresholds (None for get_thresholds)
+    #
+    # return: a dictionary with the thresholds, the counts and the
+    #         true/false positive/negative rates (tpr, tnr, fpr, fnr)
+    #
+    # The rates are computed as in compute_performance_roc: a rate is
+    # zero if its denominator is zero.
+    #
+    def get_curve(self, thresholds=None):
+        curve = self.get_counts(thresholds)
+        tp, fn, fp, tn = curve["tp"], curve["fn"], curve["fp"], curve["tn"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            curve["tpr"] = np.where(tp + fn != 0, tp / (tp + fn), float(0))
+            curve["tnr"] = np.where(tn + fp != 0, tn / (tn + fp), float(0))
+        curve["fnr"] = 1 - curve["tpr"]
+        curve["fpr"] = 1 - curve["tnr"]
+        return curve
+
+    #
+    # end of method
+
+    # method: NedcRoc::get_roc
+    #
+    # arguments:
+    #  thresholds: the thresholds (None for get_thresholds)
+    #
+    # return: the false positive rates and the true positive rates
+    #
+    def get_roc(self, thresholds=None):
+        curve = self.get_curve(thresholds)
+        return curve["fpr"], curve["tpr"]
+
+    #
+    # end of method
+
+    # method: NedcRoc::get_det
+    #
+    # arguments:
+    #  thresholds: the thresholds (None for get_thresholds)
+    #
+    # return: the false positive rates and the false negative rates
+    #
+    def get_det(self, thresholds=None):
+        curve = self.get_curve(thresholds)
+        return curve["fpr"], curve["fnr"]
+
+    #
+    # end of method
+
+
+# end of file
+#
@@ -23,12 +23,13 @@
 #
 import os
 import sys
-import math
 
 # import required nedc modules
 #
 import nedc_ann_tools as nat
 import nedc_debug_tools as ndt
+import nedc_eval_common as nec
+import nedc_eval_metrics as nmet
 import nedc_file_tools as nft
 
 # ------------------------------------------------------------------------------
@@ -65,6 +66,7 @@ dbgl = ndt.Dbgl()
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  nproc: the number of processes (None for all cpus)
 #
 # return: a boolean value indicating status
 #
@@ -73,7 +75,7 @@ dbgl = ndt.Dbgl()
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist, hyplist, mapping, nedc_taes, odir, rfile, fp):
+def run(reflist, hyplist, mapping, nedc_taes, odir, rfile, fp, nproc=1):
 
     # display an informational message
     #
@@ -108,7 +110,7 @@ def run(reflist, hyplist, mapping, nedc_taes, odir, rfile, fp):
         )
 
     status = ntaes.init_score(mapping)
-    status = ntaes.score(reflist, hyplist, mapping, rfile)
+    status = ntaes.score(reflist, hyplist, mapping, rfile, nproc)
     if status == False:
         print(
             "Error: %s (line: %s) %s: error during scoring"
@@ -418,12 +420,13 @@ class NedcTAES:
     #  files_hyp: a hypothesis file list
     #  score_map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  nproc: the number of processes (None for all cpus)
     #
     # return: a boolean value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref, files_hyp, score_map, rfile):
+    def score(self, files_ref, files_hyp, score_map, rfile, nproc=1):
 
         # display informational message
         #
@@ -433,118 +436,80 @@ class NedcTAES:
                 % (__FILE__, ndt.__LINE__, NedcTAES.__CLASS_NAME__, ndt.__NAME__)
             )
 
-        # declare local variables
-        #
-        status = True
-
-        # create the results file
-        #
-        self.rfile_d = nft.make_fp(rfile)
-
-        # loop over all files
+        # score the files (in parallel if nproc is not 1):
+        #  the per file results and counts are merged in file order
         #
-        for i, fname in enumerate(files_ref):
+        return nec.score_files(self, files_ref, files_hyp, rfile, nproc)
 
-            events_ref = files_ref.get(fname, None)
-            if events_ref == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
-
-            # get the hyp eventss
-            #
-            events_hyp = files_hyp.get(fname, None)
-            if events_hyp == None:
-                print(
-                    "Error: %s (line: %s) %s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        "error getting annotations",
-                        fname,
-                    )
-                )
-                return False
-
-            # pudate the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
+    #
+    # end of method
 
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key0 = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], self.pmap_d[key0], event[2][key0]])
+    # method: NedcTAES::score_file
+    #
+    # arguments:
+    #  i: the index of the file
+    #  fname: the name of the file
+    #  events_ref: the reference events of the file
+    #  events_hyp: the hypothesis events of the file
+    #
+    # return: the per file results (None if an error occurred)
+    #
+    # This method adds a single file to the confusion matrix.
+    #
+    def score_file(self, i, fname, events_ref, events_hyp):
 
-            ann_hyp = []
-            for event in events_hyp:
-                key0 = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], self.pmap_d[key0], event[2][key0]])
+        # pudate the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-            # add this to the confusion matrix
-            #
-            refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
-            if refo == None:
-                (
-                    "Error: %s (line: %s) %s::%s %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        Nedc_TAES.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "error computing confusion matrix",
-                        fname,
-                    )
-                )
-                return False
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
+        #
+        ann_ref = nec.map_events(events_ref, self.pmap_d)
+        ann_hyp = nec.map_events(events_hyp, self.pmap_d)
 
-            # output the files to the per file results file
-            #
-            self.rfile_d.write("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
-            self.rfile_d.write(
-                "%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write(
-                "  Ref: %s" % nft.DELIM_SPACE.join(refo) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write(
-                "  Hyp: %s" % nft.DELIM_SPACE.join(hypo) + nft.DELIM_NEWLINE
-            )
-            self.rfile_d.write(
-                "%6s (%s %.4f  %s %.4f  %s %.4f  %s %.4f)"
+        # add this to the confusion matrix
+        #
+        refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
+        if refo == None:
+            (
+                "Error: %s (line: %s) %s::%s %s (%s)"
                 % (
-                    nft.STRING_EMPTY,
-                    "Hit:",
-                    hit,
-                    "Miss:",
-                    mis,
-                    "False Alarms:",
-                    fal,
-                    "Total:",
-                    mis + fal,
+                    __FILE__,
+                    ndt.__LINE__,
+                    Nedc_TAES.__CLASS_NAME__,
+                    ndt.__NAME__,
+                    "error computing confusion matrix",
+                    fname,
                 )
-                + nft.DELIM_NEWLINE
             )
-            self.rfile_d.write(nft.DELIM_NEWLINE)
+            return None
 
-        # close the file
-        #
-        self.rfile_d.close()
+        # output the file to the per file results
+        #
+        lines = []
+        lines.append("%5d: %s" % (i, fname) + nft.DELIM_NEWLINE)
+        lines.append("%5s  %s" % (nft.STRING_EMPTY, fname) + nft.DELIM_NEWLINE)
+        lines.append("  Ref: %s" % nft.DELIM_SPACE.join(refo) + nft.DELIM_NEWLINE)
+        lines.append("  Hyp: %s" % nft.DELIM_SPACE.join(hypo) + nft.DELIM_NEWLINE)
+        lines.append(
+            "%6s (%s %.4f  %s %.4f  %s %.4f  %s %.4f)"
+            % (
+                nft.STRING_EMPTY,
+                "Hit:",
+                hit,
+                "Miss:",
+                mis,
+                "False Alarms:",
+                fal,
+                "Total:",
+                mis + fal,
+            )
+            + nft.DELIM_NEWLINE
+        )
+        lines.append(nft.DELIM_NEWLINE)
 
-        # exit gracefully
-        #
-        return True
+        return nft.STRING_EMPTY.join(lines)
 
     #
     # end of method
@@ -589,13 +554,17 @@ class NedcTAES:
         # generate flags for hypothesis and reference values to indicate
         # whether an event is used once or not (for detection)
         #
-        hflags = []
-        rflags = []
+        hflags = [True] * len(hyp)
+        rflags = [True] * len(ref)
 
-        for i in range(len(hyp)):
-            hflags.append(True)
-        for i in range(len(ref)):
-            rflags.append(True)
+        # index the events per label:
+        #  the integer bounds are used to find the events that overlap
+        #  according to anyovlp, the real bounds for the strict overlap
+        #  of get_events
+        #
+        ref_ovlp = self.index_events(ref, True)
+        hyp_ovlp = self.index_events(hyp, True)
+        hyp_strict = self.index_events(hyp, False)
 
         # loop through ref events
         #
@@ -604,43 +573,41 @@ class NedcTAES:
             tgt_event = ref[i][2]
             refo.append(ref[i][2])
 
-            # collect hyp events which are in some overlap with ref event
+            # one event at a time, don't bother if ref/hyp labels don't
+            # overlap (no hyp event with this label in strict overlap)
             #
-            labels, starts, stops = self.get_events(ref[i][0], ref[i][1], hyp, hflags)
+            if not rflags[i] or tgt_event not in hyp_strict:
+                continue
+            if not hyp_strict[tgt_event].find(ref[i][0], ref[i][1], True):
+                continue
 
-            # one event at a time, don't bother if ref/hyp labels don't overlap
+            # collect the hyp events with the same label that overlap
+            # with the ref event (see anyovlp)
             #
-            if ref[i][2] in labels and rflags[i]:
-
-                # loop through all hyp events and calculate partial HMF
-                #
-                for j in range(len(hyp)):
+            start_r, stop_r = int(ref[i][0]), int(ref[i][1])
+            hinds = []
+            if start_r <= stop_r and tgt_event in hyp_ovlp:
+                hinds = hyp_ovlp[tgt_event].find(start_r, stop_r)
 
-                    # compare hyp and ref event labels and hyp flags status;
-                    #
-                    if hyp[j][2] == ref[i][2] and hflags[j]:
-
-                        p_hit, p_miss, p_fa = self.compute_partial(
-                            ref, hyp, i, j, rflags, hflags, tgt_event
-                        )
-
-                        # updat the HMF confusion matrix
-                        #
-                        hit += p_hit
-                        mis += p_miss
-                        fal += p_fa
+            # calculate partial HMF for all overlapping hyp events
+            #
+            for k, j in enumerate(hinds):
+                if not hflags[j]:
+                    continue
 
-                        self.hit_d[ref[i][2]] += p_hit
-                        self.mis_d[ref[i][2]] += p_miss
-                        self.fal_d[ref[i][2]] += p_fa
+                p_hit, p_miss, p_fa = self.compute_partial_ovlp(
+                    ref, hyp, i, j, hinds[k + 1 :], ref_ovlp, rflags, hflags
+                )
 
-                    # update the hyp event index
-                    #
-                    j += 1
+                # updat the HMF confusion matrix
+                #
+                hit += p_hit
+                mis += p_miss
+                fal += p_fa
 
-            # updated the ref event index
-            #
-            i += 1
+                self.hit_d[ref[i][2]] += p_hit
+                self.mis_d[ref[i][2]] += p_miss
+                self.fal_d[ref[i][2]] += p_fa
 
         # update the absolute misses and false alarms from flags
         #
@@ -653,6 +620,113 @@ class NedcTAES:
         #
         return (refo, hypo, hit, mis, fal)
 
+    # method: NedcTAES::index_events
+    #
+    # arguments:
+    #  events: a list of events
+    #  closed: if True, index the integer bounds of the events that
+    #          anyovlp uses, else the real bounds
+    #
+    # return: a dictionary with an interval index (nec.Intervals) per label
+    #
+    def index_events(self, events, closed):
+
+        bounds = {}
+        for i, event in enumerate(events):
+            start, stop = event[0], event[1]
+            if closed:
+                # events with an empty range of seconds never overlap
+                #
+                start, stop = int(start), int(stop)
+                if start > stop:
+                    continue
+            bounds.setdefault(event[2], ([], [], []))
+            bounds[event[2]][0].append(start)
+            bounds[event[2]][1].append(stop)
+            bounds[event[2]][2].append(i)
+
+        return {
+            label: nec.Intervals(starts, stops, ids)
+            for label, (starts, stops, ids) in bounds.items()
+        }
+
+    #
+    # end of method
+
+    # method: NedcTAES::compute_partial_ovlp
+    #
+    # arguments:
+    #  ref: reference label information as a list
+    #  hyp: hypothesis label information as a list
+    #  rind: ref index where ovlp is detected
+    #  hind: hyp index where ovlp is detected
+    #  hinds: the next hyp events that overlap with the ref event
+    #  ref_ovlp: the index of the ref events (see index_events)
+    #  rflags: reference flags indicating the processed labels
+    #  hflags: hypothesis flags indicating the processed labels
+    #
+    # return:
+    #  p_hit: detected partial hits
+    #  p_miss: detected partial miss
+    #  p_fa: detected partial FAs
+    #
+    # This method is the same as compute_partial for overlapping events,
+    # but only visits the events that overlap (see ovlp_ref_seqs and
+    # ovlp_hyp_seqs).
+    #
+    def compute_partial_ovlp(
+        self, ref, hyp, rind, hind, hinds, ref_ovlp, rflags, hflags
+    ):
+
+        # calculate the parameters for the current event
+        #
+        p_miss = float(0)
+        p_hit, p_fa = self.calc_hf(ref[rind], hyp[hind])
+        p_miss += float(1) - p_hit
+
+        # update flags for already detected events
+        #
+        rflags[rind] = False
+        hflags[hind] = False
+
+        # check whether detected event stop time exceed the
+        # reference stop time: look for more ref events overlapping
+        # with the hyp event
+        #
+        #  <-->    <-->  <-->
+        # <--------------------->
+        #
+        if float(hyp[hind][1]) >= float(ref[rind][1]):
+            start_h, stop_h = int(hyp[hind][0]), int(hyp[hind][1])
+            for i in ref_ovlp[hyp[hind][2]].find(start_h, stop_h):
+                if i > rind:
+                    rflags[i] = False
+                    p_miss += 1
+
+        # check whether reference event stop time exceed the
+        # detected stop time: look for more hyp events overlapping
+        # with the ref event
+        #
+        #  <----------------------->
+        #   <---->  <-->   <-->
+        #
+        elif float(ref[rind][1]) > float(hyp[hind][1]):
+            for i in hinds:
+                hflags[i] = False
+
+                ovlp_hit, ovlp_fa = self.calc_hf(ref[rind], hyp[i])
+
+                p_hit += ovlp_hit
+                p_miss -= ovlp_hit
+                p_fa += ovlp_fa
+
+        # exit gracefully
+        #
+        return p_hit, p_miss, p_fa
+
+    #
+    # end of method
+
     # method: NedcTAES::update_abs_mf
     #
     # arguments:
@@ -918,17 +992,19 @@ class NedcTAES:
     #
     def anyovlp(self, ref, hyp):
 
-        # create set for the ref/hyp events
+        # compare the ranges of seconds of the ref/hyp events
+        # (the same as intersecting the sets of seconds)
         #
-        refset = set(range(int(ref[0]), int(ref[1]) + 1))
-        hypset = set(range(int(hyp[0]), int(hyp[1]) + 1))
-
-        if len(refset.intersection(hypset)) != 0:
-            return True
+        start_r, stop_r = int(ref[0]), int(ref[1])
+        start_h, stop_h = int(hyp[0]), int(hyp[1])
 
         # return gracefully
         #
-        return False
+        return (
+            start_r <= stop_r
+            and start_h <= stop_h
+            and (start_r <= stop_h and start_h <= stop_r)
+        )
 
     #
     # end of method
@@ -1119,292 +1195,27 @@ class NedcTAES:
 
         # ----------------------------------------------------------------------
         # (2) The second block of computations are the derived measures
-        #     such as sensitivity. These are computed using a two-step
-        #     approach:
-        #      (2.2) compute true positives, etc. (tp, tn, fp, fn)
-        #      (2.3) compute the derived measures (e.g., sensitivity)
-        #
-        # loop over all labels
-        #
-        for key1 in self.hit_d:
-
-            # ------------------------------------------------------------------
-            # (2.2) The overlap algorithm outputs hits, misses and false alarms
-            #       directly. These must be converted to (tp, tn, fp, fn).
-            #
-            # compute true positives (tp)
-            #
-            self.tp_d[key1] = self.hit_d[key1]
-
-            # compute true negatives (tn):
-            #  sum the hits that are not the current label
-            #
-            tn_sum = int(0)
-            for key2 in self.hit_d:
-                if key1 != key2:
-                    tn_sum += self.hit_d[key2]
-            self.tn_d[key1] = tn_sum
-
-            # compute false positives (fpos): copy false alarms
-            #
-            self.fp_d[key1] = self.fal_d[key1]
-
-            # compute false negatives (fn): copy misses
-            #
-            self.fn_d[key1] = self.mis_d[key1]
-
-            # check the health of the confusion matrix
-            #
-            tp = self.tp_d[key1]
-            fpos = self.fp_d[key1]
-            tn = self.tn_d[key1]
-            fn = self.fn_d[key1]
-            tdur = self.total_dur_d
-
-            if (
-                ((tp + fn) == 0)
-                or ((fpos + tn) == 0)
-                or ((tp + fpos) == 0)
-                or ((fn + tn) == 0)
-            ):
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%d %d %d %d)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcTAES.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "divide by zero",
-                        tp,
-                        fpos,
-                        tn,
-                        fn,
-                    )
-                )
-            elif round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%f)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcTAES.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "duration is zero",
-                        tdur,
-                    )
-                )
-
-            # (2.3) compute derived measures
-            #
-            if (tp + fn) != 0:
-                self.tpr_d[key1] = float(self.tp_d[key1]) / float(tp + fn)
-            else:
-                self.tpr_d[key1] = float(0)
-
-            if (tn + fpos) != 0:
-                self.tnr_d[key1] = float(self.tn_d[key1]) / float(tn + fpos)
-            else:
-                self.tnr_d[key1] = float(0)
-
-            if (tp + fpos) != 0:
-                self.ppv_d[key1] = float(self.tp_d[key1]) / float(tp + fpos)
-            else:
-                self.ppv_d[key1] = float(0)
-
-            if (tn + fn) != 0:
-                self.npv_d[key1] = float(self.tn_d[key1]) / float(tn + fn)
-            else:
-                self.npv_d[key1] = float(0)
-
-            self.fnr_d[key1] = 1 - float(self.tpr_d[key1])
-            self.fpr_d[key1] = 1 - float(self.tnr_d[key1])
-            self.fdr_d[key1] = 1 - float(self.ppv_d[key1])
-            self.for_d[key1] = 1 - float(self.npv_d[key1])
-
-            if (tp + tn + fpos + fn) != 0:
-                self.acc_d[key1] = float(self.tp_d[key1] + self.tn_d[key1]) / (
-                    tp + tn + fpos + fn
-                )
-                self.prv_d[key1] = float(self.tp_d[key1] + self.fn_d[key1]) / (
-                    tp + tn + fpos + fn
-                )
-            else:
-                self.acc_d[key1] = float(0)
-                self.prv_d[key1] = float(0)
-
-            self.msr_d[key1] = 1 - self.acc_d[key1]
-
-            # compute the f1 score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            f1s_denom = float(self.ppv_d[key1] + self.tpr_d[key1])
-            if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line %s) %s::%s %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        ndt.__NAME__,
-                        ndt.__NAME__,
-                        "f ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.f1s_d[key1] = float(0)
-            else:
-                self.f1s_d[key1] = 2.0 * self.ppv_d[key1] * self.tpr_d[key1] / f1s_denom
-
-            # compute the mcc score:
-            #  this has to be done after sensitivity and prec are computed
-            #
-            mcc_denom = (tp + fpos) * (tp + fn) * (tn + fpos) * (tn + fn)
-            mcc_num = (tp * tn) - (fpos * fn)
-            if round(mcc_denom, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcTAES.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "mcc ratio divide by zero",
-                        key1,
-                    )
-                )
-                self.mcc_d[key1] = float(0)
-            else:
-                self.mcc_d[key1] = mcc_num / math.sqrt(mcc_denom)
-
-            # compute the false alarm rate
-            #
-            if round(tdur, ndt.MAX_PRECISION) == 0:
-                print(
-                    "Warning: %s (line: %s) %s::%s: %s (%s)"
-                    % (
-                        __FILE__,
-                        ndt.__LINE__,
-                        NedcTAES.__CLASS_NAME__,
-                        ndt.__NAME__,
-                        "zero duration",
-                        key1,
-                    )
-                )
-                self.flr_d[key1] = float(0)
-            else:
-                self.flr_d[key1] = float(fpos) / tdur * (60 * 60 * 24)
-
-        # ----------------------------------------------------------------------
-        # (3) the third block of parameters are the summary values
-        #
-        self.sum_tgt_d = sum(self.tgt_d.values())
-        self.sum_hit_d = sum(self.hit_d.values())
-        self.sum_mis_d = sum(self.mis_d.values())
-        self.sum_fal_d = sum(self.fal_d.values())
-        self.sum_ins_d = sum(self.ins_d.values())
-        self.sum_del_d = sum(self.del_d.values())
-
-        self.sum_tp_d = sum(self.tp_d.values())
-        self.sum_tn_d = sum(self.tn_d.values())
-        self.sum_fp_d = sum(self.fp_d.values())
-        self.sum_fn_d = sum(self.fn_d.values())
-
-        if (self.sum_tp_d + self.sum_fn_d) != 0:
-            self.sum_tpr_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fn_d)
-        else:
-            self.sum_tpr_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fp_d) != 0:
-            self.sum_tnr_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fp_d)
-        else:
-            self.sum_tnr_d = float(0)
-
-        if (self.sum_tp_d + self.sum_fp_d) != 0:
-            self.sum_ppv_d = float(self.sum_tp_d) / float(self.sum_tp_d + self.sum_fp_d)
-        else:
-            self.sum_ppv_d = float(0)
-
-        if (self.sum_tn_d + self.sum_fn_d) != 0:
-            self.sum_npv_d = float(self.sum_tn_d) / float(self.sum_tn_d + self.sum_fn_d)
-        else:
-            self.sum_npv_d = float(0)
-
-        self.sum_fnr_d = 1 - float(self.sum_tpr_d)
-        self.sum_fpr_d = 1 - float(self.sum_tnr_d)
-        self.sum_fdr_d = 1 - float(self.sum_ppv_d)
-        self.sum_for_d = 1 - float(self.sum_npv_d)
-
-        if (self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d) != 0:
-            self.sum_acc_d = float(self.sum_tp_d + self.sum_tn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-            self.sum_prv_d = float(self.sum_tp_d + self.sum_fn_d) / (
-                float(self.sum_tp_d + self.sum_tn_d + self.sum_fp_d + self.sum_fn_d)
-            )
-        else:
-            self.sum_acc_d = float(0)
-            self.sum_prv_d = float(0)
-
-        self.sum_msr_d = 1 - self.sum_acc_d
-
-        if round(f1s_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcTAES.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "f ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_f1s_d = float(0)
-        else:
-            self.sum_f1s_d = 2.0 * self.sum_ppv_d * self.sum_tpr_d / f1s_denom
-
-        # compute the mcc score:
-        #  this has to be done after sensitivity and prec are computed
-        #
-        sum_mcc_denom = (
-            (self.sum_tp_d + self.sum_fp_d)
-            * (self.sum_tp_d + self.sum_fn_d)
-            * (self.sum_tn_d + self.sum_fp_d)
-            * (self.sum_tn_d + self.sum_fn_d)
-        )
-        sum_mcc_num = (self.sum_tp_d * self.sum_tn_d) - (self.sum_fp_d * self.sum_fn_d)
-        if round(sum_mcc_denom, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcTAES.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "mcc ratio divide by zero",
-                    "summary",
-                )
-            )
-            self.sum_mcc_d = float(0)
-        else:
-            self.sum_mcc_d = sum_mcc_num / math.sqrt(sum_mcc_denom)
-
-        # compute the false alarm rate
-        #
-        if round(self.total_dur_d, ndt.MAX_PRECISION) == 0:
-            print(
-                "Warning: %s (line: %s) %s::%s: %s (%s)"
-                % (
-                    __FILE__,
-                    ndt.__LINE__,
-                    NedcTAES.__CLASS_NAME__,
-                    ndt.__NAME__,
-                    "zero duration",
-                    "summary",
-                )
-            )
-            self.sum_flr_d = float(0)
-        else:
-            self.sum_flr_d = float(self.sum_fp_d) / self.total_dur_d * (60 * 60 * 24)
+        #     such as sensitivity. The taes algorithm outputs hits, misses
+        #     and false alarms directly. These are converted to (tp, tn,
+        #     fp, fn) per label:
+        #      tp: the hits
+        #      tn: the hits of the other labels
+        #      fp: the false alarms
+        #      fn: the misses
+        #
+        # (3) The third block of parameters are the summary values. The
+        #     measures of all labels and of the summary are computed by
+        #     nedc_eval_metrics.
+        #
+        labels = list(self.hit_d)
+        hits = [self.hit_d[key] for key in labels]
+        counts = {
+            "tp": hits,
+            "tn": nmet.other_sums(hits),
+            "fp": [self.fal_d[key] for key in labels],
+            "fn": [self.mis_d[key] for key in labels],
+        }
+        nmet.set_measures(self, labels, counts)
 
         # exit gracefully
         #
@@ -1835,6 +1646,37 @@ class NedcTAES:
     def get_det(self, key):
         return self.fpr_d[key], self.fnr_d[key]
 
+    #
+    # end of method
+
+    # method: NedcTAES::compute_roc
+    #
+    # arguments:
+    #  roc: an roc engine (nedc_eval_roc.NedcRoc)
+    #  ref: reference annotation
+    #  hyp: hypothesis annotation (with the confidence as the 4th element)
+    #  key: the target class
+    #  null: the class of the rejected hypothesis events of the target class
+    #
+    # return: a boolean value indicating status
+    #
+    # This method adds the counts of compute_performance_roc for all
+    # thresholds to the roc engine. Since a partial hit depends on the other
+    # admitted events that overlap (see compute_partial_ovlp), the file is rescored
+    # for every distinct confidence of its hyp events of the target class
+    # (see nec.compute_roc_levels).
+    #
+    def compute_roc(self, roc, ref, hyp, key, null):
+
+        # check to make sure the annotations match
+        #
+        if round(ref[-1][1], 3) != round(hyp[-1][1], 3):
+            return False
+
+        # exit gracefully
+        #
+        return nec.compute_roc_levels(self, roc, ref, hyp, key, null)
+
 
 # end of file
 #
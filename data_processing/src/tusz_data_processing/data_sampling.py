@@ -1,6 +1,11 @@
+import time
+import platform
+
 import numpy as np
 import pandas as pd
 import primefac
+import h5py
+import pyarrow.parquet as pq
 from imblearn.over_sampling import SMOTE, RandomOverSampler
 from scipy.io import savemat
 
@@ -14,10 +19,17 @@ import ast
 
 from tusz_data_processing.load_functions import (
     load_features,
-    load_val_groups,
+    create_feature_indices,
+    _quote,
 )
-from tusz_data_processing.config import ENGINE_URL
-from sqlalchemy import create_engine
+from tusz_data_processing.database import get_engine, load_val_groups
+from tusz_data_processing.config import ENGINE_URL, DELIM_FEAT_CHAN
+
+# number of kernel rows calculated per batch in calculate_kernel_rows.m
+KERNEL_BATCH_SIZE = 200
+
+# MATLAB class names of the supported numpy types
+MATLAB_CLASSES = {np.dtype(np.float32): "single", np.dtype(np.float64): "double"}
 
 
 def determine_quantization_par(n: int, max_rank=19) -> int:
@@ -164,35 +176,121 @@ def save_features_to_sql(sql_engine, feature_data):
 
     Returns
     -------
-
+    float
+        number of inserted rows per second
     """
     sqlite_table = "Sorted_Features"
     # feature_data.columns = feature_data.columns.to_flat_index()
     feature_data["feat_id"] = feature_data.index
-    feature_data = feature_data.convert_dtypes()
-    dict_types = get_sqlite_types(feature_data)
-    feature_data.to_sql(
-        sqlite_table, con=sql_engine, if_exists="replace", index=False, dtype=dict_types
-    )
-    return
+    return bulk_insert_features(sql_engine, feature_data, table=sqlite_table)
 
 
 def get_sqlite_types(df):
-    df = df.convert_dtypes()
-    # df_types = df.infer_objects().dtypes
-    int_cols = df.select_dtypes(include=["int"]).columns
-    float_cols = df.select_dtypes(include=["float"]).columns
-    text_cols = df.select_dtypes(include=["object"]).columns
-    bool_cols = df.select_dtypes(include=["bool"]).columns
-
-    dict_types = {i: INTEGER() for i in int_cols}
-    dict_types.update({i: REAL() for i in float_cols})
-    dict_types.update({i: TEXT() for i in text_cols})
-    dict_types.update({i: BOOLEAN() for i in bool_cols})
+    """Get the SQLite column types of a DataFrame.
+
+    Args:
+        df (DataFrame): DataFrame to store.
+
+    Returns:
+        dict: column name -> SQLite type
+    """
+    dict_types = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dict_types[col] = "BOOLEAN"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dict_types[col] = "INTEGER"
+        elif pd.api.types.is_float_dtype(dtype):
+            dict_types[col] = "REAL"
+        else:
+            dict_types[col] = "TEXT"
 
     return dict_types
 
 
+def bulk_insert_features(
+    sql_engine,
+    feature_data,
+    table="Sorted_Features",
+    index_cols=("file_id", "feat_id"),
+    chunk_size=50000,
+):
+    """Bulk load a DataFrame into an SQLite table (replacing the table).
+
+    All rows are inserted with prepared `executemany` statements inside a
+    single transaction, with `journal_mode=WAL` and `synchronous=OFF` during
+    the load. The indices on `index_cols` are created after the insert.
+
+    Args:
+        sql_engine (Engine): SQLAlchemy engine of the SQLite database.
+        feature_data (DataFrame): Data to store, the index is not stored.
+        table (str, optional): Table name. Defaults to "Sorted_Features".
+        index_cols (tuple, optional): Columns to index. Defaults to ("file_id", "feat_id").
+        chunk_size (int, optional): Rows per executemany call. Defaults to 50000.
+
+    Returns:
+        float: number of inserted rows per second.
+    """
+    if sql_engine.dialect.name != "sqlite":
+        raise ValueError("Bulk loading is only supported for SQLite databases.")
+
+    columns = feature_data.columns.to_list()
+    dict_types = get_sqlite_types(feature_data)
+    create_query = "CREATE TABLE %s (%s)" % (
+        _quote(table),
+        ", ".join("%s %s" % (_quote(col), dict_types[col]) for col in columns),
+    )
+    insert_query = "INSERT INTO %s VALUES (%s)" % (
+        _quote(table),
+        ",".join("?" for _ in columns),
+    )
+
+    t_start = time.perf_counter()
+    conn = sql_engine.raw_connection()
+    cursor = conn.cursor()
+    journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+
+        cursor.execute("BEGIN")
+        cursor.execute("DROP TABLE IF EXISTS %s" % _quote(table))
+        cursor.execute(create_query)
+        for pos in range(0, len(feature_data), chunk_size):
+            chunk = feature_data.iloc[pos : pos + chunk_size]
+            # tolist() converts to python types, which sqlite3 can bind
+            cursor.executemany(
+                insert_query, zip(*(chunk[col].tolist() for col in columns))
+            )
+        for col in index_cols:
+            if col in columns:
+                cursor.execute(
+                    "CREATE INDEX %s ON %s (%s)"
+                    % (_quote("ix_%s_%s" % (table, col)), _quote(table), _quote(col))
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # journal_mode is stored in the database file: also restore it
+        # after a failed insert
+        try:
+            cursor.execute("PRAGMA synchronous=%d" % synchronous)
+            cursor.execute("PRAGMA journal_mode=%s" % journal_mode)
+            cursor.close()
+        finally:
+            conn.close()
+
+    rows_per_sec = len(feature_data) / (time.perf_counter() - t_start)
+    print(
+        "Inserted %d rows into %s (%.0f rows/s)"
+        % (len(feature_data), table, rows_per_sec)
+    )
+    return rows_per_sec
+
+
 def save_to_mat(X_train, y_train, X_test, y_test, filename):
 
     mdic = {"X_train": X_train, "y_train": y_train, "X_test": X_test, "y_test": y_test}
@@ -200,6 +298,105 @@ def save_to_mat(X_train, y_train, X_test, y_test, filename):
     return savemat(filename, mdic)
 
 
+def write_mat73_header(filename):
+    """Write the MATLAB v7.3 header into the userblock of an HDF5 file.
+
+    Args:
+        filename (str): HDF5 file created with a userblock of (at least) 512 bytes.
+    """
+    header = "MATLAB 7.3 MAT-file, Platform: %s, Created on: %s HDF5 schema 1.00 ." % (
+        platform.system(),
+        time.strftime("%a %b %d %H:%M:%S %Y"),
+    )
+    header = header.encode("ascii").ljust(116, b" ")
+    # subsys offset (8 bytes), version (0x0200) and endian indicator
+    header += b"\x00" * 8 + b"\x00\x02" + b"IM"
+
+    with open(filename, "r+b") as f:
+        f.write(header.ljust(512, b"\x00"))
+
+
+def save_parquet_to_mat(
+    parquet_file,
+    filename,
+    X_name="X_train",
+    y_name="y_train",
+    dtype=np.float32,
+    chunk_size=KERNEL_BATCH_SIZE,
+    compression=None,
+    batch_size=100 * KERNEL_BATCH_SIZE,
+):
+    """Export the features of a parquet file to a MAT v7.3 (HDF5) file.
+
+    The parquet file is read in record batches and written straight into the
+    HDF5 datasets, so the full dataset is never held in memory. MATLAB is
+    column-major, so an (N x d) MATLAB matrix is stored as a (d x N) dataset;
+    the chunks hold `chunk_size` data points, such that a batch of kernel rows
+    in calculate_kernel_rows.m reads whole chunks.
+
+    Args:
+        parquet_file (str): Parquet file with feature columns and "annotation" column.
+        filename (str): Name of the .mat file.
+        X_name (str, optional): MATLAB variable name of the features. Defaults to "X_train".
+        y_name (str, optional): MATLAB variable name of the labels. Defaults to "y_train".
+        dtype (optional): np.float32 (single) or np.float64 (double). Defaults to np.float32.
+        chunk_size (int, optional): Data points per HDF5 chunk. Defaults to KERNEL_BATCH_SIZE.
+        compression (str, optional): HDF5 compression filter, e.g. "gzip". Defaults to None.
+        batch_size (int, optional): Rows read from the parquet file per batch.
+
+    Returns:
+        tuple[int, int]: number of data points and number of features.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in MATLAB_CLASSES:
+        raise ValueError("Unsupported dtype %s" % dtype)
+
+    parquet = pq.ParquetFile(parquet_file)
+    feat_cols = [col for col in parquet.schema_arrow.names if DELIM_FEAT_CHAN in col]
+    N = parquet.metadata.num_rows
+    d = len(feat_cols)
+    chunk_size = max(1, min(chunk_size, N))
+    # HDF5 can't chunk empty datasets
+    X_chunks = (d, chunk_size) if N > 0 and d > 0 else None
+    y_chunks = (1, chunk_size) if N > 0 else None
+
+    with h5py.File(filename, "w", userblock_size=512) as f:
+        X = f.create_dataset(
+            X_name,
+            shape=(d, N),
+            dtype=dtype,
+            chunks=X_chunks,
+            compression=compression if X_chunks else None,
+        )
+        y = f.create_dataset(
+            y_name,
+            shape=(1, N),
+            dtype=dtype,
+            chunks=y_chunks,
+            compression=compression if y_chunks else None,
+        )
+        X.attrs["MATLAB_class"] = np.bytes_(MATLAB_CLASSES[dtype])
+        y.attrs["MATLAB_class"] = np.bytes_(MATLAB_CLASSES[dtype])
+
+        row = 0
+        for batch in parquet.iter_batches(
+            batch_size=batch_size, columns=feat_cols + ["annotation"]
+        ):
+            n = batch.num_rows
+            block = np.empty((d, n), dtype=dtype)
+            for i, col in enumerate(feat_cols):
+                block[i, :] = batch.column(col).to_numpy(zero_copy_only=False)
+            X[:, row : row + n] = block
+            y[0, row : row + n] = batch.column("annotation").to_numpy(
+                zero_copy_only=False
+            )
+            row += n
+
+    write_mat73_header(filename)
+
+    return N, d
+
+
 def sort_features(features, anncols=None):
     """
     Sort the features to eliminate 'location' dependency for patient-independent
@@ -295,7 +492,8 @@ def patient_specific_sampling(
 
 if __name__ == "__main__":
     #%% # patient = 4473
-    engine = create_engine(ENGINE_URL)
+    engine = get_engine(ENGINE_URL)
+    create_feature_indices(engine)
     # features = load_sorted_features(engine)
     patient = 4473
     features = load_features(engine, patients=patient, only_features=True)
@@ -305,7 +503,7 @@ if __name__ == "__main__":
     # num_channels = features.columns.get_level_values(1).nunique()
     # feature_names = features.columns.get_level_values(0).unique().to_list()
     # new_multindex = pd.MultiIndex.from_product([feature_names, range(num_channels)])
-    val_groups = load_val_groups(engine)
+    val_groups = load_val_groups(ENGINE_URL)
     # sorted_features = sort_features(features.copy())
     # # # %%
     # # temp = features.iloc[0:100, :]
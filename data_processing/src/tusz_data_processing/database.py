@@ -0,0 +1,125 @@
+"""
+    Access to the annotation database.
+
+    Engines are created once per process and url, and are reused by all
+    callers. After a fork the child process gets a fresh connection pool
+    (the connections of the parent are left alone), so engines can be used
+    safely in multiprocessing workers.
+
+    The small tables that don't change (File_Properties, Validation_Groups)
+    are only read once per process.
+"""
+import os
+from functools import lru_cache
+
+from sqlalchemy import create_engine
+
+import tusz_data_processing.load_functions as lf
+from tusz_data_processing.config import ENGINE_URL
+
+# (pid, url) -> engine
+_ENGINES = {}
+
+
+def read_only_url(url):
+    """Convert a SQLite url to a read-only URI url.
+
+    Args:
+        url (str): SQLite url, e.g. "sqlite:///<path>/tuh_seiz_annotate.db"
+
+    Returns:
+        str: "sqlite:///file:<path>/tuh_seiz_annotate.db?mode=ro&uri=true"
+    """
+    prefix = "sqlite:///"
+    if not url.startswith(prefix):
+        raise ValueError("Read-only mode is only supported for SQLite urls.")
+    path = url[len(prefix) :]
+    if path.startswith("file:"):  # already a URI
+        sep = "&" if "?" in path else "?"
+        return url + sep + "mode=ro&uri=true"
+    return prefix + "file:" + path + "?mode=ro&uri=true"
+
+
+def get_engine(url=ENGINE_URL, read_only=False):
+    """Get the (cached) engine of the current process.
+
+    Args:
+        url (str, optional): Database url. Defaults to ENGINE_URL.
+        read_only (bool, optional): Open a SQLite database read-only. Defaults to False.
+
+    Returns:
+        Engine: SQLAlchemy engine
+    """
+    if read_only:
+        url = read_only_url(url)
+    key = (os.getpid(), url)
+    engine = _ENGINES.get(key)
+    if engine is None:
+        engine = create_engine(url)
+        _ENGINES[key] = engine
+    return engine
+
+
+def dispose_engines():
+    """Close all connections of the engines of this process."""
+    pid = os.getpid()
+    for (engine_pid, url), engine in list(_ENGINES.items()):
+        if engine_pid == pid:
+            engine.dispose()
+        del _ENGINES[(engine_pid, url)]
+
+
+def _after_fork():
+    """Give the inherited engines a new pool in the child process.
+
+    The connections of the parent are not closed (they are still in use by
+    the parent), same as `engine.dispose(close=False)`.
+    """
+    for (engine_pid, url), engine in list(_ENGINES.items()):
+        engine.pool = engine.pool.recreate()
+        del _ENGINES[(engine_pid, url)]
+        _ENGINES[(os.getpid(), url)] = engine
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+@lru_cache(maxsize=None)
+def _load_file_properties(url):
+    return lf.load_file_properties(get_engine(url))
+
+
+@lru_cache(maxsize=None)
+def _load_val_groups(url):
+    return lf.load_val_groups(get_engine(url))
+
+
+def load_file_properties(url=ENGINE_URL):
+    """File_Properties table (read once per process).
+
+    Args:
+        url (str, optional): Database url. Defaults to ENGINE_URL.
+
+    Returns:
+        DataFrame: copy of the cached table
+    """
+    return _load_file_properties(url).copy()
+
+
+def load_val_groups(url=ENGINE_URL):
+    """Validation_Groups table (read once per process).
+
+    Args:
+        url (str, optional): Database url. Defaults to ENGINE_URL.
+
+    Returns:
+        DataFrame: copy of the cached table
+    """
+    return _load_val_groups(url).copy()
+
+
+def clear_cache():
+    """Clear the cached tables (e.g. after the database was changed)."""
+    _load_file_properties.cache_clear()
+    _load_val_groups.cache_clear()
@@ -0,0 +1,173 @@
+"""
+    Durations of the TUSZ recordings.
+
+    The duration of the .edf file and of its .tse annotation (stop time of
+    the last event) are read once per file and stored in a table:
+
+        <DATA_DIRECTORY>/durations.parquet
+
+    Files are identified by their name relative to TUSZ_DIR, without
+    extension, e.g. "/dev/01_tcp_ar/002/00000258/s002_2003_07_21/00000258_s002_t000".
+    After loading, the durations are served from memory (also in forked
+    worker processes), so the checks in post-processing don't open any files.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyedflib
+
+from tusz_data_processing.config import TUSZ_DIR, DATA_DIRECTORY
+
+DURATIONS_FILE = DATA_DIRECTORY + "/durations.parquet"
+
+# file -> (edf_duration, tse_duration)
+_DURATIONS = {}
+# files of the table on disk that are loaded in _DURATIONS
+_LOADED_FILES = set()
+
+
+def file_key(file):
+    """Name of a file relative to TUSZ_DIR and without extension.
+
+    Args:
+        file (str): .edf, .tse or .tse_bi file (absolute or relative to TUSZ_DIR)
+
+    Returns:
+        str: key of the file in the durations table
+    """
+    if file.startswith(TUSZ_DIR):
+        file = file[len(TUSZ_DIR) :]
+    root, ext = os.path.splitext(file)
+    if ext in (".edf", ".tse", ".tse_bi"):
+        return root
+    return file
+
+
+def read_edf_duration(edf_file):
+    """Duration of an .edf file (s), only the header is read."""
+    with pyedflib.EdfReader(edf_file) as edf_reader:
+        return edf_reader.file_duration
+
+
+def read_tse_duration(tse_file, block_size=4096):
+    """Stop time of the last event of a .tse file (s).
+
+    Only the first line (version) and the end of the file are read, see
+    load_functions.get_duration_tse.
+    """
+    VERSION = "version = tse_v1.0.0\n"
+
+    with open(tse_file, "rb") as tse:
+        firstLine = tse.readline().decode()
+        # Check valid TSE
+        if firstLine != VERSION:
+            raise ValueError(
+                'Expected "{}" on first line but read \n {}'.format(VERSION, firstLine)
+            )
+
+        size = tse.seek(0, os.SEEK_END)
+        position = size
+        lines = []
+        while position > 0:
+            position = max(0, position - block_size)
+            tse.seek(position)
+            lines = tse.read(size - position).splitlines()
+            # a complete line before the last event line
+            if len(lines) > 2 or position == 0:
+                break
+
+    lastLine = [line for line in lines if line.strip()][-1].decode()
+    fields = lastLine.split(" ")
+    return float(fields[1])
+
+
+def read_durations(file):
+    """Read the .edf and .tse duration of a file (s)."""
+    file = TUSZ_DIR + file_key(file)
+    return read_edf_duration(file + ".edf"), read_tse_duration(file + ".tse")
+
+
+def _read_table(durations_file):
+    if durations_file is None or not os.path.isfile(durations_file):
+        return {}
+    df = pd.read_parquet(durations_file)
+    return dict(
+        zip(df["file"], zip(df["edf_duration"].tolist(), df["tse_duration"].tolist()))
+    )
+
+
+def _write_table(durations, durations_file):
+    df = pd.DataFrame(
+        [(file, edf, tse) for file, (edf, tse) in sorted(durations.items())],
+        columns=["file", "edf_duration", "tse_duration"],
+    )
+    os.makedirs(os.path.dirname(durations_file), exist_ok=True)
+    df.to_parquet(durations_file, index=False)
+
+
+def load_durations(files, durations_file=DURATIONS_FILE, threads=16):
+    """Make the durations of the files available in memory.
+
+    The table on disk is read once; the files that are not in the table are
+    read (in a thread pool) and added to the table.
+
+    Args:
+        files (list): names of the files (see file_key)
+        durations_file (str, optional): table with the durations, None to
+            not use a table on disk. Defaults to DURATIONS_FILE.
+        threads (int, optional): number of threads reading files. Defaults to 16.
+
+    Returns:
+        DataFrame: edf_duration, tse_duration and check (durations are the
+            same) of the files, indexed by file key
+    """
+    keys = list(dict.fromkeys(file_key(file) for file in files))
+    if durations_file not in _LOADED_FILES:
+        for key, durations in _read_table(durations_file).items():
+            _DURATIONS.setdefault(key, durations)
+        if durations_file is not None:
+            _LOADED_FILES.add(durations_file)
+
+    missing = [key for key in keys if key not in _DURATIONS]
+    if missing:
+        with ThreadPoolExecutor(threads) as executor:
+            _DURATIONS.update(zip(missing, executor.map(read_durations, missing)))
+        if durations_file is not None:
+            table = _read_table(durations_file)
+            table.update((key, _DURATIONS[key]) for key in missing)
+            _write_table(table, durations_file)
+
+    df = pd.DataFrame(
+        [_DURATIONS[key] for key in keys],
+        index=pd.Index(keys, name="file"),
+        columns=["edf_duration", "tse_duration"],
+    )
+    df["check"] = np.isclose(df["edf_duration"], df["tse_duration"])
+    return df
+
+
+def _get(file):
+    key = file_key(file)
+    if key not in _DURATIONS:
+        load_durations([key])
+    return _DURATIONS[key]
+
+
+def get_file_duration(file):
+    """Duration of the .edf file (s), from memory."""
+    return _get(file)[0]
+
+
+def check_file_duration(file):
+    """Check that the edf duration and annotation duration are the same
+    (see load_functions.check_file_duration), from memory."""
+    edf_duration, tse_duration = _get(file)
+    return np.isclose(edf_duration, tse_duration)
+
+
+def clear_cache():
+    """Forget the durations in memory (the table on disk is kept)."""
+    _DURATIONS.clear()
+    _LOADED_FILES.clear()
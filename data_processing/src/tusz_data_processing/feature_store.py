@@ -0,0 +1,338 @@
+"""
+    Parquet feature store.
+
+    All features are stored in one Parquet dataset, partitioned by split
+    (train/dev/eval) and patient:
+
+        <root>/features/split=<split>/patient=<patient>/<split>-<batch>-<i>.parquet
+
+    next to the (small) tables that were kept in the SQLite database:
+
+        <root>/validation_groups.parquet
+        <root>/seizure_annotations.parquet
+        <root>/file_properties.parquet
+
+    Every row keeps its "feat_id", so the features can be joined with the
+    validation groups like the SQLite Features/Sorted_Features tables. A
+    feat_id identifies a row within a split.
+
+    Selections on split, patient, filename and annotation are pushed down to
+    pyarrow, so only the matching partitions/row groups are read, and only the
+    requested columns are loaded.
+"""
+import os
+import shutil
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pds
+import pyarrow.parquet as pq
+
+import tusz_data_processing.load_functions as lf
+from tusz_data_processing.config import FEATURES_DIR, DELIM_FEAT_CHAN
+
+FEATURE_STORE_DIR = FEATURES_DIR + "/store"
+
+# partition columns of the features dataset
+PARTITIONING = pds.partitioning(
+    pa.schema([("split", pa.string()), ("patient", pa.int64())]), flavor="hive"
+)
+
+# SQLite tables stored next to the features dataset
+TABLE_FILES = {
+    "Validation_Groups": "validation_groups.parquet",
+    "Seizure_Annotations": "seizure_annotations.parquet",
+    "File_Properties": "file_properties.parquet",
+}
+
+
+def patient_from_filename(filenames):
+    """Get the patient number from TUSZ file names.
+
+    Args:
+        filenames (Series): file names, e.g. "/train/01_tcp_ar/044/00004456/s015_2014_06_19/00004456_s015_t002.edf"
+
+    Raises:
+        ValueError: if a file name is not a TUSZ file name.
+
+    Returns:
+        Series: patient numbers (int)
+    """
+    patients = filenames.str.extract(r"(\d{8})_s\d+_t\d+", expand=False)
+    invalid = patients.isna()
+    if invalid.any():
+        raise ValueError(
+            "%d file name(s) are not TUSZ file names, e.g. %r"
+            % (invalid.sum(), filenames[invalid].iloc[0])
+        )
+    return patients.astype(np.int64)
+
+
+def _write_split(frames, split, root):
+    """Write the DataFrames of a split to the features dataset.
+
+    The existing partitions of the split are replaced. Nothing is written if
+    there are no rows. The frames are consumed in the calling thread (a SQL
+    connection can't be shared with the writer threads of pyarrow), and
+    every frame is written to its own file per patient.
+
+    Args:
+        frames (iterable): DataFrames with a "feat_id" and "patient" column.
+        split (str): "train", "dev" or "eval".
+        root (str): Root directory of the store.
+    """
+    frames = (df.assign(split=split) for df in frames if len(df) > 0)
+    first = next(frames, None)
+    if first is None:
+        return
+    shutil.rmtree(root + "/features/split=" + split, ignore_errors=True)
+
+    # all frames get the schema of the first one
+    schema = None
+    for i, df in enumerate(chain([first], frames)):
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        schema = table.schema
+        pds.write_dataset(
+            table,
+            root + "/features",
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template="%s-%d-{i}.parquet" % (split, i),
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+
+def import_features(parquet_file, split, root=FEATURE_STORE_DIR, batch_size=100000):
+    """Add the features of a split (output of preprocess.py) to the store.
+
+    The file is read in record batches. A "feat_id" column is kept; without
+    one, the row number in the file is used (see save_features_to_sql). An
+    empty file leaves the store unchanged.
+
+    Args:
+        parquet_file (str): Parquet file with the features of one split.
+        split (str): "train", "dev" or "eval".
+        root (str, optional): Root directory of the store. Defaults to FEATURE_STORE_DIR.
+        batch_size (int, optional): Rows read per batch. Defaults to 100000.
+    """
+    parquet = pq.ParquetFile(parquet_file)
+    # drop the (non-unique) pandas index
+    columns = [
+        col for col in parquet.schema_arrow.names if not col.startswith("__index_level")
+    ]
+
+    def frames():
+        row_id = 0
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+            df = batch.to_pandas()
+            if "feat_id" not in df.columns:
+                df.insert(0, "feat_id", np.arange(row_id, row_id + len(df)))
+            df["patient"] = patient_from_filename(df["filename"])
+            row_id += len(df)
+            yield df
+
+    _write_split(frames(), split, root)
+
+
+def import_sql_features(
+    engine, split, root=FEATURE_STORE_DIR, table="Features", chunksize=100000
+):
+    """Add the rows of a SQLite feature table to the store.
+
+    The rows keep their feat_id. The patient (and the file name, if the
+    table has none) is taken from File_Properties. An empty table leaves the
+    store unchanged.
+
+    Args:
+        engine (Engine): SQL engine of the feature database.
+        split (str): "train", "dev" or "eval".
+        root (str, optional): Root directory of the store. Defaults to FEATURE_STORE_DIR.
+        table (str, optional): "Features" or "Sorted_Features". Defaults to "Features".
+        chunksize (int, optional): Rows read per query chunk. Defaults to 100000.
+    """
+    file_props = pd.read_sql(
+        "SELECT file_id, Patient, Filename FROM File_Properties",
+        engine,
+        index_col="file_id",
+    )
+
+    def frames():
+        for chunk in lf.query_features(engine, table, chunksize=chunksize):
+            if "file_id" not in chunk.columns:
+                raise ValueError("Table %s has no file_id column." % table)
+            df = chunk.reset_index()
+            unknown = ~df["file_id"].isin(file_props.index)
+            if unknown.any():
+                raise ValueError(
+                    "file_id %s of %s is not in File_Properties."
+                    % (df["file_id"][unknown].iloc[0], table)
+                )
+            props = file_props.loc[df["file_id"]]
+            if "filename" not in df.columns:
+                df["filename"] = props["Filename"].to_numpy()
+            df["patient"] = props["Patient"].to_numpy().astype(np.int64)
+            yield df
+
+    _write_split(frames(), split, root)
+
+
+def import_tables(engine, root=FEATURE_STORE_DIR, tables=TABLE_FILES):
+    """Copy the small SQLite tables to the store.
+
+    Args:
+        engine (Engine): SQL engine of the annotation database.
+        root (str, optional): Root directory of the store. Defaults to FEATURE_STORE_DIR.
+        tables (dict, optional): table name -> file name. Defaults to TABLE_FILES.
+    """
+    os.makedirs(root, exist_ok=True)
+    for table, file in tables.items():
+        df = pd.read_sql("SELECT * FROM %s" % table, engine)
+        df.to_parquet(root + "/" + file, index=False)
+
+
+def _as_list(values):
+    """Convert scalar/array input to a list of python values."""
+    if np.isscalar(values):
+        values = [values]
+    return [val.item() if isinstance(val, np.generic) else val for val in values]
+
+
+def _isin(field, values):
+    """Filter expression for field IN values (values can be a scalar)."""
+    return pds.field(field).isin(_as_list(values))
+
+
+def list_splits(root=FEATURE_STORE_DIR):
+    """List the splits in the store.
+
+    Args:
+        root (str, optional): Root directory of the store. Defaults to FEATURE_STORE_DIR.
+
+    Returns:
+        list: names of the splits, e.g. ["dev", "train"]
+    """
+    path = root + "/features"
+    if not os.path.isdir(path):
+        return []
+    prefix = "split="
+    return sorted(
+        name[len(prefix) :] for name in os.listdir(path) if name.startswith(prefix)
+    )
+
+
+def load_features(
+    root=FEATURE_STORE_DIR,
+    split=None,
+    patients=None,
+    files=None,
+    annotation=None,
+    columns=None,
+    only_features=False,
+):
+    """Load (a selection of) the features from the store.
+
+    Same as load_functions.load_features, but the store is selected by its
+    root directory instead of an SQL engine, so it is not a drop-in
+    replacement. A feat_id is only unique within a split, so only one split
+    can be loaded at a time.
+
+    Args:
+        root (str, optional): Root directory of the store. Defaults to FEATURE_STORE_DIR.
+        split (str, optional): Split to load. Defaults to None (the only
+            split in the store).
+        patients (int or list, optional): Patient(s) to load. Defaults to None (all).
+        files (str or list, optional): File name(s) to load. Defaults to None (all).
+        annotation (int or list, optional): Annotation(s) to load. Defaults to None (all).
+        columns (list, optional): Columns to load. Defaults to None (all).
+        only_features (bool, optional): Only load the feature columns (and
+            "annotation"). Defaults to False.
+
+    Raises:
+        ValueError: if the selection contains more than one split.
+
+    Returns:
+        DataFrame: features indexed by feat_id, in the original order.
+    """
+    splits = list_splits(root) if split is None else _as_list(split)
+    if len(set(splits)) > 1:
+        raise ValueError(
+            "feat_id is only unique within a split: select one of the splits %s"
+            % sorted(set(splits))
+        )
+
+    dataset = pds.dataset(
+        root + "/features", format="parquet", partitioning=PARTITIONING
+    )
+
+    if only_features:
+        columns = [
+            col
+            for col in (dataset.schema.names if columns is None else columns)
+            if DELIM_FEAT_CHAN in col or col == "annotation"
+        ]
+    keys = ["split", "feat_id"]
+    drop_split = columns is not None and "split" not in columns
+    if columns is not None:
+        columns = keys + [col for col in columns if col not in keys]
+
+    expr = None
+    for field, values in [
+        ("split", split),
+        ("patient", patients),
+        ("filename", files),
+        ("annotation", annotation),
+    ]:
+        if values is None:
+            continue
+        cond = _isin(field, values)
+        expr = cond if expr is None else expr & cond
+
+    features = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    features.sort_values("feat_id", inplace=True, kind="stable")
+    features.set_index("feat_id", inplace=True)
+    if drop_split:
+        features.drop(columns="split", inplace=True)
+    return features
+
+
+def load_val_groups(root=FEATURE_STORE_DIR):
+    """Load the validation groups, indexed by feat_id.
+
+    Same as load_functions.load_val_groups, but with the root directory of
+    the store instead of an SQL engine (not a drop-in replacement).
+    """
+    df = pd.read_parquet(root + "/" + TABLE_FILES["Validation_Groups"])
+    return df.set_index("feat_id")
+
+
+def load_annotation_data(root=FEATURE_STORE_DIR, by=None, arg_list=None):
+    """Load the seizure annotations of patients or files (or all).
+
+    Same as load_functions.load_annotation_data, but with the root directory
+    of the store instead of an SQL engine (not a drop-in replacement).
+    arg_list can be a scalar.
+    """
+    cols = [
+        "Patient",
+        "Filename",
+        "Seizure_Start",
+        "Seizure_Stop",
+        "Seizure_Type",
+        "file_id",
+        "seizure_id",
+    ]
+    file = root + "/" + TABLE_FILES["Seizure_Annotations"]
+    if by == "patient":
+        return pd.read_parquet(
+            file, columns=cols, filters=[("Patient", "in", _as_list(arg_list))]
+        )
+    elif by == "file":
+        return pd.read_parquet(
+            file, columns=cols, filters=[("Filename", "in", _as_list(arg_list))]
+        )
+    elif by is None:  # load all annotations
+        return pd.read_parquet(file, columns=cols[:-1])
+    else:
+        raise Exception("Unsupported input format")
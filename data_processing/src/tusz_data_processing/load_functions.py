@@ -112,49 +112,127 @@ def load_file_properties(engine, by=None, arg_list=None):
         raise Exception("Unsupported input format")
 
 
-def load_features(engine, patients=None, only_features=False):
-    # TODO make applicable to different inputs
-    if patients is not None:
-        if not np.isscalar(patients):
-            patients = ",".join(str(elem) for elem in patients)
+# tables holding one row per epoch (feat_id)
+FEATURE_TABLES = ("Features", "Sorted_Features")
+# non-feature columns of the feature tables
+FEATURE_META_COLUMNS = ["file_id", "epoch", "seizure_id"]
+# number of rows per chunk returned by the feature queries
+QUERY_CHUNKSIZE = 50000
 
-        query = (
-            """ SELECT Features.* FROM Features 
-                    INNER JOIN File_Properties 
-                    ON File_Properties.file_id = Features.file_id 
-                    WHERE Patient = (%s) """
-            % patients
+
+def _quote(name):
+    """Quote an SQL identifier (feature names contain '|', '(', etc.)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _as_param_list(arg_list):
+    """Convert scalar/array input to a list of python values for binding."""
+    if np.isscalar(arg_list):
+        arg_list = [arg_list]
+    return [elem.item() if isinstance(elem, np.generic) else elem for elem in arg_list]
+
+
+def create_feature_indices(engine):
+    """Create the indices used by the feature queries (if they don't exist).
+
+    Args:
+        engine (Engine): SQL engine of the feature database.
+    """
+    indices = [("File_Properties", "Patient"), ("File_Properties", "file_id")]
+    indices += [(table, "file_id") for table in FEATURE_TABLES]
+    with engine.begin() as conn:
+        tables = set(
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table'"
+            )
         )
-    else:
-        query = """
-                SELECT Features.* FROM Features"""
+        for table, column in indices:
+            if table in tables:
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS %s ON %s (%s)"
+                    % (
+                        _quote("ix_%s_%s" % (table, column)),
+                        _quote(table),
+                        _quote(column),
+                    )
+                )
+
+
+def query_features(
+    engine, table="Features", patients=None, columns=None, chunksize=QUERY_CHUNKSIZE
+):
+    """Query (a selection of) the feature table in chunks.
 
-    features = pd.read_sql(query, engine, index_col="feat_id")
-    # features = features.drop(columns=['file_id', 'epoch'])
-    if only_features:
-        features.drop(columns=["file_id", "epoch", "seizure_id"], inplace=True)
+    The patients are bound as parameters of an `IN (...)` clause, and only
+    the requested columns are selected. Run `create_feature_indices` once on
+    the database to avoid full table scans.
 
-    return features
+    Args:
+        engine (Engine): SQL engine of the feature database.
+        table (str, optional): "Features" or "Sorted_Features". Defaults to "Features".
+        patients (int or list, optional): Patient(s) to select. Defaults to None (all).
+        columns (list, optional): Columns to select (feat_id is always selected).
+            Defaults to None (all).
+        chunksize (int, optional): Number of rows per chunk. Defaults to QUERY_CHUNKSIZE.
 
+    Returns:
+        iterator: DataFrames (indexed by feat_id) with at most chunksize rows.
+    """
+    if table not in FEATURE_TABLES:
+        raise ValueError("Unknown feature table %s" % table)
 
-def load_sorted_features(engine, patients=None):
-    # TODO make applicable to different inputs
+    if columns is None:
+        select = "%s.*" % _quote(table)
+    else:
+        select = ", ".join(
+            "%s.%s" % (_quote(table), _quote(col))
+            for col in ["feat_id"] + [col for col in columns if col != "feat_id"]
+        )
+    query = "SELECT %s FROM %s" % (select, _quote(table))
+
+    params = None
     if patients is not None:
-        if not np.isscalar(patients):
-            patients = ",".join(str(elem) for elem in patients)
+        params = _as_param_list(patients)
+        query += """ INNER JOIN File_Properties
+                ON File_Properties.file_id = %s.file_id
+                WHERE File_Properties.Patient IN (%s)""" % (
+            _quote(table),
+            ",".join("?" for _ in params),
+        )
 
-        query = (
-            """ SELECT Sorted_Features.* FROM Sorted_Features 
-                    INNER JOIN File_Properties 
-                    ON File_Properties.file_id = Sorted_Features.file_id 
-                    WHERE Patient = (%s) """
-            % patients
+    return pd.read_sql(
+        query, engine, index_col="feat_id", params=params, chunksize=chunksize
+    )
+
+
+def _concat_chunks(chunks):
+    """Concatenate the chunks of a feature query into one DataFrame."""
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks)
+
+
+def load_features(engine, patients=None, only_features=False, columns=None):
+    if only_features and columns is not None:
+        columns = [col for col in columns if col not in FEATURE_META_COLUMNS]
+    features = _concat_chunks(
+        query_features(engine, "Features", patients=patients, columns=columns)
+    )
+    # features = features.drop(columns=['file_id', 'epoch'])
+    if only_features:
+        features.drop(
+            columns=features.columns.intersection(FEATURE_META_COLUMNS), inplace=True
         )
-    else:
-        query = """
-                SELECT Sorted_Features.* FROM Sorted_Features"""
 
-    features = pd.read_sql(query, engine, index_col="feat_id")
+    return features
+
+
+def load_sorted_features(engine, patients=None, columns=None):
+    features = _concat_chunks(
+        query_features(engine, "Sorted_Features", patients=patients, columns=columns)
+    )
     # features = features.drop(columns=['file_id', 'epoch'])
     return features
 
@@ -1,4 +1,8 @@
+import sqlite3
 import numpy as np
+import pandas as pd
+import h5py
+import pytest
 
 import tusz_data_processing.data_sampling as ds
 import primefac
@@ -26,3 +30,80 @@ def test_determine_quantization_par():
     assert max(q_n4) <= 19
     assert np.prod(q_n2) == n2_new
     assert np.prod(q_n4) == n4_new
+
+
+def test_save_parquet_to_mat(tmp_path):
+
+    N = 450
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((N, 3)), columns=["a|0", "a|1", "b|0"])
+    df["annotation"] = rng.choice([-1, 1], N)
+    df["filename"] = "file"
+    parquet_file = str(tmp_path / "train.parquet")
+    mat_file = str(tmp_path / "train.mat")
+    df.to_parquet(parquet_file)
+
+    n, d = ds.save_parquet_to_mat(parquet_file, mat_file, batch_size=100)
+    assert (n, d) == (N, 3)
+
+    with open(mat_file, "rb") as f:
+        header = f.read(128)
+    assert header.startswith(b"MATLAB 7.3 MAT-file")
+    assert header[-4:] == b"\x00\x02IM"
+
+    with h5py.File(mat_file, "r") as f:
+        X = f["X_train"]
+        assert X.dtype == np.float32
+        assert X.shape == (3, N)
+        assert X.chunks == (3, ds.KERNEL_BATCH_SIZE)
+        assert X.attrs["MATLAB_class"] == b"single"
+        assert np.allclose(X[()].T, df[["a|0", "a|1", "b|0"]].to_numpy())
+        assert np.array_equal(f["y_train"][0, :], df["annotation"].to_numpy())
+
+    # empty frames are not chunked
+    for empty in [df.iloc[:0], df[["annotation", "filename"]]]:
+        empty.to_parquet(parquet_file)
+        n, d = ds.save_parquet_to_mat(parquet_file, mat_file, compression="gzip")
+        with h5py.File(mat_file, "r") as f:
+            assert f["X_train"].shape == (d, n)
+            assert f["y_train"].shape == (1, n)
+
+
+def test_bulk_insert_features(tmp_path):
+    from sqlalchemy import create_engine
+
+    db_file = str(tmp_path / "features.db")
+    engine = create_engine("sqlite:///" + db_file)
+    N = 250
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((N, 2)), columns=["('a', 0)", "('b', 1)"])
+    df["file_id"] = np.arange(N) // 10
+    df["annotation"] = rng.choice([-1, 1], N)
+    df["filename"] = "file"
+
+    ds.save_features_to_sql(engine, df.copy())
+    ds.save_features_to_sql(engine, df.copy())  # replaces the table
+
+    with sqlite3.connect(db_file) as conn:
+        stored = pd.read_sql("SELECT * FROM Sorted_Features", conn)
+        indices = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index'"
+        ).fetchall()
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert len(stored) == N
+    assert np.allclose(stored[["('a', 0)", "('b', 1)"]], df[["('a', 0)", "('b', 1)"]])
+    assert np.array_equal(stored["feat_id"], np.arange(N))
+    assert stored["filename"].eq("file").all()
+    assert {"ix_Sorted_Features_file_id", "ix_Sorted_Features_feat_id"} <= {
+        name for (name,) in indices
+    }
+    assert journal_mode == "delete"
+
+    # a failed insert is rolled back and restores the journal mode
+    bad_df = df.copy()
+    bad_df["filename"] = [{"file": i} for i in range(N)]  # can't be bound
+    with pytest.raises(sqlite3.Error):
+        ds.bulk_insert_features(engine, bad_df)
+    with sqlite3.connect(db_file) as conn:
+        assert len(pd.read_sql("SELECT * FROM Sorted_Features", conn)) == N
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
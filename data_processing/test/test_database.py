@@ -0,0 +1,50 @@
+import os
+import multiprocessing
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+import tusz_data_processing.database as db
+
+
+def count_rows(url):
+    return pd.read_sql(
+        "SELECT COUNT(*) AS n FROM Validation_Groups", db.get_engine(url)
+    )["n"][0]
+
+
+def test_database(tmp_path):
+    url = "sqlite:///" + str(tmp_path / "annotations.db")
+    pd.DataFrame({"feat_id": [0, 1, 2], "Patient": [258, 258, 473]}).to_sql(
+        "Validation_Groups", create_engine(url), index=False
+    )
+
+    engine = db.get_engine(url)
+    assert db.get_engine(url) is engine
+    assert db.get_engine(url, read_only=True) is not engine
+
+    ro_engine = db.get_engine(url, read_only=True)
+    assert len(pd.read_sql("SELECT * FROM Validation_Groups", ro_engine)) == 3
+    with pytest.raises(OperationalError):
+        with ro_engine.begin() as conn:
+            conn.execute("DELETE FROM Validation_Groups")
+
+    # tables are read once and callers get a copy
+    val_groups = db.load_val_groups(url)
+    val_groups.drop(index=0, inplace=True)
+    with engine.begin() as conn:
+        conn.execute("DELETE FROM Validation_Groups WHERE feat_id = 2")
+    assert list(db.load_val_groups(url).index) == [0, 1, 2]
+    db.clear_cache()
+    assert list(db.load_val_groups(url).index) == [0, 1]
+
+    # engines are usable in forked workers
+    if hasattr(os, "fork"):
+        with multiprocessing.get_context("fork").Pool(2) as pool:
+            assert pool.map(count_rows, [url] * 4) == [2] * 4
+    assert count_rows(url) == 2
+
+    db.dispose_engines()
+    assert db.get_engine(url) is not engine
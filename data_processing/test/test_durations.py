@@ -0,0 +1,59 @@
+"""
+    Test the durations table.
+"""
+import os
+
+import numpy as np
+import pyedflib
+from pyedflib import highlevel
+
+import tusz_data_processing.durations as dur
+import tusz_data_processing.load_functions as lf
+
+
+def write_recording(tusz_dir, name, duration, tse_duration):
+    os.makedirs(os.path.dirname(tusz_dir + name), exist_ok=True)
+    signals = np.zeros((1, 250 * duration))
+    headers = highlevel.make_signal_headers(["EEG FP1-REF"], sample_frequency=250)
+    highlevel.write_edf(tusz_dir + name + ".edf", signals, headers)
+    with open(tusz_dir + name + ".tse", "w") as tse:
+        tse.write("version = tse_v1.0.0\n\n")
+        # many events, the duration is read from the end of the file
+        for start in range(0, tse_duration - 1):
+            tse.write("%.4f %.4f bckg 1.0000\n" % (start, start + 1))
+        tse.write("%.4f %.4f seiz 1.0000\n" % (tse_duration - 1, tse_duration))
+
+
+def test_durations(tmp_path, monkeypatch):
+    tusz_dir = str(tmp_path / "edf")
+    monkeypatch.setattr(dur, "TUSZ_DIR", tusz_dir)
+    monkeypatch.setattr(lf, "TUSZ_DIR", tusz_dir)
+    dur.clear_cache()
+    files = ["/dev/00000258_s002_t000", "/dev/00000258_s002_t001"]
+    write_recording(tusz_dir, files[0], 300, 300)
+    write_recording(tusz_dir, files[1], 20, 18)
+
+    assert dur.file_key(tusz_dir + files[0] + ".tse_bi") == files[0]
+    assert dur.file_key(files[1] + ".edf") == files[1]
+    assert dur.read_tse_duration(tusz_dir + files[0] + ".tse", block_size=64) == 300.0
+
+    durations_file = str(tmp_path / "data" / "durations.parquet")
+    df = dur.load_durations([f + ".edf" for f in files], durations_file)
+    assert df.index.tolist() == files
+    assert df["edf_duration"].tolist() == [300.0, 20.0]
+    assert df["tse_duration"].tolist() == [300.0, 18.0]
+    assert df["check"].tolist() == [True, False]
+    # same as the checks that open the files
+    for file in files:
+        assert dur.check_file_duration(file + ".edf") == lf.check_file_duration(
+            file + ".edf"
+        )
+        with pyedflib.EdfReader(tusz_dir + file + ".edf") as edf_reader:
+            assert dur.get_file_duration(file + ".edf") == edf_reader.file_duration
+
+    # a new process reads the table instead of the files
+    dur.clear_cache()
+    os.remove(tusz_dir + files[0] + ".edf")
+    df_cached = dur.load_durations([files[0] + ".edf"], durations_file)
+    assert df_cached.loc[files[0], "edf_duration"] == 300.0
+    dur.clear_cache()
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+import tusz_data_processing.feature_store as fs
+
+
+def make_split(split, patients, rng, epochs=6):
+    frames = []
+    for patient in patients:
+        for session in range(2):
+            file = "/%s/01_tcp_ar/044/%08d/s00%d_2014_06_19/%08d_s00%d_t000.edf" % (
+                split,
+                patient,
+                session,
+                patient,
+                session,
+            )
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "epoch": np.arange(epochs),
+                        "annotation": rng.choice([-1, 1], epochs),
+                        "start_time": np.arange(epochs, dtype=float),
+                        "stop_time": np.arange(epochs, dtype=float) + 2,
+                        "min|0": rng.standard_normal(epochs),
+                        "max|0": rng.standard_normal(epochs),
+                        "filename": file,
+                    }
+                )
+            )
+    return pd.concat(frames)
+
+
+def test_feature_store(tmp_path):
+    rng = np.random.default_rng(0)
+    root = str(tmp_path / "store")
+    splits = {
+        "train": make_split("train", [258, 4473], rng),
+        "dev": make_split("dev", [5943], rng),
+    }
+    for split, df in splits.items():
+        df.to_parquet(str(tmp_path / (split + ".parquet")))
+        fs.import_features(str(tmp_path / (split + ".parquet")), split, root, 5)
+    # re-importing a split replaces it
+    fs.import_features(str(tmp_path / "dev.parquet"), "dev", root)
+
+    train = splits["train"].reset_index(drop=True)
+    df = fs.load_features(root, split="train")
+    assert len(df) == len(train)
+    assert np.array_equal(df.index, np.arange(len(train)))
+    assert df["filename"].equals(train["filename"].rename_axis(None).set_axis(df.index))
+    assert (df["patient"] == fs.patient_from_filename(df["filename"])).all()
+    # feat_id is only unique within a split
+    assert fs.list_splits(root) == ["dev", "train"]
+    for split in [None, ["train", "dev"]]:
+        with pytest.raises(ValueError):
+            fs.load_features(root, split=split)
+
+    df = fs.load_features(root, split="train", patients=[258, 4473], annotation=1)
+    assert set(df["patient"]) == {258, 4473}
+    assert (df["annotation"] == 1).all()
+
+    file = train["filename"].iloc[0]
+    df = fs.load_features(root, split="train", files=file, columns=["min|0"])
+    assert list(df.columns) == ["min|0"]
+    assert np.allclose(df["min|0"], train.loc[train["filename"] == file, "min|0"])
+
+    df = fs.load_features(root, split="dev", only_features=True)
+    assert list(df.columns) == ["annotation", "min|0", "max|0"]
+
+    engine = create_engine("sqlite:///" + str(tmp_path / "annotations.db"))
+    pd.DataFrame(
+        {"feat_id": [0, 1], "Patient": [258, 258], "seizure_group": [0, 1]}
+    ).to_sql("Validation_Groups", engine, index=False)
+    pd.DataFrame(
+        {
+            "Patient": [258, 4473],
+            "Filename": [file, "other.edf"],
+            "Seizure_Start": [1.0, 2.0],
+            "Seizure_Stop": [3.0, 4.0],
+            "Seizure_Type": ["fnsz", "gnsz"],
+            "file_id": [0, 1],
+            "seizure_id": [0, 1],
+        }
+    ).to_sql("Seizure_Annotations", engine, index=False)
+    pd.DataFrame({"Patient": [258], "file_id": [0]}).to_sql(
+        "File_Properties", engine, index=False
+    )
+    fs.import_tables(engine, root)
+    val_groups = fs.load_val_groups(root)
+    assert list(val_groups.index) == [0, 1]
+    # the validation groups join with the features (patient_specific_sampling)
+    joined = fs.load_features(root, split="train").loc[val_groups.index]
+    assert list(joined["filename"]) == list(train["filename"].iloc[:2])
+    assert list(fs.load_annotation_data(root, "patient", 4473)["Filename"]) == [
+        "other.edf"
+    ]
+    assert len(fs.load_annotation_data(root, "file", [file])) == 1
+    assert len(fs.load_annotation_data(root)) == 2
+
+
+def test_import_sql_features(tmp_path):
+    rng = np.random.default_rng(1)
+    root = str(tmp_path / "store")
+    engine = create_engine("sqlite:///" + str(tmp_path / "features.db"))
+    N = 12
+    pd.DataFrame(
+        {
+            "feat_id": np.arange(100, 100 + N),
+            "file_id": np.arange(N) // 4,
+            "epoch": np.arange(N) % 4,
+            "annotation": rng.choice([-1, 1], N),
+            "min|0": rng.standard_normal(N),
+        }
+    ).to_sql("Features", engine, index=False)
+    pd.DataFrame(
+        {"Patient": [258, 258, 4473], "Filename": ["a.edf", "b.edf", "c.edf"]},
+        index=pd.Index([0, 1, 2], name="file_id"),
+    ).to_sql("File_Properties", engine)
+    pd.DataFrame(
+        {"feat_id": [101, 108], "Patient": [258, 4473], "seizure_group": [0, 1]}
+    ).to_sql("Validation_Groups", engine, index=False)
+    pd.DataFrame(
+        columns=["Patient", "Filename", "Seizure_Start", "Seizure_Stop"]
+        + ["Seizure_Type", "file_id", "seizure_id"]
+    ).to_sql("Seizure_Annotations", engine, index=False)
+
+    fs.import_sql_features(engine, "train", root, chunksize=5)
+    fs.import_tables(engine, root)
+    features = fs.load_features(root, split="train")
+    assert list(features.index) == list(range(100, 100 + N))
+    assert list(fs.load_features(root, patients=4473)["filename"]) == ["c.edf"] * 4
+
+    val_groups = fs.load_val_groups(root)
+    joined = fs.load_features(root, only_features=True).loc[val_groups.index]
+    assert list(joined.columns) == ["annotation", "min|0"]
+    assert list(joined.index) == [101, 108]
+
+
+def test_import_invalid(tmp_path):
+    root = str(tmp_path / "store")
+    file = str(tmp_path / "train.parquet")
+    pd.DataFrame({"annotation": [1], "filename": ["not_a_tusz_file.edf"]}).to_parquet(
+        file
+    )
+    with pytest.raises(ValueError, match="not_a_tusz_file"):
+        fs.import_features(file, "train", root)
+
+    # an empty file doesn't change the store
+    pd.DataFrame(
+        {"annotation": pd.Series([], dtype=int), "filename": pd.Series([], dtype=str)}
+    ).to_parquet(file)
+    fs.import_features(file, "train", root)
+    assert not (tmp_path / "store").exists()
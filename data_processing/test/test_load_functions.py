@@ -39,3 +39,49 @@ def test_load_edf():
 # def test_resample_edf():
 #     test_file = DATA_DIRECTORY + "/example.edf"
 #     param = lf.load_parameters(PARAMETERS)
+
+
+def test_load_features(tmp_path):
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    engine = create_engine("sqlite:///" + str(tmp_path / "features.db"))
+    properties = pd.DataFrame(
+        {"Patient": [254, 254, 4473, 5943], "file_id": [0, 1, 2, 3]}
+    )
+    properties.to_sql("File_Properties", engine, index=False)
+    N = 40
+    features = pd.DataFrame(
+        {
+            "feat_id": np.arange(N),
+            "file_id": np.arange(N) % 4,
+            "epoch": np.arange(N) // 4,
+            "seizure_id": 0,
+            "('mean', 0)": np.arange(N) * 0.5,
+            "('std', 0)": np.arange(N) * 2.0,
+            "annotation": -1,
+        }
+    )
+    features.to_sql("Features", engine, index=False)
+    lf.create_feature_indices(engine)
+    indices = pd.read_sql("SELECT name FROM sqlite_master WHERE type='index'", engine)
+    assert {"ix_File_Properties_Patient", "ix_Features_file_id"} <= set(indices["name"])
+
+    expected = features.set_index("feat_id")
+    for patients, file_ids in [
+        (254, [0, 1]),
+        (np.int64(4473), [2]),
+        ([254, 5943], [0, 1, 3]),
+    ]:
+        df = lf.load_features(engine, patients=patients)
+        assert df.sort_index().equals(expected[expected["file_id"].isin(file_ids)])
+
+    df = lf.load_features(engine, patients=[4473], columns=["('std', 0)"])
+    assert list(df.columns) == ["('std', 0)"]
+    assert np.array_equal(df.index.sort_values(), np.arange(2, N, 4))
+
+    df = lf.load_features(engine, only_features=True)
+    assert list(df.columns) == ["('mean', 0)", "('std', 0)", "annotation"]
+
+    chunks = list(lf.query_features(engine, patients=[254], chunksize=8))
+    assert [len(chunk) for chunk in chunks] == [8, 8, 4]
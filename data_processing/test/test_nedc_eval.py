@@ -0,0 +1,649 @@
+"""
+    Test the changes to the NEDC scoring software.
+"""
+import io
+import math
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+import post_processing.sweep as sw
+
+nee = sw.nee
+nft = sw.nee.nft
+nec = sw.nec
+nct = sw.nee.nct
+nat = sw.nec.nat
+
+
+def random_annotations(rng, n_files=30, duration=600.0):
+    """Random reference and hypothesis annotations (seizure/background)."""
+    anns = []
+    for _ in range(2):
+        files = {}
+        for i in range(n_files):
+            bounds = np.unique(
+                np.round(rng.uniform(0, duration, rng.integers(0, 12)), 2)
+            )
+            bounds = np.concatenate(([0.0], bounds[bounds > 0], [duration]))
+            first = rng.integers(0, 2)
+            files["file_%02d" % i] = [
+                [
+                    float(start),
+                    float(stop),
+                    {"seiz" if (j + first) % 2 else "bckg": float(rng.uniform(0.5, 1))},
+                ]
+                for j, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]))
+            ]
+        anns.append(files)
+    return anns
+
+
+def run_scorer(name, ref_anns, hyp_anns, rfile, nproc=1):
+    sclass, block, _ = nee.SCORERS[name]
+    scmap = nee.load_scoring_map()
+    scorer = sclass(nft.load_parameters(nee.DEF_PFILE, block))
+    scorer.init_score(scmap)
+    assert scorer.score(ref_anns, hyp_anns, scmap, rfile, nproc)
+    scorer.compute_performance()
+    with open(rfile) as f:
+        results = f.read()
+    state = {key: val for key, val in vars(scorer).items() if key != "rfile_d"}
+    return state, results
+
+
+def test_score_parallel(tmp_path):
+    ref_anns, hyp_anns = random_annotations(np.random.default_rng(0))
+    for name in nee.SCORERS:
+        state, results = run_scorer(name, ref_anns, hyp_anns, str(tmp_path / "r1"))
+        state_par, results_par = run_scorer(
+            name, ref_anns, hyp_anns, str(tmp_path / "r2"), nproc=2
+        )
+        # same per file results (in the same order) and identical totals
+        assert results_par == results
+        assert repr(state_par) == repr(state)
+
+
+def taes_compute_reference(scorer, ref, hyp):
+    """The original O(R*H) NedcTAES.compute loop."""
+    refo, hypo = [], []
+    hit, mis, fal = float(0), float(0), float(0)
+    hflags = [True] * len(hyp)
+    rflags = [True] * len(ref)
+    for i in range(len(ref)):
+        scorer.tgt_d[ref[i][2]] += 1
+        refo.append(ref[i][2])
+        labels, _, _ = scorer.get_events(ref[i][0], ref[i][1], hyp, hflags)
+        if ref[i][2] in labels and rflags[i]:
+            for j in range(len(hyp)):
+                if hyp[j][2] == ref[i][2] and hflags[j]:
+                    p_hit, p_miss, p_fa = scorer.compute_partial(
+                        ref, hyp, i, j, rflags, hflags, ref[i][2]
+                    )
+                    hit += p_hit
+                    mis += p_miss
+                    fal += p_fa
+                    scorer.hit_d[ref[i][2]] += p_hit
+                    scorer.mis_d[ref[i][2]] += p_miss
+                    scorer.fal_d[ref[i][2]] += p_fa
+    if True in (rflags + hflags):
+        mis += rflags.count(True)
+        fal += hflags.count(True)
+        scorer.update_abs_mf(ref, hyp, rflags, hflags)
+    return (refo, hypo, hit, mis, fal)
+
+
+def random_events(rng, duration):
+    """Random (possibly overlapping and unsorted) events."""
+    n = rng.integers(1, 15)
+    starts = np.round(rng.uniform(0, duration, n), rng.integers(0, 3))
+    stops = starts + np.round(rng.exponential(rng.choice([0.5, 5, 40]), n), 1)
+    stops = np.minimum(stops, duration)
+    events = [
+        [float(start), float(stop), rng.choice(["seiz", "bckg"])]
+        for start, stop in zip(starts, stops)
+        if stop > start
+    ]
+    if rng.random() < 0.5:
+        events.sort()
+    return events + [[float(duration) - 1, float(duration), "bckg"]]
+
+
+def test_taes_compute():
+    rng = np.random.default_rng(1)
+    sclass, block, _ = nee.SCORERS["taes"]
+    scmap = nee.load_scoring_map()
+    params = nft.load_parameters(nee.DEF_PFILE, block)
+    for _ in range(300):
+        duration = float(rng.choice([20, 100, 300]))
+        ref, hyp = random_events(rng, duration), random_events(rng, duration)
+        scorers = []
+        for _ in range(2):
+            scorer = sclass(params)
+            scorer.init_score(scmap)
+            scorers.append(scorer)
+        # twice, such that the totals are accumulated
+        for _ in range(2):
+            des_result = taes_compute_reference(scorers[0], ref, hyp)
+            assert scorers[1].compute(ref, hyp) == des_result
+        assert repr(vars(scorers[1])) == repr(vars(scorers[0]))
+
+    # anyovlp compares the ranges of seconds of the events
+    for _ in range(1000):
+        ref, hyp = np.round(rng.uniform(0, 10, (2, 2)), 1).tolist()
+        refset = set(range(int(ref[0]), int(ref[1]) + 1))
+        hypset = set(range(int(hyp[0]), int(hyp[1]) + 1))
+        assert scorers[0].anyovlp(ref, hyp) == bool(refset & hypset)
+
+
+def test_intervals_find():
+    rng = np.random.default_rng(4)
+    for _ in range(300):
+        n = int(rng.integers(0, 30))
+        starts = rng.integers(0, 20, n).tolist()
+        # some intervals stop before they start, or are nested
+        stops = (np.array(starts, dtype=int) + rng.integers(-3, 15, n)).tolist()
+        index = nec.Intervals(starts, stops)
+        for _ in range(20):
+            start = int(rng.integers(-2, 25))
+            stop = start + int(rng.integers(-2, 8))
+            assert index.find(start, stop) == [
+                k for k in range(n) if starts[k] <= stop and stops[k] >= start
+            ]
+            assert index.find(start, stop, True) == [
+                k for k in range(n) if starts[k] < stop and stops[k] > start
+            ]
+
+    # the identifiers are returned, sorted
+    index = nec.Intervals([5.0, 0.0, 2.5], [6.0, 10.0, 3.0], ["c", "b", "a"])
+    assert index.find(2.0, 5.0) == ["a", "b", "c"]
+    assert index.find(3.0, 5.0, True) == ["b"]
+
+
+def epoch_compute_reference(scorer, ref, hyp, dur):
+    """The original NedcEpoch.compute loop (time_to_index per sample)."""
+    reft, hypt = [nec.NULL_CLASS], [nec.NULL_CLASS]
+    i = 0
+    curr_time = dur / 2.0
+    while curr_time <= ref[-1][1]:
+        j = scorer.time_to_index(curr_time, ref)
+        k = scorer.time_to_index(curr_time, hyp)
+        scorer.sub_d[ref[j][2]][hyp[k][2]] += int(1)
+        reft.append(ref[j][2])
+        hypt.append(hyp[k][2])
+        scorer.tgt_d[ref[j][2]] += 1
+        i += 1
+        curr_time = dur / 2.0 + i * dur
+    reft.append(nec.NULL_CLASS)
+    hypt.append(nec.NULL_CLASS)
+    refo, hypo = [reft[0]], [hypt[0]]
+    for i in range(1, len(reft)):
+        if (reft[i] != reft[i - 1]) or (hypt[i] != hypt[i - 1]):
+            refo.append(reft[i])
+            hypo.append(hypt[i])
+    return (refo, hypo)
+
+
+def test_epoch_compute():
+    rng = np.random.default_rng(2)
+    sclass, block, _ = nee.SCORERS["epoch"]
+    scmap = nee.load_scoring_map()
+    params = nft.load_parameters(nee.DEF_PFILE, block)
+    for it in range(200):
+        duration = float(rng.choice([0.1, 20, 100, 300]))
+        if it % 2:
+            ref, hyp = random_events(rng, duration), random_events(rng, duration)
+        else:
+            ref, hyp = random_annotations(rng, n_files=1, duration=duration)
+            ref, hyp = ref["file_00"], hyp["file_00"]
+            ref = [[start, stop, next(iter(label))] for start, stop, label in ref]
+            hyp = [[start, stop, next(iter(label))] for start, stop, label in hyp]
+        scorers = []
+        for _ in range(2):
+            scorer = sclass(params)
+            scorer.init_score(scmap)
+            scorers.append(scorer)
+        dur = float(rng.choice([0.25, 1.0, 1.3]))
+        des_result = epoch_compute_reference(scorers[0], ref, hyp, dur)
+        assert scorers[1].compute(ref, hyp, dur) == des_result
+        assert repr(vars(scorers[1])) == repr(vars(scorers[0]))
+
+
+def test_dpalign_compute(monkeypatch):
+    rng = np.random.default_rng(3)
+    sclass, block, _ = nee.SCORERS["dpalign"]
+    scmap = nee.load_scoring_map()
+    params = nft.load_parameters(nee.DEF_PFILE, block)
+    nedp = sys.modules[sclass.__module__]
+    for it in range(200):
+        ref, hyp = [
+            [[0.0, 1.0, str(rng.choice(["seiz", "bckg"]))] for _ in range(n)]
+            for n in rng.integers(0, 60, 2)
+        ]
+        scorers = []
+        for _ in range(2):
+            scorer = sclass(params)
+            scorer.init_score(scmap)
+            scorers.append(scorer)
+        if it % 2:
+            penalties = rng.choice([0.1, 0.5, 1.0, 1.3], 3)
+            for scorer in scorers:
+                scorer.penalty_del_d, scorer.penalty_ins_d, scorer.penalty_sub_d = (
+                    float(p) for p in penalties
+                )
+
+        # python lists vs numpy anti-diagonals
+        monkeypatch.setattr(nedp, "DPALIGN_MIN_NODES_NUMPY", np.inf)
+        des_result = scorers[0].compute(ref, hyp)
+        monkeypatch.setattr(nedp, "DPALIGN_MIN_NODES_NUMPY", 0)
+        assert scorers[1].compute(ref, hyp) == des_result
+        assert repr(vars(scorers[1])) == repr(vars(scorers[0]))
+
+
+def ovlp_compute_reference(scorer, ref, hyp):
+    """The original NedcOverlap.compute loop (get_events per event)."""
+    refo, hypo = [], []
+    hit, mis, fal = 0, 0, 0
+    for event in ref:
+        scorer.tgt_d[event[2]] += 1
+        refo.append(event[2])
+        labels, _, _ = scorer.get_events(event[0], event[1], hyp)
+        if event[2] in labels:
+            scorer.hit_d[event[2]] += 1
+            hit += 1
+        else:
+            scorer.mis_d[event[2]] += 1
+            mis += 1
+    for event in hyp:
+        hypo.append(event[2])
+        labels, _, _ = scorer.get_events(event[0], event[1], ref)
+        if event[2] not in labels:
+            scorer.fal_d[event[2]] += 1
+            fal += 1
+    return (refo, hypo, hit, mis, fal)
+
+
+def test_ovlp_compute():
+    rng = np.random.default_rng(4)
+    sclass, block, _ = nee.SCORERS["ovlp"]
+    scmap = nee.load_scoring_map()
+    params = nft.load_parameters(nee.DEF_PFILE, block)
+    for _ in range(300):
+        duration = float(rng.choice([20, 100, 300]))
+        ref, hyp = random_events(rng, duration), random_events(rng, duration)
+        scorers = []
+        for _ in range(2):
+            scorer = sclass(params)
+            scorer.init_score(scmap)
+            scorers.append(scorer)
+        des_result = ovlp_compute_reference(scorers[0], ref, hyp)
+        assert scorers[1].compute(ref, hyp) == des_result
+        assert repr(vars(scorers[1])) == repr(vars(scorers[0]))
+
+
+def test_count_ovlps():
+    rng = np.random.default_rng(5)
+    for _ in range(500):
+        events = [
+            [start, stop, {"seiz": 1.0}] for start, stop, _ in random_events(rng, 50.0)
+        ]
+        if rng.random() < 0.1:
+            # events without a positive duration
+            events.append([events[0][1], events[0][1], {"seiz": 1.0}])
+        rng.shuffle(events)
+        assert nct.count_ovlps(events) == nct.count_ovlps_reference(events)
+
+
+def test_score_roc():
+    ref_anns, hyp_anns = random_annotations(np.random.default_rng(6), n_files=10)
+    ref_lists = [
+        [[start, stop, next(iter(label)), 1.0] for start, stop, label in events]
+        for events in ref_anns.values()
+    ]
+    for name in nee.ROC_SCORERS:
+        roc = nee.score_roc(ref_anns, hyp_anns, scorer=name)
+        thresholds = roc.get_thresholds()
+        assert len(thresholds) > 10
+        curve = roc.get_curve()
+        for i, threshold in enumerate(thresholds):
+            # rescore with the rejected seizure events relabeled
+            thr_anns = {
+                fname: [
+                    [
+                        start,
+                        stop,
+                        label if label.get("seiz", 1.0) >= threshold else {"bckg": 1.0},
+                    ]
+                    for start, stop, label in events
+                ]
+                for fname, events in hyp_anns.items()
+            }
+            if name == "ovlp":
+                sclass, block, _ = nee.SCORERS[name]
+                scorer = sclass(nft.load_parameters(nee.DEF_PFILE, block))
+                scorer.init_score(nee.load_scoring_map())
+                hyp_lists = [
+                    [[start, stop, next(iter(label)), 1.0] for start, stop, label in ev]
+                    for ev in thr_anns.values()
+                ]
+                assert scorer.score_roc(ref_lists, hyp_lists)
+                assert scorer.compute_performance_roc("seiz")
+            else:
+                scorer = nee.score(ref_anns, thr_anns, scorers=[name])[name]
+            # the fractional counts of taes are summed in another order
+            tol = 1e-9 if name == "taes" else 0
+            approx = lambda val: pytest.approx(val, rel=tol, abs=tol)
+            assert (curve["fpr"][i], curve["tpr"][i]) == approx(scorer.get_roc("seiz"))
+            assert (curve["fpr"][i], curve["fnr"][i]) == approx(scorer.get_det("seiz"))
+            for count in ["tp", "fp", "tn"]:
+                assert curve[count][i] == approx(getattr(scorer, count + "_d")["seiz"])
+        # nothing is admitted at the last threshold
+        assert curve["tp"][-1] == 0 and curve["fp"][-1] == 0
+
+
+def test_event_tables(tmp_path):
+    ref_anns, hyp_anns = random_annotations(np.random.default_rng(7))
+    pmap = nft.permute_map(nee.load_scoring_map())
+    for tables_pmap in (None, pmap):
+        ref_tables = nec.make_event_tables(ref_anns, tables_pmap)
+        hyp_tables = pickle.loads(
+            pickle.dumps(nec.make_event_tables(hyp_anns, tables_pmap))
+        )
+        fname = next(iter(hyp_anns))
+        assert hyp_tables[fname][-1] == [
+            hyp_anns[fname][-1][0],
+            hyp_anns[fname][-1][1],
+            {
+                (tables_pmap or {}).get(label, label): float(np.float32(prob))
+                for label, prob in hyp_anns[fname][-1][2].items()
+            },
+        ]
+        for name in nee.SCORERS:
+            state, results = run_scorer(name, ref_anns, hyp_anns, str(tmp_path / "r1"))
+            for nproc in (1, 2):
+                state_tab, results_tab = run_scorer(
+                    name, ref_tables, hyp_tables, str(tmp_path / "r2"), nproc
+                )
+                assert results_tab == results
+                assert repr(state_tab) == repr(state)
+
+
+def tse_load_reference(fname):
+    """The original Tse.load loop."""
+    events = []
+    with open(fname, "r") as fp:
+        for line in fp:
+            line = line.replace("\n", "").replace("\r", "")
+            check = line.replace(" ", "")
+            if check.startswith("#") or check.startswith("version") or not check:
+                continue
+            parts = line.split()
+            try:
+                val = {}
+                for i in range(2, len(parts), 2):
+                    val[parts[i]] = float(parts[i + 1])
+                events.append([float(parts[0]), float(parts[1]), val])
+            except Exception:
+                return False
+    return events
+
+
+def test_tse_load(tmp_path):
+    rng = np.random.default_rng(8)
+    fname = str(tmp_path / "file.tse")
+    for it in range(100):
+        lines = ["version = tse_v1.0.0", ""]
+        for start, stop, label in random_events(rng, 300.0):
+            lines.append("%.4f %.4f %s %.4f" % (start, stop, label, rng.random()))
+        if it % 4 == 1:
+            lines.insert(3, "# comment")
+            lines.append("   ")
+        elif it % 4 == 2:
+            # more labels per event: parsed line by line
+            lines.append("1.0 2.0 seiz 0.3 bckg 0.7")
+        elif it % 4 == 3:
+            lines.append("1.0 2.0 seiz")
+        with open(fname, "w", newline="\r\n" if it % 3 else "\n") as f:
+            f.write("\n".join(lines) + "\n")
+
+        des_events = tse_load_reference(fname)
+        ann = nat.Ann()
+        if des_events is False:
+            assert ann.load(fname) == False
+        else:
+            assert ann.load(fname)
+            assert ann.get() == des_events
+
+    # lines with 6 and 2 fields: 8 fields in total, but not in 4 columns
+    with open(fname, "w") as f:
+        f.write("version = tse_v1.0.0\n1.0 2.0 seiz 0.3 4.0 0.7\n5.0 6.0\n")
+    assert nat.split_fields(["1.0 2.0 seiz 0.3 4.0 0.7", "5.0 6.0"], 4) == None
+    ann = nat.Ann()
+    assert ann.load(fname)
+    assert ann.get() == tse_load_reference(fname)
+
+
+def comp_parse_reference(f_cont, nfields):
+    """The original loop of nedc_comp_tools.parse_ref/parse_hyp."""
+    events = []
+    for line in f_cont:
+        tokenized = line.split()
+        if len(tokenized) < nfields:
+            continue
+        conf = float(tokenized[nfields]) if len(tokenized) == nfields + 1 else 1.0
+        events.append(
+            [tokenized[0], float(tokenized[1]), float(tokenized[2])]
+            + tokenized[3:nfields]
+            + [conf]
+        )
+    return events
+
+
+def test_comp_parse_events():
+    rng = np.random.default_rng(9)
+    for it in range(100):
+        nfields = 4 if it % 2 else 3
+        f_cont = []
+        for i, (start, stop, label) in enumerate(random_events(rng, 300.0)):
+            fields = ["file_%d" % (i % 3), "%.2f" % start, "%.2f" % stop, label]
+            fields = fields[:nfields]
+            if it % 5 != 1:
+                fields.append("%.3f" % rng.random())
+            if it % 5 == 2 and i == 0:
+                fields = fields[:2]
+            f_cont.append(" ".join(fields))
+        if it % 5 == 3:
+            f_cont.insert(1, "")
+        assert nct.parse_events(f_cont, nfields) == comp_parse_reference(
+            f_cont, nfields
+        )
+
+    # lines with 5 and 3 fields: 8 fields in total, but not in 4 columns
+    f_cont = ["f 1.0 2.0 seiz 0.5", "7 3.0 4.0"]
+    assert nct.parse_events(f_cont, 4) == comp_parse_reference(f_cont, 4)
+
+
+def test_parse_files(tmp_path, monkeypatch):
+    rng = np.random.default_rng(9)
+    files = []
+    for i in range(12):
+        fname = str(tmp_path / ("0000%04d_s001_t000.tse" % i))
+        lines = ["version = tse_v1.0.0", ""]
+        for start, stop, label in random_events(rng, 300.0):
+            lines.append("%.4f %.4f %s %.4f" % (start, stop, label, rng.random()))
+        if i == 3:
+            # more labels per event
+            lines.append("1.0 2.0 seiz 0.3 bckg 0.7")
+        with open(fname, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        files.append(fname)
+
+    des_anns = nec.parse_files(files)
+    assert list(des_anns) == ["0000%04d_s001_t000" % i for i in range(12)]
+    assert nec.parse_files(files, nproc=3) == des_anns
+    assert nat.load_annotations(files, nproc=3) == list(des_anns.values())
+
+    # the cache is created, then the files are read from the cache
+    cache = str(tmp_path / "cache" / "ref.npz")
+    assert nec.parse_files(files, cache=cache) == des_anns
+    loaded = []
+    load_files = nat.load_files
+    monkeypatch.setattr(
+        nat, "load_files", lambda flist, **kw: loaded.extend(flist) or load_files(flist)
+    )
+    assert nec.parse_files(files, cache=cache) == des_anns
+    assert loaded == []
+
+    # a modified file is parsed again
+    with open(files[5], "a") as f:
+        f.write("300.0000 310.0000 seiz 1.0000\n")
+    des_anns["00000005_s001_t000"].append([300.0, 310.0, {"seiz": 1.0}])
+    assert nec.parse_files(files, cache=cache) == des_anns
+    assert loaded == [files[5]]
+    assert nec.parse_files(files, cache=cache) == des_anns
+    assert loaded == [files[5]]
+
+    # an invalid cache is ignored
+    with open(cache, "wb") as f:
+        f.write(b"invalid")
+    assert nec.parse_files(files, cache=cache) == des_anns
+
+
+def test_run_scorers(tmp_path):
+    ref_anns, hyp_anns = random_annotations(np.random.default_rng(10))
+    scmap = nee.load_scoring_map()
+    params = {
+        name: nft.load_parameters(nee.DEF_PFILE, nee.REPORTS[name][1])
+        for name in nee.REPORTS
+    }
+
+    def run(names, odir, concurrent, nproc=1):
+        fp = io.StringIO()
+        wtimes = nee.run_scorers(
+            names, ref_anns, hyp_anns, scmap, params, str(odir), fp, concurrent, nproc
+        )
+        lines = fp.getvalue().splitlines()
+        assert len([line for line in lines if "Wall time" in line]) == len(names)
+        return wtimes, [line for line in lines if "Wall time" not in line]
+
+    (tmp_path / "all").mkdir()
+    wtimes, summary = run(list(nee.REPORTS), tmp_path / "all", False)
+    assert list(wtimes) == list(nee.REPORTS)
+    # the serial run doesn't keep the annotations in the worker global
+    assert getattr(nee, "scorer_data", None) is None
+
+    # the sections are written in the order of REPORTS
+    (tmp_path / "sel").mkdir()
+    wtimes_sel, summary_sel = run(["taes", "ovlp"], tmp_path / "sel", True)
+    assert list(wtimes_sel) == ["ovlp", "taes"]
+    start = summary.index(nee.REPORTS["ovlp"][3]) - 1
+    stop = summary.index(nee.REPORTS["ira"][3]) - 1
+    assert summary_sel == summary[start:stop]
+    for name in ["ovlp", "taes"]:
+        rfile = nee.REPORTS[name][4]
+        assert (tmp_path / "sel" / rfile).read_text() == (
+            tmp_path / "all" / rfile
+        ).read_text()
+    assert not (tmp_path / "sel" / nee.NEDC_EPOCH_FILE).exists()
+
+    # same sections when all scorers run concurrently, or split the files
+    assert run(list(nee.REPORTS), tmp_path / "all", True)[1] == summary
+    (tmp_path / "par").mkdir()
+    assert run(list(nee.REPORTS), tmp_path / "par", False, 3)[1] == summary
+    for name in nee.SCORERS:
+        rfile = nee.REPORTS[name][4]
+        assert (tmp_path / "par" / rfile).read_text() == (
+            tmp_path / "all" / rfile
+        ).read_text()
+    assert nee.run_scorers(["foo"], ref_anns, hyp_anns, scmap, params, "", None) is None
+
+
+def measures_reference(tp, tn, fp, fn, tdur):
+    """The original per label loop of compute_performance."""
+    msr = {}
+    msr["tpr"] = float(tp) / float(tp + fn) if (tp + fn) != 0 else float(0)
+    msr["tnr"] = float(tn) / float(tn + fp) if (tn + fp) != 0 else float(0)
+    msr["ppv"] = float(tp) / float(tp + fp) if (tp + fp) != 0 else float(0)
+    msr["npv"] = float(tn) / float(tn + fn) if (tn + fn) != 0 else float(0)
+    msr["fnr"] = 1 - msr["tpr"]
+    msr["fpr"] = 1 - msr["tnr"]
+    msr["fdr"] = 1 - msr["ppv"]
+    msr["for"] = 1 - msr["npv"]
+    total = tp + tn + fp + fn
+    msr["acc"] = float(tp + tn) / total if total != 0 else float(0)
+    msr["prv"] = float(tp + fn) / total if total != 0 else float(0)
+    msr["msr"] = 1 - msr["acc"]
+    f1s_denom = float(msr["ppv"] + msr["tpr"])
+    msr["f1s"] = (
+        2.0 * msr["ppv"] * msr["tpr"] / f1s_denom
+        if round(f1s_denom, 10) != 0
+        else float(0)
+    )
+    mcc_denom = (tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)
+    msr["mcc"] = (
+        ((tp * tn) - (fp * fn)) / math.sqrt(mcc_denom)
+        if round(mcc_denom, 10) != 0
+        else float(0)
+    )
+    msr["flr"] = float(fp) / tdur * (60 * 60 * 24) if tdur != 0 else float(0)
+    return msr
+
+
+def test_metrics():
+    nmet = sw.nee.ntaes.nmet
+    rng = np.random.default_rng(11)
+    for it in range(200):
+        n = rng.integers(1, 5)
+        if it % 2:
+            # fractional counts (taes)
+            counts = {key: rng.uniform(0, 50, n).round(3) for key in nmet.COUNTS}
+        else:
+            # large integer counts (epochs), the products overflow int64
+            counts = {key: rng.integers(0, 10**6, n) for key in nmet.COUNTS}
+        if it % 5 == 0:
+            counts["tp"][0] = counts["fp"][0] = 0
+        tdur = float(rng.uniform(0, 1e5)) if it % 7 else 0.0
+        msr = nmet.compute_measures(counts, tdur)
+        for k in range(n):
+            des = measures_reference(
+                *[counts[key][k].item() for key in nmet.COUNTS], tdur
+            )
+            assert {name: msr[name][k].item() for name in nmet.MEASURES} == des
+
+    # the 2x2 matrices and the kappa statistics of a confusion matrix
+    sub = {"seiz": {"seiz": 7, "bckg": 3, "artf": 1}}
+    sub["bckg"] = {"seiz": 2, "bckg": 20, "artf": 4}
+    sub["artf"] = {"seiz": 0, "bckg": 5, "artf": 9}
+    cnf = nmet.NedcConfusion(sub)
+    assert cnf.index("bckg") == 1
+    counts = {key: val.tolist() for key, val in cnf.get_counts().items()}
+    assert counts == {
+        "tp": [7, 20, 9],
+        "tn": [38, 17, 32],
+        "fp": [2, 8, 5],
+        "fn": [4, 6, 5],
+    }
+    # NEDC v4.0.0: d is the sum of the diagonal of the other labels
+    a, b, c, d = 7.0, 4.0, 2.0, 29.0
+    p_o = (a + d) / 42
+    p_e = (a + b) / 42 * (a + c) / 42 + (c + d) / 42 * (b + d) / 42
+    assert cnf.get_kappa()[0] == (p_o - p_e) / (1 - p_e)
+    assert cnf.get_mkappa() == (51 * 36 - (11 * 9 + 26 * 28 + 14 * 14)) / (
+        51 * 51 - (11 * 9 + 26 * 28 + 14 * 14)
+    )
+    assert nmet.other_sums([1.5, 2.0, 4.0]).tolist() == [6.0, 5.5, 3.5]
+
+
+def test_summary_f1():
+    ref_anns, hyp_anns = random_annotations(np.random.default_rng(12))
+    for name, scorer in nee.score(ref_anns, hyp_anns).items():
+        # NEDC v4.0.0 divides by the precision and sensitivity of the last label
+        last = list(scorer.hit_d)[-1]
+        assert scorer.sum_f1s_d == (
+            2.0
+            * scorer.sum_ppv_d
+            * scorer.sum_tpr_d
+            / (scorer.ppv_d[last] + scorer.tpr_d[last])
+        )
@@ -2,10 +2,20 @@
     Test post-processing functions.
 """
 import pandas as pd
+import pytest
 from pandas.testing import assert_frame_equal
 import numpy as np
+from scipy.stats import norm
 from tusz_data_processing.config import *
-from post_processing.post_process import stitch_annotations
+from post_processing.post_process import (
+    stitch_annotations,
+    group_by_file,
+    write_tse,
+    segmented_moving_average,
+    load_classifier_results,
+    write_tse_files,
+    copy_ref_files_to_folder,
+)
 
 
 def test_stitch_annotations():
@@ -70,3 +80,318 @@ def test_stitch_annotations():
     assert_frame_equal(temp, des_result, check_dtype=False)
 
 
+
+
+def test_group_by_file():
+    rng = np.random.default_rng(0)
+    files = rng.choice(["b.edf", "a.edf", "c.edf"], 50)
+    df = pd.DataFrame({"filename": files, "svm_output": rng.standard_normal(50)})
+
+    sorted_df, groups = group_by_file(df)
+    assert [file for file, _, _ in groups] == df["filename"].unique().tolist()
+    assert groups[-1][2] == len(df)
+    for file, start, stop in groups:
+        assert_frame_equal(sorted_df.iloc[start:stop], df[df["filename"] == file])
+
+
+def test_segmented_moving_average():
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, 40, 30)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    N = np.maximum(np.minimum(10, lengths - 1), 1)
+    x = rng.standard_normal(offsets[-1])
+
+    x_avg = segmented_moving_average(x, offsets, N)
+    for i in range(len(lengths)):
+        segment = x[offsets[i] : offsets[i + 1]]
+        des_result = np.convolve(segment, np.ones(N[i]) / N[i], mode="same")
+        assert np.allclose(x_avg[offsets[i] : offsets[i + 1]], des_result)
+
+
+def test_load_classifier_results(tmp_path):
+    import h5py
+
+    rng = np.random.default_rng(0)
+    N = 100
+    val_df = pd.DataFrame(
+        {
+            "epoch": np.arange(N),
+            "annotation": rng.choice([-1, 1], N),
+            "start_time": np.arange(N, dtype=float),
+            "stop_time": np.arange(N, dtype=float) + 2,
+            "min|0": rng.standard_normal(N),
+            "filename": np.repeat(["/dev/a.edf", "/dev/b.edf"], N // 2),
+        },
+        index=np.arange(N) % 7,
+    )
+    val_file = str(tmp_path / "dev.parquet")
+    val_df.to_parquet(val_file)
+    svm_output = rng.standard_normal(N)
+
+    # MATLAB stores N x 1 vectors as 1 x N datasets
+    mat_file = str(tmp_path / "predicted.mat")
+    with h5py.File(mat_file, "w") as f:
+        f["svm_output"] = svm_output[np.newaxis, :]
+        f["predicted_labels"] = np.sign(svm_output)[np.newaxis, :]
+        f["var_output"] = -1.0
+    csv_file = str(tmp_path / "predicted.csv")
+    pd.DataFrame(
+        {"predicted_labels": np.sign(svm_output), "svm_output": svm_output}
+    ).to_csv(csv_file, index=False)
+
+    for prediction_file in [mat_file, csv_file]:
+        df = load_classifier_results(val_file, prediction_file)
+        assert list(df.columns) == [
+            "epoch",
+            "start_time",
+            "stop_time",
+            "annotation",
+            "filename",
+            "predicted_labels",
+            "svm_output",
+        ]
+        assert df["svm_output"].dtype == np.float32
+        assert np.allclose(df["svm_output"], svm_output)
+        assert np.array_equal(df["predicted_labels"], np.sign(svm_output))
+        assert np.array_equal(df["filename"], val_df["filename"])
+        assert np.array_equal(df.index, np.arange(N))
+
+
+def stitch_annotations_iterrows(
+    ann_df,
+    file_duration,
+    ann_label="predicted_labels",
+    min_seiz_length=25.0,
+    time_between=90.0,
+):
+    """Reference (loop based) implementation of stitch_annotations."""
+
+    ann_df.loc[:, "stop_time"] = ann_df["stop_time"].round()
+    ann_df.loc[:, "start_time"] = ann_df["start_time"].round()
+    seizures = ann_df[ann_df[ann_label] == 1]
+    cols = ["start_time", "stop_time", ann_label, "probability"]
+    if seizures.empty:
+        new_ann = pd.DataFrame([[0.0, file_duration, "bckg", 1.0]], columns=cols)
+        return new_ann
+
+    seizures.reset_index(inplace=True, drop=True)
+    seizures.sort_values(by="start_time", inplace=True)
+
+    # First step auto stitch if time between < time_between
+    # check if a seizure exist
+    # new_seizures = pd.DataFrame(columns=seizures.columns)
+    i_seiz = 0
+    start_seizure = [seizures.loc[0, "start_time"]]  # initialize start 1st seizure
+    stop_seizure = [seizures.loc[0, "stop_time"]]
+    for i, row in seizures.iterrows():
+        if i == 0:
+            continue
+        curr_start = row["start_time"]  # initialize start 1st seizure
+        curr_stop = row["stop_time"]
+        if abs((curr_start - stop_seizure[i_seiz])) <= time_between:
+            stop_seizure[i_seiz] = curr_stop
+        else:
+            i_seiz += 1
+            start_seizure.append(curr_start)
+            stop_seizure.append(curr_stop)
+
+    new_seizures = pd.DataFrame(
+        np.array([start_seizure, stop_seizure]).T, columns=["start_time", "stop_time"]
+    )
+
+    # step: remove seizure < min_seiz_length
+    new_seizures = new_seizures.sort_values(by="start_time")
+    new_seizures.reset_index(inplace=True, drop=True)
+    new_seizures["seizure_length"] = (
+        new_seizures["stop_time"] - new_seizures["start_time"]
+    )
+    new_seizures = new_seizures[new_seizures["seizure_length"] >= min_seiz_length]
+    if new_seizures.empty:
+        new_ann = pd.DataFrame([[0.0, file_duration, "bckg", 1.0]], columns=cols)
+        return new_ann
+
+    new_seizures.reset_index(inplace=True, drop=True)
+    new_seizures.drop(columns=["seizure_length"], inplace=True)
+    new_seizures.loc[:, ann_label] = "seiz"
+
+
+    new_seizures.loc[:, "probability"] = 1.0
+
+    # Add background segments
+    time = 0
+    background_start = []
+    background_stop = []
+    for index, row in new_seizures.iterrows():
+        if index == 0 and row["start_time"] == 0:
+            continue
+        background_start.append(time)
+        background_stop.append(row["start_time"])
+
+        time = row["stop_time"]
+
+    # Background dataframe
+    assert len(background_start) == len(background_stop)
+    N_back = len(background_start)
+    background_df = pd.DataFrame(
+        {
+            "start_time": background_start,
+            "stop_time": background_stop,
+            ann_label: ["bckg"] * N_back,
+            "probability": [1.0] * N_back,
+        }
+    )
+
+    # concatenate background and seizure df's
+    new_ann = pd.concat([background_df, new_seizures])
+    new_ann.sort_values(
+        by="start_time", ascending=True, ignore_index=True, inplace=True
+    )
+    idx_last = new_ann.index[-1]
+    last_row = new_ann.loc[idx_last, :].copy()
+    if last_row["stop_time"] != file_duration:
+        if (
+            last_row[ann_label] == "seiz"
+            and (file_duration - last_row["stop_time"]) <= time_between
+        ):
+            new_ann.loc[idx_last, "stop_time"] = file_duration
+        elif last_row[ann_label] == "bckg":
+            new_ann.loc[idx_last, "stop_time"] = file_duration
+        else:
+            new_last_row = pd.Series(
+                [
+                    new_ann.loc[new_ann.index[-1], "stop_time"],
+                    file_duration,
+                    "bckg",
+                    1.0,
+                ],
+                index=new_ann.columns,
+            )
+            new_ann.loc[idx_last + 1, :] = new_last_row
+
+    assert np.all((new_ann["stop_time"] - new_ann["start_time"]) > 0)
+
+    return new_ann
+
+
+def test_stitch_annotations_random(tmp_path):
+    rng = np.random.default_rng(0)
+    for i in range(300):
+        n = rng.integers(1, 80)
+        start = np.arange(n) + rng.choice([0.0, 0.4, 0.5])
+        # runs of seizure/background epochs
+        switch = rng.random(n) < rng.uniform(0.05, 0.5)
+        label = np.where(np.cumsum(switch) % 2 == 1, 1.0, -1.0)
+        df = pd.DataFrame(
+            {
+                "start_time": start,
+                "stop_time": start + 2,
+                "svm_output": rng.standard_normal(n),
+                "predicted_labels": label,
+            }
+        )
+        file_duration = np.ceil(start[-1] + 2) + rng.integers(0, 15)
+        if rng.random() < 0.5:
+            file_duration = int(file_duration)
+        kwargs = {
+            "min_seiz_length": rng.choice([0.0, 1.0, 4.0, 10.0, 25.0]),
+            "time_between": rng.choice([0.0, 1.0, 3.0, 8.0, 90.0]),
+        }
+
+        try:
+            des_result = stitch_annotations_iterrows(df.copy(), file_duration, **kwargs)
+        except AssertionError:  # overlapping segments
+            with pytest.raises(AssertionError):
+                stitch_annotations(df.copy(), file_duration, **kwargs)
+            continue
+        result = stitch_annotations(df.copy(), file_duration, **kwargs)
+        assert_frame_equal(result, des_result)
+
+        write_tse(des_result, str(tmp_path / "des.tse"))
+        write_tse(result, str(tmp_path / "res.tse"))
+        with open(tmp_path / "des.tse") as f_des, open(tmp_path / "res.tse") as f_res:
+            assert f_res.read() == f_des.read()
+
+
+def test_write_tse_files(tmp_path):
+    annotations = pd.DataFrame(
+        {
+            "start_time": [0.0, 12.5, 40],
+            "stop_time": [12.5, 40, 301.0],
+            "predicted_labels": ["bckg", "seiz", "bckg"],
+            "probability": [1.0, 0.8342, 1.0],
+        }
+    )
+    tse_files = [
+        str(tmp_path / "a" / "f1.tse"),
+        None,
+        str(tmp_path / "b" / "c" / "f2.tse"),
+    ]
+    write_tse_files([annotations, None, annotations.iloc[1:]], tse_files)
+
+    for df, tse_file in [
+        (annotations, tse_files[0]),
+        (annotations.iloc[1:], tse_files[2]),
+    ]:
+        # formatting of the original (row by row) writer
+        rows = [" ".join(row) for row in df.values.astype(str).tolist()]
+        with open(tse_file) as f:
+            assert f.read() == "version = tse_v1.0.0\n\n" + "\n".join(rows)
+
+    for link in [False, True]:
+        folder = str(tmp_path / ("ref_link" if link else "ref_copy"))
+        new_files = copy_ref_files_to_folder(
+            [tse_files[0], str(tmp_path / "missing.tse"), tse_files[2]], folder, link
+        )
+        assert new_files == [folder + "/f1.tse", folder + "/f2.tse"]
+        for new_file, tse_file in zip(new_files, [tse_files[0], tse_files[2]]):
+            with open(new_file) as f_new, open(tse_file) as f_old:
+                assert f_new.read() == f_old.read()
+        # linking again replaces the existing files
+        copy_ref_files_to_folder([tse_files[0]], folder, link)
+
+
+def test_stitch_annotations_confidence():
+    start = np.arange(0, 100, 1.0)
+    svm_output = np.where((start >= 30) & (start < 60), 2.0, -1.0)
+    svm_output[40] = 0.0
+    df = pd.DataFrame(
+        {
+            "start_time": start,
+            "stop_time": start + 2,
+            "svm_output": svm_output,
+            "predicted_labels": np.sign(svm_output),
+        }
+    )
+    df.loc[40, "predicted_labels"] = 1.0
+    kwargs = {"min_seiz_length": 10.0, "time_between": 5.0}
+    result = stitch_annotations(df.copy(), 120, confidence=True, **kwargs)
+    # same segments as without confidence
+    des_result = stitch_annotations(df.copy(), 120, **kwargs)
+    assert_frame_equal(result.iloc[:, :3], des_result.iloc[:, :3])
+    assert (des_result["probability"] == 1.0).all()
+
+    # the epochs with centers in the segment are averaged
+    centers = start + 1
+    p_seiz = []
+    for seg_start, seg_stop in result[["start_time", "stop_time"]].values:
+        in_segment = (centers >= seg_start) & (centers < seg_stop)
+        p_seiz.append(
+            1 / (1 + np.exp(-svm_output[in_segment].mean())) if in_segment.any() else 0
+        )
+    p_seiz = np.array(p_seiz)
+    des_prob = np.where(result["predicted_labels"] == "seiz", p_seiz, 1 - p_seiz)
+    np.testing.assert_allclose(result["probability"], np.round(des_prob, 4))
+
+    # gaussian calibration with the variance of the tnkf
+    df["var_output"] = 4.0
+    result = stitch_annotations(df.copy(), 120, confidence=True, **kwargs)
+    seg_start, seg_stop = result.loc[1, ["start_time", "stop_time"]]
+    in_segment = (centers >= seg_start) & (centers < seg_stop)
+    assert result["probability"][1] == round(
+        float(norm.cdf(svm_output[in_segment].mean() / 2)), 4
+    )
+
+    # no seizures
+    df["predicted_labels"] = -1.0
+    result = stitch_annotations(df.copy(), 120, confidence=True, **kwargs)
+    assert len(result) == 1 and 0.5 < result["probability"][0] < 1
@@ -0,0 +1,107 @@
+"""
+    Test the post-processing parameter sweep.
+"""
+import numpy as np
+import pandas as pd
+
+import post_processing.post_process as pp
+import post_processing.sweep as sw
+
+
+def test_sweep():
+    rng = np.random.default_rng(0)
+    n_files, n_epochs = 4, 200
+    ref_anns = {}
+    frames = []
+    groups = []
+    for i in range(n_files):
+        # one seizure per file, the classifier output is noisy around it
+        seiz_start = rng.integers(20, 120)
+        seiz_stop = seiz_start + rng.integers(30, 60)
+        ref_anns["file_%d" % i] = [
+            [0.0, float(seiz_start), {"bckg": 1.0}],
+            [float(seiz_start), float(seiz_stop), {"seiz": 1.0}],
+            [float(seiz_stop), float(n_epochs + 1), {"bckg": 1.0}],
+        ]
+        start = np.arange(n_epochs, dtype=float)
+        label = np.where((start >= seiz_start) & (start < seiz_stop), 1.0, -1.0)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "start_time": start,
+                    "stop_time": start + 2,
+                    "svm_output": label + rng.normal(0, 1.5, n_epochs),
+                }
+            )
+        )
+        groups.append(("/dev/file_%d.edf" % i, i * n_epochs, (i + 1) * n_epochs))
+    sweep_data = (
+        pd.concat(frames, ignore_index=True),
+        groups,
+        [float(n_epochs + 1)] * n_files,
+        ref_anns,
+    )
+
+    results = sw.sweep(
+        sweep_data,
+        moving_windows=[1, 10],
+        offsets=[0.0, 0.5],
+        min_seiz_lengths=[0.0, 10.0],
+        times_between=[30.0],
+        processes=0,
+        classifier="tnkf",
+    )
+    assert len(results) == 8
+    assert list(results.columns[:4]) == [
+        "moving_window",
+        "offset",
+        "min_seiz_length",
+        "time_between",
+    ]
+    assert results["taes_sensitivity"].between(0, 1).all()
+    # smoothing and removing short seizures removes the false alarms
+    best = results.loc[results["taes_f1"].idxmax()]
+    assert best["moving_window"] == 10 and best["min_seiz_length"] == 10.0
+
+    # same results in parallel
+    results_par = sw.sweep(
+        sweep_data,
+        moving_windows=[1, 10],
+        offsets=[0.0, 0.5],
+        min_seiz_lengths=[0.0, 10.0],
+        times_between=[30.0],
+        processes=2,
+        classifier="tnkf",
+    )
+    pd.testing.assert_frame_equal(results, results_par)
+
+    # the offset is only applied to the tnkf output
+    results_lssvm = sw.sweep(
+        sweep_data,
+        moving_windows=[1, 10],
+        offsets=[0.0, 0.5],
+        min_seiz_lengths=[0.0, 10.0],
+        times_between=[30.0],
+        processes=0,
+        classifier="lssvm",
+    )
+    pd.testing.assert_frame_equal(
+        results_lssvm, results[results["offset"] == 0.0].reset_index(drop=True)
+    )
+
+
+def test_to_events(tmp_path):
+    stitched_df = pd.DataFrame(
+        {
+            "start_time": [0.0, 20.0, 50.0],
+            "stop_time": [20.0, 50.0, 101.5],
+            "predicted_labels": ["bckg", "seiz", "bckg"],
+            "probability": [1.0, 1.0, 1.0],
+        }
+    )
+    tse_file = str(tmp_path / "00000258_s001_t000.tse")
+    pp.write_tse(stitched_df, tse_file)
+    # same events as when the .tse file is parsed by the scoring software
+    assert sw.nec.parse_files([tse_file]) == {
+        "00000258_s001_t000": sw.to_events(stitched_df)
+    }